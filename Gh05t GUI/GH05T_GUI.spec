@@ -5,6 +5,8 @@ from PyInstaller.utils.hooks import collect_submodules, collect_data_files
 msgpack_hidden = collect_submodules('msgpack')
 msgpack_data = collect_data_files('msgpack')
 mne_datas, mne_binaries, mne_hiddenimports = collect_all('mne')
+# utils/__init__.py and the source registry import their modules lazily
+utils_hidden = collect_submodules('utils')
 
 a = Analysis(
     ['main.py'],
@@ -22,7 +24,9 @@ a = Analysis(
                     'matplotlib',
                     'matplotlib.pyplot',
                     'pkg_resources',
-                    'joblib'] + mne_hiddenimports + msgpack_hidden,
+                    'joblib',
+                    'numba',
+                    'llvmlite'] + mne_hiddenimports + msgpack_hidden + utils_hidden,
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
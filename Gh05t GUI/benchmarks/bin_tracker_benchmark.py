@@ -0,0 +1,48 @@
+"""Compares following a few frequencies with the FFT of the window and with BinTracker.
+
+To follow SSVEP stimulus or alpha frequencies per block, the FFT path computes the
+Hamming windowed rfft of the newest second for every block and picks out the bins.
+BinTracker slides a DFT per frequency instead, so a block costs the same whatever the
+window length. Reported is the time per 20 ms block of 8 channels at 250 Hz, for one
+second and for longer windows (finer frequency resolution).
+
+Run from the GUI folder: python benchmarks/bin_tracker_benchmark.py"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from utils.spectral import BinTracker, spectrum
+
+FS = 250
+BLOCK_SIZE = 5  # samples in a 20 ms block at 250 Hz
+N_BLOCKS = 2000
+FREQUENCIES = [8, 10, 12, 15]
+
+def fft_path(data, window):
+    size = int(window * FS)
+    for stop in range(size, data.shape[1], BLOCK_SIZE):
+        freqs, magnitudes = spectrum(data[:, stop - size:stop], FS)
+        magnitudes[:, np.searchsorted(freqs, FREQUENCIES)]
+
+def tracker(data, window):
+    bins = BinTracker(FREQUENCIES, FS, channels=data.shape[0], window=window)
+    bins.process(data[:, :int(window * FS)])
+    for start in range(int(window * FS), data.shape[1], BLOCK_SIZE):
+        bins.process(data[:, start:start + BLOCK_SIZE])
+
+def main():
+    print(f"{'window (s)':>10} {'FFT (us/block)':>15} {'BinTracker':>11}")
+    for window in (1, 4, 10):
+        data = np.random.default_rng(0).standard_normal((8, window * FS + N_BLOCKS * BLOCK_SIZE))
+        times = []
+        for method in (fft_path, tracker):
+            start = time.perf_counter()
+            method(data, window)
+            times.append((time.perf_counter() - start) / N_BLOCKS * 1e6)
+        print(f"{window:>10} {times[0]:>15.1f} {times[1]:>11.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Compares the per-packet BLE decode path against the block decoder.
+
+Run from the GUI folder: python benchmarks/ble_decode_benchmark.py"""
+import os
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from utils.ble_handler import BLEWorker, decode_ble_block, PACKET_SIZE
+
+N_PACKETS = 50000
+
+def make_stream(n_packets):
+    rng = np.random.default_rng(0)
+    channels = rng.integers(-2**23, 2**23, size=(n_packets, 8), dtype=np.int32)
+    return b''.join(struct.pack('<I8i', 4 * i, *channels[i]) for i in range(n_packets))
+
+def per_packet(worker, notifications):
+    """The original handle_notification loop: slice 36 bytes off the front and unpack one packet."""
+    data_buffer = bytearray()
+    count = 0
+    for data in notifications:
+        data_buffer.extend(data)
+        while len(data_buffer) >= PACKET_SIZE:
+            full_packet = data_buffer[:PACKET_SIZE]
+            data_buffer = data_buffer[PACKET_SIZE:]
+            if worker.process_ble_data(full_packet):
+                count += 1
+    return count
+
+def block(notifications):
+    data_buffer = bytearray()
+    count = 0
+    for data in notifications:
+        data_buffer.extend(data)
+        timestamps, channel_data, remainder = decode_ble_block(data_buffer)
+        data_buffer = bytearray(remainder)
+        count += len(timestamps)
+    return count
+
+def main():
+    worker = BLEWorker()
+    stream = make_stream(N_PACKETS)
+
+    print(f"{'packets/notification':>22} {'per-packet (s)':>15} {'block (s)':>10} {'speedup':>8}")
+    for packets_per_notification in (1, 4, 16, 64):
+        size = PACKET_SIZE * packets_per_notification
+        notifications = [stream[i:i+size] for i in range(0, len(stream), size)]
+
+        start = time.perf_counter()
+        assert per_packet(worker, notifications) == N_PACKETS
+        t_packet = time.perf_counter() - start
+
+        start = time.perf_counter()
+        assert block(notifications) == N_PACKETS
+        t_block = time.perf_counter() - start
+
+        print(f"{packets_per_notification:>22} {t_packet:>15.4f} {t_block:>10.4f} {t_packet / t_block:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Compares sustained real-time throughput of the processing thread and the DSP process.
+
+A producer thread submits blocks as fast as the pipeline takes them (the backlog is kept
+bounded), while the main thread stands in for the GUI: it takes plot snapshots of the
+session buffer and does GIL-holding pure Python work like matplotlib's redraws. Reported
+are the samples processed per second and the frames the "GUI" managed meanwhile. The
+process mode pays off with at least two free cores.
+
+Run from the GUI folder: python benchmarks/dsp_process_benchmark.py"""
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from PyQt5.QtCore import QCoreApplication
+from utils.dsp_process import DSPProcess, create_shared_ring
+from utils.processing import ProcessingWorker
+from utils.ring_buffer import RingBuffer
+
+DURATION = 5.0  # seconds measured per mode
+BLOCK_SIZE = 25
+MAX_BACKLOG = 64  # blocks the producer may be ahead of the pipeline
+RENDER_WORK = 20000  # python loop iterations per simulated frame
+N_PLOT = 2000
+
+class NullRecorder:
+    def add_data(self, timestamps, channels, labels=None):
+        pass
+
+def backlog(worker):
+    if isinstance(worker, DSPProcess):
+        return (worker.raw_ring.head - worker.ring.head) // BLOCK_SIZE
+    return worker.blocks.qsize()
+
+def produce(worker, stop):
+    rng = np.random.default_rng(0)
+    data = rng.integers(-2**20, 2**20, size=(8, BLOCK_SIZE)).astype(np.float64)
+    i = 0
+    while not stop.is_set():
+        if backlog(worker) >= MAX_BACKLOG:
+            time.sleep(0.0005)
+            continue
+        worker.submit(np.arange(i, i + BLOCK_SIZE) * 4, data)
+        i += BLOCK_SIZE
+
+def render(ring, reader):
+    reader.snapshot(N_PLOT)
+    return sum(i * i for i in range(RENDER_WORK))
+
+def run(mode):
+    ring = create_shared_ring(9, 4096) if mode == "process" else RingBuffer(9, 4096)
+    worker_class = DSPProcess if mode == "process" else ProcessingWorker
+    worker = worker_class(ring, NullRecorder(), None, 250, 5 / 8388607 * 1000, 8)
+    worker.set_filter("Band Pass", [5, 30])
+    worker.start()
+
+    stop = threading.Event()
+    producer = threading.Thread(target=produce, args=(worker, stop), daemon=True)
+    producer.start()
+    while ring.head == 0:  # the DSP process needs a moment to start
+        time.sleep(0.05)
+
+    reader = ring.reader()
+    start_head, start = ring.head, time.perf_counter()
+    frames = 0
+    while time.perf_counter() - start < DURATION:
+        render(ring, reader)
+        frames += 1
+    elapsed = time.perf_counter() - start
+    processed = ring.head - start_head
+
+    stop.set()
+    producer.join()
+    worker.stop()
+    ring.close()
+    return processed / elapsed, frames / elapsed
+
+def main():
+    app = QCoreApplication(sys.argv)
+    print(f"cores: {os.cpu_count()}")
+    print(f"{'mode':>8} {'samples/s':>10} {'frames/s':>9}")
+    for mode in ("thread", "process"):
+        rate, fps = run(mode)
+        print(f"{mode:>8} {rate:>10.0f} {fps:>9.1f}")
+
+if __name__ == "__main__":
+    main()
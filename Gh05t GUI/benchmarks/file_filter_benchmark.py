@@ -0,0 +1,68 @@
+"""Compares sosfiltfilt on a whole recording with the chunked zero_phase_filter.
+
+Reported are the time taken, the memory allocated on top of the recording at the peak
+(tracemalloc, numpy reports its buffers to it) and, as a stand-in for GUI freezes, the
+longest a 10 ms ticker thread had to wait while the filtering ran in another thread.
+
+Run from the GUI folder: python benchmarks/file_filter_benchmark.py"""
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from scipy.signal import sosfiltfilt
+from utils.dsp import FilterCascade, zero_phase_filter
+
+FS = 250
+STAGES = [("High Pass", [1, 1]), ("Notch", [60, 60]), ("Band Pass", [5, 30])]
+TICK = 0.01
+
+def measure(method, data):
+    stop = threading.Event()
+    stalls = [0.0]
+
+    def ticker():
+        last = time.perf_counter()
+        while not stop.is_set():
+            time.sleep(TICK)
+            now = time.perf_counter()
+            stalls[0] = max(stalls[0], now - last - TICK)
+            last = now
+
+    tracemalloc.start()
+    thread = threading.Thread(target=ticker)
+    thread.start()
+    start = time.perf_counter()
+    result = method(data)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    thread.join()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak, stalls[0]
+
+def main():
+    sos = FilterCascade(STAGES, FS).sos
+    methods = {
+        "sosfiltfilt": lambda data: sosfiltfilt(sos, data, axis=-1),
+        "chunked": lambda data: zero_phase_filter(sos, data),
+    }
+    print(f"{'recording':>16} {'method':>12} {'time (s)':>9} {'peak (MB)':>10} {'x recording':>12} {'max stall (ms)':>15}")
+    for channels, hours in ((8, 1), (21, 1)):
+        data = np.random.default_rng(0).standard_normal((channels, int(hours * 3600 * FS)))
+        results = []
+        for name, method in methods.items():
+            result, elapsed, peak, stall = measure(method, data)
+            results.append(result)
+            print(f"{f'{channels} ch x {hours} h':>16} {name:>12} {elapsed:>9.2f} {peak / 1e6:>10.0f} "
+                  f"{peak / data.nbytes:>12.2f} {stall * 1000:>15.1f}")
+            del result
+        assert np.allclose(results[0], results[1])
+        del results
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Compares the per-channel real-time filters with the vectorized FilterBank.
+
+The GUI used to filter one channel at a time with lfilter: per sample through
+SignalProcessingWindow.butter_filter (a dict lookup and an lfilter call per channel and
+sample), and later per block. FilterBank filters every channel of a block in one sosfilt
+call, so its cost barely grows with the channel count. The second table compares a
+High Pass, Notch and Band Pass chain run as three filters with the same chain fused into
+one FilterCascade.
+
+Run from the GUI folder: python benchmarks/filter_bank_benchmark.py"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from scipy.signal import butter, lfilter, lfilter_zi
+from utils.dsp import FilterBank, FilterCascade
+
+N_BLOCKS = 500
+BLOCK_SIZE = 5  # samples in a 20 ms block at 250 Hz
+FS = 250
+STAGES = [("High Pass", [1, 1]), ("Notch", [60, 60]), ("Band Pass", [5, 30])]
+
+def per_sample(blocks, channels):
+    states = {}
+    for block in blocks:
+        for i in range(block.shape[1]):
+            for ch in range(channels):
+                key = ((5, 30), "band", 5, ch)
+                if key not in states:
+                    b, a = butter(5, [5 / 125, 30 / 125], btype="band")
+                    states[key] = {'b': b, 'a': a, 'zi': lfilter_zi(b, a)}
+                state = states[key]
+                _, state['zi'] = lfilter(state['b'], state['a'], block[ch, i:i+1], zi=state['zi'])
+
+def per_channel(blocks, channels):
+    b, a = butter(5, [5 / 125, 30 / 125], btype="band")
+    zi = np.tile(lfilter_zi(b, a), (channels, 1))
+    for block in blocks:
+        filtered = np.zeros(block.shape)
+        for ch in range(channels):
+            filtered[ch], zi[ch] = lfilter(b, a, block[ch], zi=zi[ch])
+
+def filter_bank(blocks, channels):
+    bank = FilterBank("Band Pass", [5, 30], FS, channels)
+    for block in blocks:
+        bank.process(block)
+
+def separate_stages(blocks, channels):
+    banks = [FilterBank(filter_type, freq_range, FS, channels) for filter_type, freq_range in STAGES]
+    for block in blocks:
+        for bank in banks:
+            block = bank.process(block)
+
+def fused_cascade(blocks, channels):
+    cascade = FilterCascade(STAGES, FS, channels)
+    for block in blocks:
+        cascade.process(block)
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"{'channels':>8} {'per sample (us/block)':>22} {'per channel':>12} {'FilterBank':>11}")
+    for channels in (1, 4, 8, 16, 32):
+        blocks = [rng.standard_normal((channels, BLOCK_SIZE)) for _ in range(N_BLOCKS)]
+        times = []
+        for method in (per_sample, per_channel, filter_bank):
+            start = time.perf_counter()
+            method(blocks, channels)
+            times.append((time.perf_counter() - start) / N_BLOCKS * 1e6)
+        print(f"{channels:>8} {times[0]:>22.1f} {times[1]:>12.1f} {times[2]:>11.1f}")
+
+    print(f"\n{'channels':>8} {'3 filters (us/block)':>21} {'cascade':>8}")
+    for channels in (8, 32):
+        blocks = [rng.standard_normal((channels, BLOCK_SIZE)) for _ in range(N_BLOCKS)]
+        times = []
+        for method in (separate_stages, fused_cascade):
+            start = time.perf_counter()
+            method(blocks, channels)
+            times.append((time.perf_counter() - start) / N_BLOCKS * 1e6)
+        print(f"{channels:>8} {times[0]:>21.1f} {times[1]:>8.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Compares the CPU and memory footprint of headless.py with the GUI, both streaming the synthetic source.
+
+Each runs as a child process for a fixed time. Reported are the CPU used once started
+(after WARMUP, from /proc, so Linux only), the CPU used in total including imports and
+start-up, and the peak resident memory. The GUI runs with the offscreen Qt platform and
+draws its real-time plot as usual.
+
+Run from the GUI folder: python benchmarks/headless_footprint_benchmark.py"""
+import os
+import subprocess
+import sys
+import time
+
+GUI_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DURATION = 20.0  # seconds each child runs
+WARMUP = 8.0  # seconds left for start-up before steady-state CPU is measured
+TICKS = os.sysconf("SC_CLK_TCK")
+
+def run_gui(duration):
+    """Child mode: opens the main window, streams the synthetic source and closes after duration seconds."""
+    sys.path.insert(0, GUI_FOLDER)
+    from PyQt5.QtCore import QTimer
+    from PyQt5.QtWidgets import QApplication
+    from main import MainWindow
+    from utils.synthetic_source import SyntheticSource
+
+    app = QApplication(sys.argv[:1])
+    window = MainWindow()
+    window.show()
+    window.start_source(SyntheticSource.name)
+    QTimer.singleShot(int(duration * 1000), window.close)
+    app.exec_()
+
+def cpu_seconds(pid):
+    """User plus system CPU time of a running process, from /proc."""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / TICKS
+
+def measure(command, env=None):
+    """Runs a child and measures it.
+
+    :return tuple: (steady-state CPU in %, total CPU in seconds, peak RSS in MB)."""
+    child = subprocess.Popen(command, cwd=GUI_FOLDER, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    time.sleep(WARMUP)
+    start_cpu, start = cpu_seconds(child.pid), time.perf_counter()
+    time.sleep(DURATION - WARMUP - 1)
+    steady = (cpu_seconds(child.pid) - start_cpu) / (time.perf_counter() - start) * 100
+    _, _, usage = os.wait4(child.pid, 0)
+    return steady, usage.ru_utime + usage.ru_stime, usage.ru_maxrss / 1024
+
+def main():
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    commands = {
+        "headless": [sys.executable, "headless.py", "--source", "synthetic", "--duration", str(DURATION),
+                     "--websocket-port", "0", "--stats-interval", "0"],
+        "GUI": [sys.executable, os.path.abspath(__file__), "gui"],
+    }
+    for mode, command in commands.items():
+        steady, total, rss = measure(command, env)
+        print(f"{mode:>8}: {steady:5.1f} % CPU streaming, {total:5.1f} s CPU in total, {rss:6.1f} MB peak RSS")
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["gui"]:
+        run_gui(DURATION)
+    else:
+        main()
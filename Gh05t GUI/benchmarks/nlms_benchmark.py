@@ -0,0 +1,63 @@
+"""Compares the scalar NLMS update with the multi-channel NLMS stage of the detector.
+
+The scalar path runs the notebooks' apply_nlms_filter once per sample and channel, slicing
+the tap vector out of the channel's history every time. NLMS keeps the references in a
+preallocated tap-delay line and updates the weights of every channel at once. Reported
+is the time per 20 ms block at 250 Hz (5 samples) and per 100 ms block (25 samples),
+for 8 channels and 64 taps, and the same for the whole detector.
+
+Run from the GUI folder: python benchmarks/nlms_benchmark.py"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from utils.adaptive import NLMS
+from utils.dsp import EMGDetector, NLMS_TAPS
+
+N_SAMPLES = 5000
+
+def apply_nlms_filter(x_in, w_lms_k, y_noisy, mu, eps):
+    """One NLMS update as the HLDS and Noise_Reduction notebooks do it."""
+    y_hat = np.dot(w_lms_k, x_in)
+    e = y_noisy - y_hat
+    x_pow = np.dot(x_in, x_in)
+    mu_eff = mu / (x_pow + eps)
+    return w_lms_k + mu_eff * e * x_in, e
+
+def scalar(data, block_size):
+    weights = np.zeros((data.shape[0], NLMS_TAPS))
+    padded = np.hstack((np.zeros((data.shape[0], NLMS_TAPS)), data))
+    for start in range(0, data.shape[1], block_size):
+        for i in range(start, start + block_size):
+            for ch in range(data.shape[0]):
+                weights[ch], _ = apply_nlms_filter(padded[ch, i:i + NLMS_TAPS], weights[ch], data[ch, i], 0.99, 1e-6)
+
+def block(data, block_size):
+    nlms = NLMS(data.shape[0], NLMS_TAPS, mu=0.99, eps=1e-6)
+    for start in range(0, data.shape[1], block_size):
+        nlms.process(data[:, start:start + block_size])
+
+def detector(data, block_size):
+    emg = EMGDetector()
+    emg.nlms_start = 0  # the NLMS stage runs from the first block
+    for start in range(0, data.shape[1], block_size):
+        emg.detect_emg(data[:, start:start + block_size])
+
+def main():
+    data = np.random.default_rng(0).normal(0, 1000, (8, N_SAMPLES))
+    # the first call compiles the SDED kernels, keep it out of the timings
+    detector(data[:, :25], 25)
+    print(f"{'block':>5} {'scalar NLMS (us/block)':>23} {'NLMS':>8} {'detector':>9}")
+    for block_size in (5, 25):
+        times = []
+        for method in (scalar, block, detector):
+            start = time.perf_counter()
+            method(data, block_size)
+            times.append((time.perf_counter() - start) / (N_SAMPLES / block_size) * 1e6)
+        print(f"{block_size:>5} {times[0]:>23.1f} {times[1]:>8.1f} {times[2]:>9.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""Measures how soon a newly applied filter can be shown on a long file.
+
+Compares filtering the whole recording before redrawing with filtering only the span the
+time series shows (FilteredView), and switching back to a setting whose view is cached.
+
+Run from the GUI folder: python benchmarks/progressive_filter_benchmark.py"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from utils.dsp import FilterCache, zero_phase_filter
+
+FS = 250
+N_PLOT = 2000  # samples the time series shows
+SETTINGS = [
+    [("High Pass", [1, 1]), ("Notch", [60, 60]), ("Band Pass", [5, 30])],
+    [("Band Pass", [8, 12])],
+]
+
+def main():
+    print(f"{'recording':>16} {'whole file (ms)':>16} {'visible span':>13} {'cached':>7}")
+    for channels, hours in ((8, 1), (21, 1)):
+        data = np.random.default_rng(0).standard_normal((channels, int(hours * 3600 * FS)))
+        cache = FilterCache(data, FS)
+
+        view = cache.get(SETTINGS[0])
+        start = time.perf_counter()
+        view.full = zero_phase_filter(view.sos, data)
+        t_full = time.perf_counter() - start
+
+        other = cache.get(SETTINGS[1])
+        start = time.perf_counter()
+        other[:, :N_PLOT]
+        t_span = time.perf_counter() - start
+
+        start = time.perf_counter()
+        cache.get(SETTINGS[0])[:, :N_PLOT]
+        t_cached = time.perf_counter() - start
+        print(f"{f'{channels} ch x {hours} h':>16} {t_full * 1000:>16.0f} {t_span * 1000:>13.1f} {t_cached * 1000:>7.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Compares growing the plot buffers with hstack/append against the shared ring buffer.
+
+Every consumer used to keep its own copy of the last n_plot samples and rebuild it for
+each block. With the ring buffer the block is written once and each consumer only takes
+a view.
+
+Run from the GUI folder: python benchmarks/ring_buffer_benchmark.py"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from utils.ring_buffer import RingBuffer
+
+N_BLOCKS = 2000
+N_CONSUMERS = 3  # time series, FFT and topography plots
+
+def hstack_consumers(blocks, window):
+    buffers = [(np.empty((9, 0)), np.empty((0,))) for _ in range(N_CONSUMERS)]
+    for samples, timestamps in blocks:
+        buffers = [(np.hstack((data, samples))[:, -window:], np.append(stamps, timestamps)[-window:])
+                   for data, stamps in buffers]
+    return buffers[0][0]
+
+def ring_consumers(blocks, window):
+    ring = RingBuffer(9, max(window, 4096))
+    readers = [ring.reader() for _ in range(N_CONSUMERS)]
+    for samples, timestamps in blocks:
+        ring.write(samples, timestamps)
+        for reader in readers:
+            reader.seek_end()
+            views = reader.window(window)
+    return views[0]
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"{'samples/block':>14} {'window':>7} {'hstack (s)':>11} {'ring (s)':>9} {'speedup':>8}")
+    for block_size in (1, 5, 25):
+        blocks = [(rng.standard_normal((9, block_size)), np.arange(block_size) + i * block_size)
+                  for i in range(N_BLOCKS)]
+        for window in (500, 2000, 4000):
+            start = time.perf_counter()
+            expected = hstack_consumers(blocks, window)
+            t_hstack = time.perf_counter() - start
+
+            start = time.perf_counter()
+            result = ring_consumers(blocks, window)
+            t_ring = time.perf_counter() - start
+
+            assert np.allclose(result, expected, atol=1e-6)
+            print(f"{block_size:>14} {window:>7} {t_hstack:>11.4f} {t_ring:>9.4f} {t_hstack / t_ring:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Compares the scalar SDED functions with the multi-channel FixedSDED and DualSDED.
+
+The scalar path is how the detector used to run: a Python loop over channels calling
+apply_sded_fixed or apply_sded_dual once per sample, with the state kept in lists. The
+multi-channel detectors keep the state in arrays and run a block of every channel in one
+call, compiled with numba. Reported is the throughput in samples/sec (channels x samples)
+at 8, 16 and 32 channels, in 25 sample blocks.
+
+Run from the GUI folder: python benchmarks/sded_benchmark.py"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from utils import adaptive
+from utils.adaptive import FixedSDED, DualSDED
+
+N_SAMPLES = 5000
+BLOCK_SIZE = 25
+
+def apply_sded_fixed(x, eff_dc, alpha, delta):
+    """One fixed threshold SDED step as the detector ran it per sample."""
+    meas = np.abs(x - eff_dc)
+    alpha_red = alpha/2
+    if meas > delta:
+        new_eff_dc = alpha_red * (x + eff_dc) / 2 + (1 - alpha_red) * eff_dc
+        spike = 1 if x > 5000 else 0
+    else:
+        new_eff_dc = alpha * x + (1 - alpha) * eff_dc
+        spike = 0
+    return new_eff_dc, meas, spike
+
+def apply_sded_dual(x, eff_mean, eff_std, alpha, delta_min, delta_max, t, gamma0_min, gamma0_max, desired, mode, q, max_cap):
+    """One dual threshold SDED step as the detector ran it per sample."""
+    meas = abs(x - eff_mean)
+    spike = 1 if (meas > delta_min and meas < delta_max) else 0
+
+    # slower mean and std estimates on spikes
+    alpha_eff = alpha / q if spike == 1 else alpha
+    new_eff_mean = alpha_eff * x + (1 - alpha_eff) * eff_mean
+    new_eff_std = (alpha_eff * meas**2 + (1 - alpha_eff) * eff_std**2)**(1/2)
+
+    new_delta_min, new_delta_max, new_t = delta_min, delta_max, t
+    if mode == 'adaptive':
+        gamma_min = gamma0_min / (1 + t)
+        gamma_max = gamma0_max / (1 + t)
+        if desired == 1 and spike == 0:
+            # missed positive, the violated bound moves toward meas
+            new_t += 1
+            if meas <= delta_min:
+                new_delta_min = delta_min + gamma_min * (meas - delta_min)
+            else:
+                new_delta_max = delta_max + gamma_max * (meas - delta_max)
+        elif desired == 0 and spike == 1:
+            # false positive, the nearer bound moves toward meas
+            new_t += 1
+            if abs(delta_min - meas) < abs(delta_max - meas):
+                new_delta_min = delta_min + gamma_min * (meas - delta_min)
+            else:
+                new_delta_max = delta_max + gamma_max * (meas - delta_max)
+        new_delta_min = max(0.0, new_delta_min)
+        new_delta_max = min(max_cap, new_delta_max)
+        # a band that would invert keeps the previous thresholds
+        if new_delta_min >= new_delta_max:
+            new_delta_min, new_delta_max = delta_min, delta_max
+
+    return new_eff_mean, new_eff_std, new_delta_min, new_delta_max, new_t, meas, spike
+
+def scalar_fixed(data, desired):
+    eff_dc, delta = [0.0] * data.shape[0], [1000] * data.shape[0]
+    for i in range(data.shape[1]):
+        for ch in range(data.shape[0]):
+            eff_dc[ch], _, _ = apply_sded_fixed(data[ch, i], eff_dc[ch], 0.1, delta[ch])
+
+def scalar_dual(data, desired):
+    channels = data.shape[0]
+    eff_mean, eff_std, delta_min, delta_max, t = [0.0] * channels, [0.0] * channels, [500] * channels, [6000] * channels, [0] * channels
+    for i in range(data.shape[1]):
+        for ch in range(channels):
+            eff_mean[ch], eff_std[ch], delta_min[ch], delta_max[ch], t[ch], _, _ = apply_sded_dual(
+                data[ch, i], eff_mean[ch], eff_std[ch], 0.1, delta_min[ch], delta_max[ch], t[ch],
+                1, 1, desired[i], 'adaptive', 2, 19000)
+
+def block_fixed(data, desired):
+    sded = FixedSDED(data.shape[0], 0.1, 1000)
+    for start in range(0, data.shape[1], BLOCK_SIZE):
+        sded.process(data[:, start:start + BLOCK_SIZE])
+
+def block_dual(data, desired):
+    sded = DualSDED(data.shape[0], 0.1, 500, 6000)
+    for start in range(0, data.shape[1], BLOCK_SIZE):
+        sded.process(data[:, start:start + BLOCK_SIZE], desired[start:start + BLOCK_SIZE])
+
+def main():
+    print(f"numba: {'yes' if adaptive.numba is not None else 'no, plain Python kernels'}")
+    print(f"{'channels':>8} {'variant':>8} {'scalar (samples/s)':>19} {'block (samples/s)':>18}")
+    rng = np.random.default_rng(0)
+    desired = (rng.random(N_SAMPLES) > 0.9).astype(int)
+    # the first call compiles the kernels, keep it out of the timings
+    block_fixed(np.zeros((8, BLOCK_SIZE)), desired)
+    block_dual(np.zeros((8, BLOCK_SIZE)), desired)
+    for channels in (8, 16, 32):
+        data = rng.normal(0, 3000, (channels, N_SAMPLES))
+        for variant, methods in (("fixed", (scalar_fixed, block_fixed)), ("dual", (scalar_dual, block_dual))):
+            rates = []
+            for method in methods:
+                start = time.perf_counter()
+                method(data, desired)
+                rates.append(data.size / (time.perf_counter() - start))
+            print(f"{channels:>8} {variant:>8} {rates[0]:>19,.0f} {rates[1]:>18,.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Compares the real-time spectrum computed per plot and frame with the shared SpectralEngine.
+
+The FFT and Polar FFT plots used to take the newest second of their buffer and run a
+Hamming windowed rfft on every animation frame, each plot on its own, so the cost grew
+with the frame rate and the number of spectrum plots. The SpectralEngine computes once per
+hop of new samples and both plots reuse the result, so its cost only depends on the sample
+rate. Reported is the CPU time spent on spectra per second of streamed data, with both
+plots open, for a stream of 20 ms blocks at 250 Hz. Drawing is not included.
+
+Run from the GUI folder: python benchmarks/spectral_benchmark.py"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from utils.ring_buffer import RingBuffer
+from utils.spectral import SpectralEngine, spectrum
+
+FS = 250
+BLOCK_SIZE = 5  # samples in a 20 ms block at 250 Hz
+SECONDS = 10
+PLOTS = 2  # FFT and Polar FFT
+
+def stream(frame_rate, compute):
+    """Streams SECONDS of data into a ring and calls compute PLOTS times per frame.
+
+    :return float: Milliseconds spent in compute per second of data."""
+    rng = np.random.default_rng(0)
+    ring = RingBuffer(9, 4096)
+    ring.write(rng.standard_normal((9, 4 * FS)).astype(np.float32), np.zeros(4 * FS))
+    state = compute(ring, None)
+    frames_per_block = frame_rate * BLOCK_SIZE / FS
+    frames = 0.0
+    spent = 0.0
+    for _ in range(SECONDS * FS // BLOCK_SIZE):
+        ring.write(rng.standard_normal((9, BLOCK_SIZE)).astype(np.float32), np.zeros(BLOCK_SIZE))
+        frames += frames_per_block
+        while frames >= 1:
+            frames -= 1
+            start = time.perf_counter()
+            for _ in range(PLOTS):
+                compute(ring, state)
+            spent += time.perf_counter() - start
+    return spent / SECONDS * 1e3
+
+def per_frame(ring, state):
+    if state is None:
+        return ring
+    samples, _ = ring.latest(FS)
+    spectrum(samples[:8], FS)
+
+def engine(segments, wisdom_path):
+    def compute(ring, state):
+        if state is None:
+            return SpectralEngine(ring, FS, segments=segments, wisdom_path=wisdom_path)
+        state.update()
+    return compute
+
+def main():
+    with tempfile.TemporaryDirectory() as folder:
+        wisdom_path = os.path.join(folder, "wisdom.pkl")
+        methods = {"per frame": per_frame, "engine": engine(1, wisdom_path), "engine, Welch x4": engine(4, wisdom_path)}
+        print(f"{'frames/s':>8} " + " ".join(f"{name + ' (ms/s)':>22}" for name in methods))
+        for frame_rate in (30, 60, 120, 500):
+            times = [stream(frame_rate, method) for method in methods.values()]
+            print(f"{frame_rate:>8} " + " ".join(f"{t:>22.2f}" for t in times))
+
+if __name__ == "__main__":
+    main()
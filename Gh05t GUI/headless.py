@@ -0,0 +1,218 @@
+"""Headless acquisition daemon: source -> filter -> detector -> recorder and WebSocket labels.
+
+Runs the same acquisition sources, processing pipeline, recorder and label WebSocket as
+the GUI, without loading Qt widgets, matplotlib or MNE. Only QtCore is used, for the
+source threads and their signals.
+
+Options come from the command line, from an INI file given with --config, or both (the
+command line wins). The file has one [headless] section whose keys are the long option
+names, e.g.
+
+    [headless]
+    source = ble
+    filter = Band Pass
+    freq = 5 30
+    detect = true
+    record = data/raw_data.bin
+    websocket_port = 4242
+
+Run from this folder: python headless.py --source synthetic --duration 10"""
+import argparse
+import configparser
+import logging
+import signal
+import sys
+import time
+from PyQt5.QtCore import QCoreApplication, QTimer
+from utils.acquisition import SOURCES, available_sources, create_source
+from utils.dsp import EMGDetector
+from utils.processing import ProcessingWorker
+from utils.ring_buffer import RingBuffer
+from utils.telemetry import format_link_stats
+
+RING_CAPACITY = 4096  # processed samples kept in the session buffer
+CHANNEL_NAMES = [f"Ch{i + 1}" for i in range(8)]
+
+logging.basicConfig(level=logging.INFO)
+headless_logger = logging.getLogger("headless")
+
+class DiscardRecorder:
+    """Stands in for FileHandler when nothing is recorded."""
+    def add_data(self, timestamps, channels, labels=None):
+        pass
+
+    def add_band_power(self, timestamp, powers):
+        pass
+
+def find_source(name):
+    """Looks up a registered source by its full name or the start of it, case-insensitive.
+
+    :param name: E.g. "ble", "serial" or "WebSocket (Low Cost)".
+
+    :return str: The registered source name."""
+    matches = [source for source in available_sources() if source.lower().startswith(name.lower())]
+    if len(matches) != 1:
+        raise ValueError(f"Unknown or ambiguous source '{name}', choose from: {', '.join(available_sources())}")
+    return matches[0]
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Record EEG and broadcast labels without the GUI.")
+    parser.add_argument('--config', help="INI file with a [headless] section of option defaults")
+    parser.add_argument('--source', default="ble", help="Acquisition source: ble, websocket, serial or synthetic")
+    parser.add_argument('--serial-port', help="Serial port for the serial source")
+    parser.add_argument('--filter', choices=["Low Pass", "High Pass", "Band Pass", "Notch"], help="Real-time filter")
+    parser.add_argument('--freq', type=float, nargs='+', default=[5, 30], help="Filter frequency or band in Hz")
+    parser.add_argument('--band-power', action='store_true', help="Track delta to gamma band powers, recorded and broadcast")
+    parser.add_argument('--track', type=float, nargs='+', default=[], help="Frequencies in Hz whose magnitudes are broadcast")
+    parser.add_argument('--detect', action='store_true', help="Run the EMG detector and label its detections")
+    parser.add_argument('--dsp-process', action='store_true', help="Run the processing in a separate process")
+    parser.add_argument('--record', help="Raw binary file to record to, nothing is recorded if not given")
+    parser.add_argument('--export', help="CSV file to export the recording to on exit")
+    parser.add_argument('--websocket-port', type=int, default=4242, help="Port of the label WebSocket, 0 to disable")
+    parser.add_argument('--duration', type=float, default=0, help="Seconds to run, 0 runs until interrupted")
+    parser.add_argument('--stats-interval', type=float, default=10, help="Seconds between status lines, 0 to disable")
+    return parser
+
+def load_config(parser, path):
+    """Sets the parser defaults from the [headless] section of an INI file.
+
+    :param parser: The argparse parser.
+    :param path: Path to the INI file."""
+    config = configparser.ConfigParser()
+    if not config.read(path):
+        parser.error(f"cannot read config file {path}")
+    section = config["headless"] if config.has_section("headless") else {}
+
+    actions = {action.dest: action for action in parser._actions}
+    defaults = {}
+    for key, value in section.items():
+        dest = key.replace('-', '_')
+        if dest not in actions:
+            parser.error(f"unknown option '{key}' in {path}")
+        action = actions[dest]
+        if isinstance(action, argparse._StoreTrueAction):
+            defaults[dest] = section.getboolean(key)
+        elif action.nargs == '+':
+            defaults[dest] = [action.type(v) for v in value.split()]
+        else:
+            defaults[dest] = action.type(value) if action.type else value
+    parser.set_defaults(**defaults)
+
+def parse_args(argv=None):
+    parser = build_parser()
+    args, _ = parser.parse_known_args(argv)
+    if args.config:
+        load_config(parser, args.config)
+    return parser.parse_args(argv)
+
+class HeadlessSession:
+    """Wires an acquisition source to the processing pipeline, the recorder and the label WebSocket."""
+
+    def __init__(self, args):
+        """Creates and starts every part of the session.
+
+        :param args: The parsed options."""
+        self.args = args
+        name = find_source(args.source)
+        source_class = SOURCES[name]
+
+        self.file_handler = None
+        if args.record:
+            from utils.file_handler import FileHandler
+            self.file_handler = FileHandler(args.record)
+        self.ws_server = None
+        if args.websocket_port:
+            from utils.websocket_handler import WebSocketServer
+            self.ws_server = WebSocketServer(args.websocket_port)
+
+        if args.dsp_process:
+            from utils.dsp_process import DSPProcess, create_shared_ring
+            self.ring = create_shared_ring(9, RING_CAPACITY)
+            processor_class = DSPProcess
+        else:
+            self.ring = RingBuffer(9, RING_CAPACITY)
+            processor_class = ProcessingWorker
+        self.processor = processor_class(self.ring, self.file_handler or DiscardRecorder(), self.ws_server,
+                                         source_class.sample_rate, source_class.adc_scale, source_class.channel_count)
+        if args.filter:
+            self.processor.set_filter(args.filter, args.freq)
+        if args.band_power:
+            self.processor.set_band_power(True)
+        if args.track:
+            self.processor.set_tracked_frequencies(args.track)
+        if args.detect:
+            # detections are broadcast as labels, like applying the model in the GUI
+            self.processor.set_labeling_mode(True)
+            self.processor.set_model(EMGDetector(source_class.sample_rate), 1)
+        self.processor.start()
+
+        options = {"port": args.serial_port} if args.serial_port else {}
+        self.source = create_source(name, **options)
+        self.source.data_received.connect(self.processor.submit)
+        self.source.status_update_signal.connect(lambda message: headless_logger.info(message))
+        self.source.connection_failed_signal.connect(self.handle_connection_failed)
+        self.source.telemetry_signal.connect(self.update_link_telemetry)
+        self.link_stats = None
+        self.start_time = time.perf_counter()
+        self.exit_code = 0
+        headless_logger.info(f"Starting {name}")
+        self.source.start()
+
+    def update_link_telemetry(self, stats):
+        self.link_stats = stats
+
+    def report(self):
+        """Logs a status line."""
+        elapsed = time.perf_counter() - self.start_time
+        line = f"{elapsed:.0f} s | {self.ring.head} samples"
+        if self.link_stats is not None:
+            line += " | " + format_link_stats(self.link_stats)
+        headless_logger.info(line)
+
+    def handle_connection_failed(self):
+        headless_logger.error("Connection failed, stopping")
+        self.exit_code = 1
+        QCoreApplication.instance().quit()
+
+    def stop(self):
+        """Stops the source and the processing, then finishes the recording and export."""
+        self.source.stop()
+        self.processor.stop()
+        self.report()
+        self.ring.close()
+        if self.ws_server is not None:
+            self.ws_server.stop()
+        if self.file_handler is not None:
+            self.file_handler.stop()
+            if self.args.export:
+                self.file_handler.export_data(self.args.export, CHANNEL_NAMES, mode='full')
+
+def main(argv=None):
+    args = parse_args(argv)
+    app = QCoreApplication(sys.argv[:1])
+    try:
+        session = HeadlessSession(args)
+    except ValueError as e:
+        headless_logger.error(e)
+        return 2
+
+    # Ctrl+C and SIGTERM quit the event loop, the timer gives Python a chance to run the handler
+    signal.signal(signal.SIGINT, lambda *_: app.quit())
+    signal.signal(signal.SIGTERM, lambda *_: app.quit())
+    wakeup = QTimer()
+    wakeup.timeout.connect(lambda: None)
+    wakeup.start(200)
+
+    if args.stats_interval:
+        stats_timer = QTimer()
+        stats_timer.timeout.connect(session.report)
+        stats_timer.start(int(args.stats_interval * 1000))
+    if args.duration:
+        QTimer.singleShot(int(args.duration * 1000), app.quit)
+
+    app.exec_()
+    session.stop()
+    return session.exit_code
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,14 +4,23 @@ from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QFileDialog, 
     QStatusBar, QMenu, QAction, QGridLayout, QSplitter, QShortcut
 )
-from PyQt5.QtCore import Qt, QTimer, QSettings, QEvent, QCoreApplication, QThread
+from PyQt5.QtCore import Qt, QTimer, QSettings, QEvent, QCoreApplication
 from PyQt5.QtGui import QFont, QPixmap, QColor, QPalette, QFontDatabase, QKeySequence
 import numpy as np
 import socket
 import asyncio
-import time
 from threading import Thread
-from utils import PlotManager, EEGWebSocket, WebSocketServer, load_file, export_data_from_import, BLEWorker, SignalProcessingWindow, FileHandler
+from utils import PlotManager, WebSocketServer, load_file, export_data_from_import, SignalProcessingWindow, FileHandler, ProcessingWorker, FileFilterWorker
+from utils.acquisition import SOURCES, available_sources, create_source
+from utils.telemetry import format_link_stats
+from utils.ring_buffer import RingBuffer
+from utils.dsp_process import DSPProcess, create_shared_ring
+from utils.dsp import FilterCache
+from utils.spectral import SpectralEngine
+
+RING_CAPACITY = 4096  # samples kept for the plots, must cover PlotManager.n_plot
+FRAME_INTERVAL_MS = 33  # how often the plots pull a new snapshot of the session buffer
+WELCH_SEGMENTS = 4  # half-overlapping 1 s segments averaged by the smoothed real-time spectrum
 
 def get_local_ip():
     try:
@@ -81,15 +90,34 @@ class MainWindow(QMainWindow):
 
         self.real_time_input_menu = QMenu("Real-Time Input", self)
 
-        self.ble_action = QAction("BLE (ADS1299 PCB)", self)
-        self.websocket_action = QAction("WebSocket (Low Cost)", self)
-        self.real_time_input_menu.addAction(self.ble_action)
-        self.real_time_input_menu.addAction(self.websocket_action)
+        # one entry per registered acquisition source
+        self.source_actions = {}
+        for name in available_sources():
+            action = QAction(name, self)
+            action.triggered.connect(lambda checked, name=name: self.start_source(name))
+            self.real_time_input_menu.addAction(action)
+            self.source_actions[name] = action
+
+        # optional out-of-process DSP, so filtering and detection do not share the GIL with rendering
+        self.real_time_input_menu.addSeparator()
+        self.dsp_process_action = QAction("Run DSP in Separate Process", self)
+        self.dsp_process_action.setCheckable(True)
+        self.dsp_process_action.setChecked(QSettings("GH05T", "Processing").value("dsp_process", "False") == "True")
+        self.dsp_process_action.toggled.connect(lambda checked: QSettings("GH05T", "Processing").setValue("dsp_process", str(checked)))
+        self.real_time_input_menu.addAction(self.dsp_process_action)
+        self.welch_action = QAction("Smooth Spectrum (Welch)", self)
+        self.welch_action.setCheckable(True)
+        self.welch_action.setChecked(QSettings("GH05T", "Processing").value("welch", "False") == "True")
+        self.welch_action.toggled.connect(self.set_welch)
+        self.real_time_input_menu.addAction(self.welch_action)
+        self.band_power_action = QAction("Band Power Features", self)
+        self.band_power_action.setCheckable(True)
+        self.band_power_action.setChecked(QSettings("GH05T", "Processing").value("band_power", "False") == "True")
+        self.band_power_action.toggled.connect(self.set_band_power)
+        self.real_time_input_menu.addAction(self.band_power_action)
 
         self.data_input_menu.addMenu(self.real_time_input_menu)
         self.file_input_action.triggered.connect(self.handle_file_input)
-        self.ble_action.triggered.connect(self.handle_real_time_ble_input)
-        self.websocket_action.triggered.connect(self.websocket_input)
 
         self.data_input_button.setMenu(self.data_input_menu)
 
@@ -168,7 +196,7 @@ class MainWindow(QMainWindow):
         self.add_plot_menu = QMenu(self)
         self.add_plot_menu.setCursor(Qt.PointingHandCursor)
 
-        plot_types = ["Time Series", "Polar FFT", "FFT", "Head Topography"]
+        plot_types = ["Time Series", "Polar FFT", "FFT", "Head Topography", "Band Power"]
         for plot_type in plot_types:
             action = QAction(plot_type, self)
             action.setCheckable(True)
@@ -195,6 +223,7 @@ class MainWindow(QMainWindow):
                                                     height: 12px;
                                                 }""")
 
+        self.plot_actions["Band Power"].setVisible(False)  # band powers are only tracked in real time
         self.add_plot_button.setMenu(self.add_plot_menu)
         row2.addWidget(self.add_plot_button)
 
@@ -251,12 +280,15 @@ class MainWindow(QMainWindow):
         self.animation_index = 0
         self.status_bar.showMessage("Waiting for data input...")
         self.status_bar.setFixedHeight(30)
+        self.link_label = QLabel("")
+        self.link_label.setStyleSheet("color: white; padding-right: 8px;")
+        self.status_bar.addPermanentWidget(self.link_label)
+        self.link_stats = None
 
         self.animation_timer = QTimer(self)
 
         self.data_loaded = False
-        self.ble_reading = False
-        self.websocket_reading = False
+        self.source = None
         self.play_animation = False
         self.play_rt_animation = False
         self.paused_rt = False
@@ -280,8 +312,11 @@ class MainWindow(QMainWindow):
         self.shortcutT.activated.connect(self.pressT)
 
         # signal processing window info
-        self.filter_type = None
-        self.freq_range = []
+        self.filter_stages = []  # [(filter_type, freq_range), ...] applied in real time
+        self.tracked_frequencies = []  # frequencies in Hz whose magnitudes are broadcast in real time
+        self.original_data = None  # loaded file before filtering, kept to clear the filter
+        self.file_filter = None  # FileFilterWorker filtering the loaded file
+        self.filter_cache = None  # FilterCache of the loaded file, filtered views by filter setting
         self.model = None
         self.model_path = None
         self.labeling_mode = False
@@ -290,9 +325,11 @@ class MainWindow(QMainWindow):
         self.apply_model = False
         self.default_model = 0
         self.labeled_data = False
-        self.data_buffer = None
-
-        self.start_time_label = 0
+        self.ring_buffer = None
+        self.spectral = None  # SpectralEngine of the session, shared by the FFT and Polar FFT plots
+        self.processor = None
+        self.frame_timer = QTimer(self)
+        self.frame_timer.timeout.connect(self.refresh_real_time)
 
         # websocket api for labels
         self.ws_server = WebSocketServer(4242)
@@ -307,86 +344,126 @@ class MainWindow(QMainWindow):
 
     def handle_file_input(self):
         '''Opens a file dialog to upload data from a file.'''
-        if self.ble_reading:
-            self.ble_worker.disconnect()
+        self.stop_source()
 
         file_path, _ = QFileDialog.getOpenFileName(self, "Select EDF File", "", "EDF Files (*.edf);;All Files (*)")
         if file_path:
             self.row2_widget.setVisible(True)
+            self.plot_actions["Band Power"].setVisible(False)
             self.statusBar().showMessage(f"Selected file: {file_path}")
+            self.cancel_file_filter()
+            self.original_data = None
+            self.filter_cache = None
             self.data, self.time, self.channel_names, self.sampling_rate = load_file(file_path)
             self.plot_manager.sampling_rate = self.sampling_rate
 
             self.clear_layout(self.row3_layout)
             self.data_loaded = True
 
-    def websocket_input(self):
-        '''Connects to Websocket port.'''
-        if self.ble_reading:
-            self.ble_worker.disconnect()
-
-        if not hasattr(self, 'web_socket'):
-            self.clear_layout(self.row3_layout)
-
-            self.real_time = PlotManager(self.row3)
-            self.real_time.sampling_rate = 500
-            self.real_time.web_socket = True
-            self.row3_layout.addWidget(self.real_time.canvas)
-            row_splitter = QSplitter(Qt.Horizontal)
-            row_splitter.addWidget(self.real_time.canvas)
-            self.row3.addWidget(row_splitter)
-
-            self.status_bar.showMessage("Connecting to Web Port...")
-            self.websocket = EEGWebSocket()
-            self.websocket.data_received.connect(self.handle_real_time)
-            self.websocket.start()
+    def start_source(self, name):
+        """Start a registered acquisition source and real-time data handling.
 
-            self.websocket.status_update_signal.connect(self.update_status_bar)
-            self.websocket.connection_failed_signal.connect(self.handle_connection_failed)
-
-            self.websocket_reading = True
-            self.row2_widget.setVisible(True)
+        :param name: The name the source is registered under."""
+        if self.source is not None:
+            return
 
-    def handle_real_time_ble_input(self):
-        """Initialize BLE connection and start real-time data handling."""
-        if not hasattr(self, 'ble_worker'):
-            self.clear_layout(self.row3_layout)
-            
-            self.real_time = PlotManager(self.row3)
-            self.real_time.ble_reading = True
-            self.row3_layout.addWidget(self.real_time.canvas)
-            row_splitter = QSplitter(Qt.Horizontal)
-            row_splitter.addWidget(self.real_time.canvas)
-            self.row3.addWidget(row_splitter)
-
-            self.real_fft = PlotManager(self.row3)
-                
-            self.status_bar.showMessage("Connecting to BLE device...")
-            self.ble_worker = BLEWorker()
-            self.ble_thread = QThread()
-            self.ble_worker.data_received.connect(self.handle_real_time)
-            self.ble_worker.moveToThread(self.ble_thread)
-            self.ble_worker.start()
+        source_class = SOURCES[name]
+        options = source_class.configure(self)
+        if options is None:
+            return
 
-            self.play_button.setText("Stop Data Stream")
+        self.clear_layout(self.row3_layout)
 
-            self.ble_worker.status_update_signal.connect(self.update_status_bar)
-            self.ble_worker.connection_failed_signal.connect(self.handle_connection_failed)
-        
-            self.ble_reading = True
-            self.row2_widget.setVisible(True)
+        self.sampling_rate = source_class.sample_rate
+        # one buffer per session: 8 channel rows and a label row, read by every plot
+        use_dsp_process = self.dsp_process_action.isChecked()
+        if use_dsp_process:
+            self.ring_buffer = create_shared_ring(9, RING_CAPACITY)
+        else:
+            self.ring_buffer = RingBuffer(9, RING_CAPACITY)
+        self.real_time = PlotManager(self.row3)
+        self.real_time.ble_reading = True  # real-time plotting mode
+        self.real_time.attach_buffer(self.ring_buffer)
+        self.real_time.sampling_rate = self.sampling_rate
+        self.spectral = SpectralEngine(self.ring_buffer, self.sampling_rate, segments=self.welch_segments())
+        self.row3_layout.addWidget(self.real_time.canvas)
+        row_splitter = QSplitter(Qt.Horizontal)
+        row_splitter.addWidget(self.real_time.canvas)
+        self.row3.addWidget(row_splitter)
+
+        self.real_fft = PlotManager(self.row3)
+
+        self.status_bar.showMessage(f"Connecting to {name}...")
+        # filtering, detection and recording run on their own thread, the GUI only draws snapshots
+        processor_class = DSPProcess if use_dsp_process else ProcessingWorker
+        self.processor = processor_class(self.ring_buffer, self.file_handler, self.ws_server, self.sampling_rate, source_class.adc_scale, source_class.channel_count)
+        self.processor.set_filter_stages(self.filter_stages)
+        self.processor.set_tracked_frequencies(self.tracked_frequencies)
+        self.processor.set_labeling_mode(self.labeling_mode)
+        self.update_band_power()
+        if self.apply_model:
+            self.processor.set_model(self.signal_processing_window.detector, self.default_model)
+        self.processor.start()
+        self.frame_timer.start(FRAME_INTERVAL_MS)
+
+        self.source = create_source(name, **options)
+        self.source.data_received.connect(self.processor.submit, Qt.DirectConnection)
+        self.source.status_update_signal.connect(self.update_status_bar)
+        self.source.connection_failed_signal.connect(self.handle_connection_failed)
+        self.source.telemetry_signal.connect(self.update_link_telemetry)
+        self.source.start()
+
+        self.play_button.setText("Stop Data Stream")
+        self.row2_widget.setVisible(True)
+
+        if "Time Series" in self.plot_actions:
+            self.plot_actions["Time Series"].setVisible(False)
+        if "FFT" in self.plot_actions:
+            self.plot_actions["FFT"].setVisible(True)
+        if "Polar FFT" in self.plot_actions:
+            self.plot_actions["Polar FFT"].setVisible(True)
+        self.plot_actions["Band Power"].setVisible(True)
+
+    def stop_source(self):
+        """Stop the running acquisition source, if any."""
+        if self.source is not None:
+            self.source.stop()
+            self.source = None
+        if self.processor is not None:
+            self.frame_timer.stop()
+            self.processor.stop()
+            self.processor = None
+            self.ring_buffer.close()
+            self.ring_buffer = None
+            self.spectral = None
+
+    def welch_segments(self):
+        """Number of segments the real-time spectrum averages, 1 unless smoothing is on."""
+        return WELCH_SEGMENTS if self.welch_action.isChecked() else 1
+
+    def set_welch(self, checked):
+        """Turn Welch averaging of the real-time spectrum on or off.
+
+        :param checked: Whether the spectrum is smoothed."""
+        QSettings("GH05T", "Processing").setValue("welch", str(checked))
+        if self.spectral is not None:
+            self.spectral.set_segments(self.welch_segments())
+
+    def set_band_power(self, checked):
+        """Turn the band power features on or off.
+
+        :param checked: Whether band powers are computed, recorded and broadcast."""
+        QSettings("GH05T", "Processing").setValue("band_power", str(checked))
+        self.update_band_power()
+
+    def update_band_power(self):
+        """Run the band power stage while the features are on or the Band Power plot is open."""
+        if self.processor is not None:
+            self.processor.set_band_power(self.band_power_action.isChecked() or "Band Power" in self.active_plots)
 
-            if "Time Series" in self.plot_actions:
-                self.plot_actions["Time Series"].setVisible(not self.ble_reading)
-        
-            if "FFT" in self.plot_actions:
-                self.plot_actions["FFT"].setVisible(True)
-            if "Polar FFT" in self.plot_actions:
-                self.plot_actions["Polar FFT"].setVisible(True)
-    
     def handle_connection_failed(self):
-        """Handle connection failure and update the ble_reading status."""
-        self.ble_reading = False
+        """Handle connection failure and forget the source."""
+        self.stop_source()
 
     def update_status_bar(self, message):
         """Update the status bar with the given message.
@@ -394,98 +471,30 @@ class MainWindow(QMainWindow):
         :param message: The message to display in the status bar."""
         self.statusBar().showMessage(message)
 
-# ------------------- HANDLE REAL TIME INCOMING DATA ------------------- #
-    def handle_real_time(self, timestamp, data):
-        """Process incoming BLE data and update the plot.
-        
-        :param ble_timestamp: The timestamp of the incoming data.
-        :param ble_data: The incoming data."""
-        if data is None:
-            return
+    def update_link_telemetry(self, stats):
+        """Show the latest link quality report next to the status bar.
         
-        new_data = np.array(data).reshape((8, 1)) 
-        if self.websocket_reading:
-            new_data = self.data
-        self.data = new_data
-        self.time = timestamp
-        timestamp_s = timestamp / 1000.0
-        filtered_data = np.zeros((8, 1))
-
-        if self.ble_reading:
-            adc_max_value = 8388607  # 2^23 - 1 for signed 24-bit
-            marray_volt = (new_data / adc_max_value) * 5  # Convert to volts
-            new_data = marray_volt * 1000  # Convert to millivolts
-        elif self.websocket_reading:
-            new_data = data
-            new_data = np.array(new_data).reshape((8, 1))
-            new_data[1:] = 0
-            # adc_max_value = 4095  # 2^12 - 1 for unsigned 12-bit
-            # marray_volt = (new_data / adc_max_value) * 5  # Convert to volts
-            # new_data = marray_volt * 1000  # Convert to millivolts
-        self.data = new_data
-
-        previous_buffer = self.data_buffer.copy() if self.data_buffer is not None else None
-        # store 500 data points for running average -> signal processing
-        if (self.data_buffer is None) or (len(self.data_buffer) == 0):
-            self.data_buffer = np.tile(new_data, (1, 64))
-        elif self.data_buffer.shape[1] < 64:
-            self.data_buffer = np.hstack((self.data_buffer, new_data))
-
-        # Apply filters
-        if self.filter_type is not None:
-            for channel in range(8):
-                sample = new_data[channel, 0]
-                if sample == 0:
-                    continue
-                if self.filter_type in ["Low Pass", "High Pass"]:
-                    cutoff = self.signal_processing_window.freq_range
-                    filtered_sample = self.signal_processing_window.butter_filter(data=np.array([sample]), fs=self.sampling_rate, cutoff=cutoff, btype=self.filter_type.lower().replace(" ", ""), rt=1, channel=channel)
-                elif self.filter_type == "Band Pass":
-                    freq_range = self.signal_processing_window.freq_range
-                    filtered_sample = self.signal_processing_window.butter_filter(data=np.array([sample]), fs=self.sampling_rate, cutoff=freq_range, btype='band', rt=1, channel=channel)
-                elif self.filter_type == "Notch":
-                    notch_freq = self.signal_processing_window.freq_range[0]
-                    filtered_sample = self.signal_processing_window.notch_filter(data=np.array([sample]), freq=notch_freq, fs=self.sampling_rate, rt=1, channel=channel)
-                filtered_data[channel, 0] = filtered_sample[0]
-            self.data = filtered_data
-
-        if self.apply_model and self.default_model:
-            if previous_buffer is not None and previous_buffer.shape[1] >= 500:
-                elapsed_time = time.time() - self.start_time_label
-                # print(elapsed_time)
-                if elapsed_time > 10:
-                    spikes, _ = self.signal_processing_window.detect_emg(new_data, previous_buffer)
-                    if np.any(spikes):
-                        self.label = 1
-                else:
-                    self.signal_processing_window.detect_emg(new_data, previous_buffer, self.label, mode='adaptive')
+        :param stats: The LinkTelemetry snapshot dict, also kept in self.link_stats."""
+        self.link_stats = stats
+        self.link_label.setText(format_link_stats(stats))
 
-        if self.labeling_mode:
-            label = self.label
-            self.file_handler.add_data(timestamp, self.data, label)
-            if self.label == 1 and not self.toggle:
-                self.label = 0 
-            else: 
-                self.label = self.toggle
-            labeled_data = np.vstack((self.data, np.array([[label]])))
-            self.real_time.labeling_mode = True
-
-            # send labels
-            ws_data = {
-                "label": int(label),
-            }
-            self.ws_server.send_data(ws_data)
-        else:
-            labeled_data = self.data
-            self.file_handler.add_data(timestamp, self.data)
-            if self.real_time is not None:
-                self.real_time.labeling_mode = False
+# ------------------- HANDLE REAL TIME INCOMING DATA ------------------- #
+    def refresh_real_time(self):
+        """Pull the newest processed samples into the plots, called at frame rate.
+
+        The blocks themselves are processed by the ProcessingWorker or DSPProcess, so this only copies
+        the plot windows out of the session buffer."""
+        if self.ring_buffer is None or self.ring_buffer.head == 0:
+            return
 
+        labeling_mode = self.processor.labeling_mode
         if self.real_time is not None:
-            self.real_time.handle_real_time_data(labeled_data, timestamp)
+            self.real_time.labeling_mode = labeling_mode
+            self.real_time.handle_real_time_data()
+            self.data, self.time = self.real_time.data_rt, self.real_time.time_buffer
         for plot_type in list(self.active_plots.keys()):
             real_fft, splitter = self.active_plots[plot_type]
-            real_fft.handle_real_time_data(self.data, timestamp)
+            real_fft.handle_real_time_data()
 
         # Start animation if needed
         if not self.play_rt_animation and not self.paused_rt:
@@ -495,7 +504,7 @@ class MainWindow(QMainWindow):
 
     def play_data_stream(self):
         """Start the animation for all applicable plots."""
-        if len(self.active_plots) == 0 and not (self.ble_reading or self.websocket_reading):
+        if len(self.active_plots) == 0 and not (self.source is not None):
             self.statusBar().showMessage("No plots to animate!")
             return
 
@@ -518,7 +527,7 @@ class MainWindow(QMainWindow):
                 plot_mgr.stop_animation()
             self.play_button.setText("Start Data Stream")
             self.play_animation = False
-        elif self.play_rt_animation and (self.ble_reading or self.websocket_reading):
+        elif self.play_rt_animation and (self.source is not None):
             self.statusBar().showMessage("Stopping real-time data stream...")
             self.play_button.setText("Start Data Stream")
             self.real_time.stop_animation()
@@ -526,7 +535,7 @@ class MainWindow(QMainWindow):
                 plot_mgr.stop_animation()
             self.play_rt_animation = False
             self.paused_rt = True
-        elif self.paused_rt and (self.ble_reading or self.websocket_reading):
+        elif self.paused_rt and (self.source is not None):
             self.statusBar().showMessage("Resuming real-time data stream...")
             self.play_button.setText("Stop Data Stream")
             self.real_time.start_rt_animation()
@@ -542,7 +551,7 @@ class MainWindow(QMainWindow):
         file_path, _ = QFileDialog.getSaveFileName(self, "Save File", "", "CSV Files (*.csv)")
         
         if file_path:
-            if self.ble_reading or self.websocket_reading:
+            if self.source is not None:
                 success = self.file_handler.export_data(file_path, self.channel_names, mode='full')
             else: 
                 success = export_data_from_import(file_path, self.data, self.time, self.channel_names)
@@ -554,55 +563,108 @@ class MainWindow(QMainWindow):
     
     def open_signal_processing_window(self):
         """Open the signal processing window and connect its signals"""
-        self.signal_processing_window = SignalProcessingWindow(self, self.ble_reading or self.websocket_reading)
+        self.signal_processing_window = SignalProcessingWindow(self, self.source is not None)
         self.signal_processing_window.update_status_signal.connect(self.update_status_bar)
         self.signal_processing_window.apply_filter_signal.connect(self.apply_filter_to_data)
         self.signal_processing_window.label_signal.connect(self.toggle_labeling_mode)
         self.signal_processing_window.apply_model_signal.connect(self.toggle_model)
+        self.signal_processing_window.track_frequencies_signal.connect(self.track_frequencies)
 
         self.signal_processing_window.exec_()
 
-    def apply_filter_to_data(self, filter_type, freq_range, clear=0):
-        if self.data_loaded and (not self.ble_reading or not self.websocket_reading):
+    def track_frequencies(self, frequencies):
+        """Track the magnitudes of the given frequencies in real time.
+
+        :param frequencies: Frequencies in Hz, empty to stop tracking."""
+        self.tracked_frequencies = list(frequencies)
+        if self.processor is not None:
+            self.processor.set_tracked_frequencies(self.tracked_frequencies)
+
+    def apply_filter_to_data(self, stages, clear=0):
+        """Apply a filter cascade to the loaded file, or switch the real-time filter to it.
+
+        :param stages: List of (filter_type, freq_range) pairs, applied in order.
+        :param clear: 1 to remove the filter."""
+        if self.data_loaded and self.source is None:
+            self.cancel_file_filter()
             if clear == 0:
-                self.signal_processing_window.original_data = self.data
-                if filter_type == "Low Pass":
-                    self.filtered_data = self.signal_processing_window.butter_filter(self.data, self.sampling_rate, [freq_range[0]], btype='low', rt=0)
-                elif filter_type == "High Pass":
-                    self.filtered_data = self.signal_processing_window.butter_filter(self.data, self.sampling_rate, [freq_range[0]], btype='high', rt=0)
-                elif filter_type == "Band Pass":
-                    self.filtered_data = self.signal_processing_window.butter_filter(self.data, self.sampling_rate, freq_range, btype='band', rt=0)
-                elif filter_type == "Notch":
-                    self.filtered_data = self.signal_processing_window.notch_filter(self.data, freq_range[0], self.sampling_rate, rt=0)
-            
-                for plot_mgr, _ in self.active_plots.values():
-                    plot_mgr.data = self.filtered_data
-                self.data = self.filtered_data
-            else:
-                self.data = self.signal_processing_window.original_data
-                for plot_mgr, _ in self.active_plots.values():
-                    plot_mgr.data = self.signal_processing_window.original_data
-                self.signal_processing_window.filtered_data = None
-                self.filter_type = filter_type
+                if self.original_data is None:
+                    self.original_data = self.data
+                if self.filter_cache is None:
+                    self.filter_cache = FilterCache(self.original_data, self.sampling_rate)
+
+                # the plots filter what they show right away, the whole file follows in the background
+                view = self.filter_cache.get(stages)
+                self.show_file_data(view)
+                if view.full is not None:
+                    self.update_status_bar("Filter applied.")
+                    return
+                self.file_filter = FileFilterWorker(view.sos, self.original_data)
+                file_filter = self.file_filter
+                file_filter.progress_signal.connect(lambda percent: self.update_status_bar(f"Filtering... {percent}%"))
+                file_filter.status_update_signal.connect(self.update_status_bar)
+                file_filter.finished_signal.connect(lambda filtered: self.finish_file_filter(file_filter, view, filtered))
+                file_filter.start()
+            elif self.original_data is not None:
+                self.show_file_data(self.original_data)
+                self.original_data = None
+                self.filter_stages = []
         else:
-            if filter_type == "None":
-                self.filter_type = None
-            else:   
-                self.filter_type = filter_type
+            self.filter_stages = [] if clear else list(stages)
+            if self.processor is not None:
+                self.processor.set_filter_stages(self.filter_stages)
+
+    def show_file_data(self, data):
+        """Show the loaded file, filtered or not, in every plot.
+
+        :param data: The recording, an array or a FilteredView."""
+        self.data = data
+        for plot_type, (plot_mgr, _) in self.active_plots.items():
+            plot_mgr.data = data
+            # a playing plot picks the data up with its next frame, the topography averages the whole file
+            if not self.play_animation and plot_type != "Head Topography":
+                plot_mgr.plot_data(data, self.time, self.channel_names, self.sampling_rate, plot_type)
+
+    def finish_file_filter(self, file_filter, view, filtered):
+        """Keep the filtered file once the background filtering is done.
+
+        :param file_filter: The FileFilterWorker that finished.
+        :param view: The FilteredView it filtered for.
+        :param filtered: The filtered recording, or None if the filtering was cancelled or failed."""
+        if filtered is not None:
+            # kept even if another filter was applied meanwhile, switching back is then instant
+            view.full = filtered
+        if file_filter is not self.file_filter:
+            return
+        self.file_filter = None
+        if filtered is not None:
+            self.update_status_bar("Filter applied.")
+
+    def cancel_file_filter(self):
+        """Stop filtering the loaded file, if it is being filtered."""
+        if self.file_filter is not None:
+            self.file_filter.cancel()
+            self.file_filter = None
 
     def pressL(self):
         """Detect L presses."""
         if self.labeling_mode and not self.apply_model:
             self.label = 1
+            if self.processor is not None:
+                self.processor.press_label()
 
     def pressT(self):
         """Detect L presses."""
         if self.labeling_mode:
             self.toggle = not self.toggle
+            if self.processor is not None:
+                self.processor.toggle_label()
 
     def toggle_labeling_mode(self):
         """Toggle the labeling mode."""
         self.labeling_mode = not self.labeling_mode
+        if self.processor is not None:
+            self.processor.set_labeling_mode(self.labeling_mode)
 
     def toggle_model(self, int):
         """Apply the model flag"""
@@ -611,7 +673,9 @@ class MainWindow(QMainWindow):
         if not self.labeling_mode:
             self.labeling_mode = True
 
-        self.start_time_label = time.time()
+        if self.processor is not None:
+            self.processor.set_labeling_mode(self.labeling_mode)
+            self.processor.set_model(self.signal_processing_window.detector if self.apply_model else None, self.default_model)
 
         # if not (self.ble_reading or self.websocket_reading):
         #     if self.default_model:
@@ -660,20 +724,30 @@ class MainWindow(QMainWindow):
             plot_mgr.plot_data(self.data, self.time, self.channel_names, 
                               self.sampling_rate, plot_type)
         elif plot_type in ["Polar FFT", "FFT", "Head Topography"]:
-            if self.ble_reading:
+            if self.source is not None:
                 plot_mgr.real_fft = self.real_fft
                 plot_mgr.ble_reading = True
+                plot_mgr.attach_buffer(self.ring_buffer)
+                plot_mgr.spectral = self.spectral
                 plot_mgr.fft_rt = True
                 plot_mgr.plot_type = plot_type
                 plot_mgr.plot_data(self.data, self.time, self.channel_names, self.sampling_rate, plot_type)
             else:
                 plot_mgr.electrode_placements = self.channel_names
                 plot_mgr.plot_data(self.data, self.time, self.channel_names, self.sampling_rate, plot_type)
+        elif plot_type == "Band Power":
+            if self.source is None:
+                return
+            plot_mgr.ble_reading = True
+            plot_mgr.channel_count = self.processor.channel_count
+            plot_mgr.attach_buffer(self.processor.band_ring)
+            plot_mgr.plot_data(self.data, self.time, self.channel_names, self.sampling_rate, plot_type)
         
         splitter = self.find_or_create_splitter()
         splitter.addWidget(plot_mgr.canvas)
         
         self.active_plots[plot_type] = (plot_mgr, splitter)
+        self.update_band_power()
         self.statusBar().showMessage(f"Added {plot_type} plot")
 
     def remove_plot(self, plot_type):
@@ -695,10 +769,15 @@ class MainWindow(QMainWindow):
             plot_mgr.anim_topography.event_source.stop()
             plot_mgr.anim_topography = None
 
+        if plot_mgr.anim_band_power is not None:
+            plot_mgr.anim_band_power.event_source.stop()
+            plot_mgr.anim_band_power = None
+
         plot_mgr.canvas.setParent(None)
         plot_mgr.canvas.deleteLater()
         
         del self.active_plots[plot_type]
+        self.update_band_power()
         self.statusBar().showMessage(f"Removed {plot_type} plot")
 
     def find_or_create_splitter(self):
@@ -734,13 +813,17 @@ class MainWindow(QMainWindow):
             del self.real_time
             self.real_time = None
         
+        self.cancel_file_filter()
         self.data = np.empty((0, 3))
         self.time = np.empty((0, 1))
+        self.original_data = None
+        self.filter_cache = None
         self.data_loaded = False
-        self.ble_reading = False
-        self.websocket_reading = False
         
         self.row2_widget.setVisible(False)
+        self.plot_actions["Band Power"].setVisible(False)
+        self.link_label.setText("")
+        self.link_stats = None
         self.statusBar().showMessage("Back to Home")
 
         welcome_layout = QHBoxLayout()
@@ -779,13 +862,7 @@ class MainWindow(QMainWindow):
 
         self.row3_layout.addWidget(self.row3)
 
-        if hasattr(self, 'ble_worker'):
-            self.ble_worker.disconnect()
-            self.ble_thread.quit()
-            self.ble_thread.wait(1000)
-        if hasattr(self, 'web_socket'):
-            self.web_socket.stop()
-            del self.web_socket
+        self.stop_source()
         
         # Reset plot checkboxes
         for action in self.plot_actions.values():
@@ -811,12 +888,10 @@ class MainWindow(QMainWindow):
 
     def closeEvent(self, event):
         """Close the window and disconnect the BLE worker."""
-        self.ws_server.stop_server()
+        self.ws_server.stop()
 
-        if self.ble_reading is None:
-            self.ble_worker.disconnect()
-            self.ble_thread.quit()
-            self.ble_thread.wait(1000)
+        self.stop_source()
+        self.cancel_file_filter()
         
         bin_file = "data/raw_data.bin"
         self.file_handler.stop()
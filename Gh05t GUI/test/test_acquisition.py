@@ -0,0 +1,55 @@
+import unittest
+import numpy as np
+from utils.acquisition import BlockAccumulator, AcquisitionSource, available_sources, create_source
+from utils.synthetic_source import SyntheticSource
+
+class TestBlockAccumulator(unittest.TestCase):
+    def test_chunks_are_joined_into_one_block(self):
+        """Test that queued chunks come out as one block in arrival order."""
+        accumulator = BlockAccumulator(interval_ms=60000)
+        for i in range(3):
+            self.assertIsNone(accumulator.add(np.array([i]), np.full((8, 1), i)))
+
+        timestamps, samples = accumulator.flush()
+        self.assertEqual(timestamps.tolist(), [0, 1, 2])
+        self.assertEqual(samples.shape, (8, 3))
+        self.assertEqual(samples[0].tolist(), [0, 1, 2])
+        self.assertIsNone(accumulator.flush())
+
+    def test_zero_interval_releases_every_chunk(self):
+        """Test that an interval of 0 passes each chunk straight through."""
+        accumulator = BlockAccumulator(interval_ms=0)
+        block = accumulator.add(np.array([5, 6]), np.zeros((8, 2)))
+        self.assertEqual(block[0].tolist(), [5, 6])
+
+class TestSourceRegistry(unittest.TestCase):
+    def test_sources_are_registered(self):
+        """Test that every real-time input is registered and declares its format."""
+        names = available_sources()
+        for name in ["BLE (ADS1299 PCB)", "WebSocket (Low Cost)", "Serial (High Performance)", "Synthetic (no device)"]:
+            self.assertIn(name, names)
+        for name in names:
+            source = create_source(name, **({"port": "test"} if name.startswith("Serial") else {}))
+            self.assertIsInstance(source, AcquisitionSource)
+            self.assertGreater(source.sample_rate, 0)
+            self.assertTrue(1 <= source.channel_count <= 8)
+
+    def test_synthetic_source_is_deterministic(self):
+        """Test that the same seed gives the same samples with evenly spaced timestamps."""
+        first, second = SyntheticSource(seed=3), SyntheticSource(seed=3)
+        timestamps, samples = first.generate(250)
+        self.assertEqual(samples.shape, (8, 250))
+        self.assertTrue(np.array_equal(samples, second.generate(250)[1]))
+        self.assertEqual(timestamps[:3].tolist(), [0, 4, 8])
+        self.assertEqual(first.generate(1)[0].tolist(), [1000])
+
+    def test_synthetic_source_stops(self):
+        """Test that stop ends a running source thread."""
+        source = SyntheticSource(realtime=False, block_interval_ms=0)
+        source.start()
+        source.wait(50)
+        source.stop()
+        self.assertTrue(source.isFinished())
+
+if __name__ == "__main__":
+    unittest.main()
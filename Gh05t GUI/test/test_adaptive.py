@@ -0,0 +1,272 @@
+import os
+import ast
+import json
+import unittest
+import numpy as np
+from scipy.signal import lfilter
+from utils.adaptive import FixedSDED, DualSDED, AdaptiveFilter, NLMS, EDNLMS
+from utils.dsp import EMGDetector, Pipeline
+
+NOTEBOOKS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Machine_Learning")
+
+def notebook_functions(notebook, *names):
+    """The functions a Machine_Learning notebook defines, run from its code cells with numpy as np."""
+    path = os.path.join(NOTEBOOKS, notebook)
+    if not os.path.exists(path):
+        raise unittest.SkipTest(f"{notebook} is not in this checkout")
+    with open(path, encoding="utf-8") as f:
+        cells = json.load(f)["cells"]
+    namespace = {"np": np}
+    for cell in cells:
+        if cell["cell_type"] != "code":
+            continue
+        try:
+            tree = ast.parse("".join(cell["source"]))
+        except SyntaxError:  # notebook magics
+            continue
+        functions = [node for node in tree.body if isinstance(node, ast.FunctionDef)]
+        exec(compile(ast.Module(functions, type_ignores=[]), path, "exec"), namespace)
+    return [namespace[name] for name in names]
+
+def spiky_signal(channels, n, seed=0):
+    """Noise around a slow drift with bursts well above the spike level."""
+    rng = np.random.default_rng(seed)
+    data = rng.normal(0, 800, (channels, n)) + 2000 * np.sin(np.arange(n) / 40)
+    bursts = rng.random((channels, n)) > 0.95
+    data[bursts] += rng.normal(8000, 3000, bursts.sum())
+    return data
+
+def apply_sded_fixed(x, eff_dc, alpha, delta):
+    """One fixed threshold SDED step as the detector ran it per sample, the reference for FixedSDED."""
+    meas = np.abs(x - eff_dc)
+    alpha_red = alpha/2
+    if meas > delta:
+        new_eff_dc = alpha_red * (x + eff_dc) / 2 + (1 - alpha_red) * eff_dc
+        spike = 1 if x > 5000 else 0
+    else:
+        new_eff_dc = alpha * x + (1 - alpha) * eff_dc
+        spike = 0
+    return new_eff_dc, meas, spike
+
+def apply_sded_adaptive(x, eff_dc, alpha_dc, alpha_delta, delta):
+    """One adaptive threshold SDED step as the detector ran it per sample, the reference for FixedSDED."""
+    meas = np.abs(x - eff_dc)
+    alpha_dc_red = alpha_dc/2
+    alpha_delta_red = alpha_delta/2
+    if meas > delta:
+        new_delta = (alpha_delta_red * meas**2 + (1 - alpha_delta_red) * delta**2)**(1/2)
+        spike = 1 if x > 5000 else 0
+        new_eff_dc = alpha_dc_red * (x + eff_dc)/2 + (1 - alpha_dc_red) * eff_dc
+    else:
+        new_delta = (alpha_delta * meas**2 + (1 - alpha_delta) * delta**2)**(1/2)
+        spike = 0
+        new_eff_dc = alpha_dc * x + (1 - alpha_dc) * eff_dc
+    return new_eff_dc, new_delta, meas, spike
+
+def apply_sded_dual(x, eff_mean, eff_std, alpha, delta_min, delta_max, t, gamma0_min, gamma0_max, desired, mode, q, max_cap):
+    """One dual threshold SDED step as the detector ran it per sample, the reference for DualSDED."""
+    meas = abs(x - eff_mean)
+    spike = 1 if (meas > delta_min and meas < delta_max) else 0
+
+    # slower mean and std estimates on spikes
+    alpha_eff = alpha / q if spike == 1 else alpha
+    new_eff_mean = alpha_eff * x + (1 - alpha_eff) * eff_mean
+    new_eff_std = (alpha_eff * meas**2 + (1 - alpha_eff) * eff_std**2)**(1/2)
+
+    new_delta_min, new_delta_max, new_t = delta_min, delta_max, t
+    if mode == 'adaptive':
+        gamma_min = gamma0_min / (1 + t)
+        gamma_max = gamma0_max / (1 + t)
+        if desired == 1 and spike == 0:
+            # missed positive, the violated bound moves toward meas
+            new_t += 1
+            if meas <= delta_min:
+                new_delta_min = delta_min + gamma_min * (meas - delta_min)
+            else:
+                new_delta_max = delta_max + gamma_max * (meas - delta_max)
+        elif desired == 0 and spike == 1:
+            # false positive, the nearer bound moves toward meas
+            new_t += 1
+            if abs(delta_min - meas) < abs(delta_max - meas):
+                new_delta_min = delta_min + gamma_min * (meas - delta_min)
+            else:
+                new_delta_max = delta_max + gamma_max * (meas - delta_max)
+        new_delta_min = max(0.0, new_delta_min)
+        new_delta_max = min(max_cap, new_delta_max)
+        # a band that would invert keeps the previous thresholds
+        if new_delta_min >= new_delta_max:
+            new_delta_min, new_delta_max = delta_min, delta_max
+
+    return new_eff_mean, new_eff_std, new_delta_min, new_delta_max, new_t, meas, spike
+
+class TestSDED(unittest.TestCase):
+    def setUp(self):
+        self.data = spiky_signal(4, 600)
+
+    def test_fixed_matches_scalar_version(self):
+        """Test that the fixed and adaptive threshold variants match the per-sample references bit for bit."""
+        for alpha_delta in (0, 0.1):
+            sded = FixedSDED(4, alpha=0.1, delta=1000, alpha_delta=alpha_delta)
+            results = [sded.process(self.data[:, i:i+50]) for i in range(0, 600, 50)]
+            meas = np.hstack([r[0] for r in results])
+            spikes = np.hstack([r[1] for r in results])
+            self.assertTrue(spikes.any())
+
+            for ch in range(4):
+                eff_dc, delta = 0.0, 1000
+                for i in range(600):
+                    if alpha_delta:
+                        eff_dc, delta, m, spike = apply_sded_adaptive(
+                            self.data[ch, i], eff_dc, 0.1, alpha_delta, delta)
+                    else:
+                        eff_dc, m, spike = apply_sded_fixed(self.data[ch, i], eff_dc, 0.1, delta)
+                    self.assertEqual(m, meas[ch, i])
+                    self.assertEqual(bool(spike), spikes[ch, i])
+                self.assertEqual(eff_dc, sded.eff_dc[ch])
+                self.assertEqual(delta, sded.delta[ch])
+
+    def test_dual_matches_scalar_version(self):
+        """Test that the dual threshold variant matches apply_sded_dual bit for bit, adapting and static."""
+        desired = (np.random.default_rng(1).random(600) > 0.9).astype(int)
+        for mode in ('adaptive', 'static'):
+            sded = DualSDED(4, alpha=0.1, delta_min=2000, delta_max=6000, gamma0_min=1, gamma0_max=0.5)
+            results = [sded.process(self.data[:, i:i+64], desired[i:i+64] if mode == 'adaptive' else None)
+                       for i in range(0, 600, 64)]
+            meas = np.hstack([r[0] for r in results])
+            spikes = np.hstack([r[1] for r in results])
+
+            for ch in range(4):
+                state = (0.0, 0.0, 2000, 6000, 0)
+                for i in range(600):
+                    *state, m, spike = apply_sded_dual(
+                        self.data[ch, i], state[0], state[1], 0.1, state[2], state[3], state[4],
+                        1, 0.5, desired[i], mode, 2, 19000)
+                    self.assertEqual(m, meas[ch, i])
+                    self.assertEqual(bool(spike), spikes[ch, i])
+                self.assertEqual(tuple(state), (sded.eff_mean[ch], sded.eff_std[ch], sded.delta_min[ch],
+                                                sded.delta_max[ch], sded.t[ch]))
+            if mode == 'adaptive':
+                self.assertTrue((sded.t > 0).all())
+            else:
+                self.assertTrue((sded.t == 0).all())
+
+    def test_one_label_for_the_block(self):
+        """Test that a single label applies to every sample of the block."""
+        one, every = DualSDED(4, delta_min=2000, delta_max=6000), DualSDED(4, delta_min=2000, delta_max=6000)
+        one.process(self.data, 1)
+        every.process(self.data, np.ones(600))
+        np.testing.assert_array_equal(one.delta_min, every.delta_min)
+        np.testing.assert_array_equal(one.delta_max, every.delta_max)
+
+class TestNLMS(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(2)
+        self.reference = rng.standard_normal((3, 400))
+        self.data = rng.standard_normal((3, 400))
+
+    def assert_matches_notebook(self, estimate, error, weights, full, *args):
+        """Checks every channel against a notebook's *_filter_full run on that channel alone."""
+        for ch in range(estimate.shape[0]):
+            w_hist, y_hat, _, e_hist = full(*(a[ch] if isinstance(a, np.ndarray) else a for a in args))
+            np.testing.assert_allclose(estimate[ch], y_hat, rtol=1e-9, atol=1e-12)
+            np.testing.assert_allclose(error[ch], e_hist, rtol=1e-9, atol=1e-12)
+            np.testing.assert_allclose(weights[ch], w_hist[-1], rtol=1e-9, atol=1e-12)
+
+    def test_matches_noise_reduction_notebook(self):
+        """Test that a reference channel filter matches the Noise_Reduction notebook, current sample included."""
+        nlms_filter_full, = notebook_functions(os.path.join("signal-preprocessing", "Noise_Reduction.ipynb"), "nlms_filter_full")
+        desired = lfilter([0.5, -0.3, 0.2, 0.1], 1, self.reference) + 0.05 * self.data
+        nlms = NLMS(3, taps=4, mu=2 ** -4, eps=1e-15, delay=0)
+        estimate, error = nlms.process(desired, self.reference)
+        self.assert_matches_notebook(estimate, error, nlms.weights, nlms_filter_full, self.reference, desired, 4, 2 ** -4)
+
+    def test_matches_hlds_notebook(self):
+        """Test that a filter one sample behind its reference matches the HLDS notebook."""
+        nlms_filter_full, = notebook_functions("HLDS.ipynb", "nlms_filter_full")
+        desired = lfilter([0, 1, -0.5], 1, self.reference)
+        nlms = NLMS(3, taps=8, mu=0.5, eps=1e-15, delay=1)
+        results = [nlms.process(desired[:, i:i+50], self.reference[:, i:i+50]) for i in range(0, 400, 50)]
+        estimate, error = np.hstack([r[0] for r in results]), np.hstack([r[1] for r in results])
+        self.assert_matches_notebook(estimate, error, nlms.weights, nlms_filter_full, self.reference, desired, 8, 0.5)
+
+    def test_ednlms_matches_edapa_notebook(self):
+        """Test that EDNLMS predicting each channel from its own past matches the EDAPA notebook."""
+        ednlms_filter_full, = notebook_functions("EDAPA.ipynb", "ednlms_filter_full")
+        signal = 0.5 + 0.3 * np.sin(np.arange(400) / 8) + 0.1 * self.data
+        ednlms = EDNLMS(3, taps=4, mu=0.1, eps=1e-15, delay=1)
+        estimate, error = ednlms.process(signal)
+        self.assertTrue(((estimate > 0) & (estimate < 1)).all())
+        self.assert_matches_notebook(estimate, error, ednlms.weights, ednlms_filter_full, signal, signal, 4, 0.1)
+
+    def test_blocks_match_one_pass(self):
+        """Test that the tap-delay line carries over between blocks, also past its allocated length."""
+        whole = NLMS(3, taps=16, delay=2).process(self.data)[1]
+        nlms = NLMS(3, taps=16, delay=2)
+        sizes = [1, 5, 300, 30, 64]
+        starts = np.cumsum([0] + sizes)
+        blocks = np.hstack([nlms.process(self.data[:, a:b])[1] for a, b in zip(starts[:-1], starts[1:])])
+        np.testing.assert_array_equal(blocks, whole)
+
+    def test_cancels_shared_reference(self):
+        """Test that interference seen by a shared reference channel is removed from every channel."""
+        t = np.arange(2500) / 250
+        hum = np.sin(2 * np.pi * 50 * t)
+        signal = 0.1 * np.random.default_rng(3).standard_normal((2, 2500))
+        data = signal + np.vstack((2 * np.sin(2 * np.pi * 50 * t + 1), -np.sin(2 * np.pi * 50 * t + 2)))
+        _, error = NLMS(2, taps=4, mu=0.1, delay=0).process(data, hum)
+        residual = error[:, -500:] - signal[:, -500:]
+        self.assertLess(np.sqrt(np.mean(residual ** 2)), 0.05)
+
+    def test_reset(self):
+        """Test that a reset filter or detector gives the same results as a new one."""
+        data = spiky_signal(3, 400)
+        for make in (lambda: NLMS(3, taps=8), lambda: EDNLMS(3, taps=8),
+                     lambda: FixedSDED(3, alpha_delta=0.1), lambda: DualSDED(3, delta_min=2000, delta_max=6000)):
+            used = make()
+            used.process(data, np.ones(400)) if isinstance(used, DualSDED) else used.process(data)
+            used.reset()
+            for result, expected in zip(used.process(data), make().process(data)):
+                np.testing.assert_array_equal(result, expected)
+
+    def test_filter_needs_an_output(self):
+        """Test that the base filter, which has no output, cannot be created."""
+        with self.assertRaises(TypeError):
+            AdaptiveFilter(3)
+
+    def test_predicting_itself_needs_a_delay(self):
+        """Test that a channel cannot be its own reference without a delay."""
+        with self.assertRaises(ValueError):
+            NLMS(3, delay=0).process(self.data)
+
+class TestEMGDetector(unittest.TestCase):
+    def test_detection_is_reproducible(self):
+        """Test that two detectors given the same samples find the same spikes, most bursts among them."""
+        data = spiky_signal(8, 1000, seed=4)
+        results = []
+        for _ in range(2):
+            detector = EMGDetector(sampling_rate=100)  # the NLMS stage starts 500 samples in
+            results.append([detector.detect_emg(data[:, i:i+25]) for i in range(0, 1000, 25)])
+        for (spikes, x), (other_spikes, other_x) in zip(*results):
+            np.testing.assert_array_equal(spikes, other_spikes)
+            np.testing.assert_array_equal(x, other_x)
+        spikes = np.hstack([spikes for spikes, _ in results[0]])
+        bursts = data > 5000
+        self.assertGreater((spikes & bursts).sum(), 0.5 * bursts.sum())
+
+    def test_stages_switch_on_sample_count(self):
+        """Test that the default model adapts for its first seconds of samples and then detects, without waiting for them."""
+        data = spiky_signal(8, 2000, seed=5)
+        pipeline = Pipeline(100, 1.0, 8)
+        pipeline.set_labeling_mode(True)
+        detector = EMGDetector()
+        pipeline.set_model(detector, 1)
+        self.assertEqual(detector.sampling_rate, 100)
+        labels = np.hstack([pipeline.process(data[:, i:i+25])[1] for i in range(0, 2000, 25)])
+        self.assertFalse(labels[:1000].any())
+        self.assertTrue(labels[1000:].any())
+
+        pipeline.set_model(detector, 1)
+        self.assertTrue(detector.adapting())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+import struct
+import asyncio
+import unittest
+import numpy as np
+from utils.ble_handler import BLEWorker, EEGBLE, decode_ble_block, decode_packed_frame, is_packed_frame, PACKET_SIZE, PACKED_MAGIC, PACKED_VERSION
+
+def make_packets(n_packets, start=0):
+    """Build n_packets raw 36-byte BLE packets with known contents."""
+    packets = b''
+    for i in range(n_packets):
+        channels = [(start + i) * 10 + ch - 40 for ch in range(8)]
+        packets += struct.pack('<I8i', 1000 + 4 * (start + i), *channels)
+    return packets
+
+def make_packed_frame(base_timestamp, channels):
+    """Build one packed 24-bit frame from an (N, 8) array of signed channel values."""
+    channels = np.asarray(channels)
+    frame = struct.pack('<HBBI', PACKED_MAGIC, PACKED_VERSION, len(channels), base_timestamp)
+    for i, sample in enumerate(channels):
+        frame += struct.pack('<H', 4 * i)
+        frame += b''.join((int(v) & 0xFFFFFF).to_bytes(3, 'big') for v in sample)
+    return frame
+
+class FakeClient:
+    """Stands in for BleakClient and records whether it was shut down."""
+    def __init__(self):
+        self.notifying = True
+        self.connected = True
+
+    async def stop_notify(self, uuid):
+        self.notifying = False
+
+    async def disconnect(self):
+        self.connected = False
+
+class TestBLEDecoder(unittest.TestCase):
+    def test_block_matches_per_packet_decode(self):
+        """Test the block decoder against the per-packet struct decoder."""
+        worker = BLEWorker()
+        raw = make_packets(12)
+        timestamps, channel_data, remainder = decode_ble_block(raw)
+
+        self.assertEqual(timestamps.shape, (12,))
+        self.assertEqual(channel_data.shape, (8, 12))
+        self.assertEqual(remainder, b'')
+        for i in range(12):
+            timestamp, channels = worker.process_ble_data(raw[i*PACKET_SIZE:(i+1)*PACKET_SIZE])
+            self.assertEqual(timestamps[i], timestamp)
+            self.assertEqual(channel_data[:, i].tolist(), channels)
+
+    def test_partial_packet_is_kept(self):
+        """Test that leftover bytes are returned and completed by the next notification."""
+        raw = make_packets(3)
+        timestamps, channel_data, remainder = decode_ble_block(raw[:50])
+        self.assertEqual(timestamps.tolist(), [1000])
+        self.assertEqual(remainder, raw[36:50])
+
+        timestamps, channel_data, remainder = decode_ble_block(remainder + raw[50:])
+        self.assertEqual(timestamps.tolist(), [1004, 1008])
+        self.assertEqual(remainder, b'')
+
+    def test_notification_split_across_packets(self):
+        """Test that the worker reassembles packets split over several notifications."""
+        worker = BLEWorker(block_interval_ms=0)
+        received = []
+        worker.data_received.connect(lambda ts, data: received.append((ts, data)))
+
+        raw = make_packets(5)
+        for i in range(0, len(raw), 20):
+            worker.handle_notification(None, raw[i:i+20])
+
+        timestamps = np.concatenate([ts for ts, _ in received])
+        channel_data = np.hstack([data for _, data in received])
+        self.assertEqual(timestamps.tolist(), [1000, 1004, 1008, 1012, 1016])
+        self.assertEqual(channel_data.shape, (8, 5))
+        self.assertEqual(channel_data[:, -1].tolist(), [4 * 10 + ch - 40 for ch in range(8)])
+        self.assertEqual(len(worker.data_buffer), 0)
+
+    def test_samples_are_emitted_in_blocks(self):
+        """Test that samples are held back until the block interval elapses."""
+        worker = BLEWorker(block_interval_ms=60000)
+        received = []
+        worker.data_received.connect(lambda ts, data: received.append((ts, data)))
+
+        raw = make_packets(10)
+        for i in range(0, len(raw), PACKET_SIZE):
+            worker.handle_notification(None, raw[i:i+PACKET_SIZE])
+        self.assertEqual(received, [])
+
+        worker.flush()
+        self.assertEqual(len(received), 1)
+        self.assertEqual(received[0][1].shape, (8, 10))
+
+    def test_reconnect_restarts_the_stream(self):
+        """Test that after a dropped link a rebooted device is neither counted as loss nor joined to old bytes."""
+        worker = BLEWorker(block_interval_ms=60000)
+        received = []
+        worker.data_received.connect(lambda ts, data: received.append((ts, data)))
+
+        raw = make_packets(3, start=1000)
+        worker.handle_notification(None, raw[:2 * PACKET_SIZE + 10])
+        worker.handle_reconnect()
+        self.assertEqual(len(received), 1)
+        self.assertEqual(len(worker.data_buffer), 0)
+
+        worker.handle_notification(None, make_packets(2))
+        stats = worker.telemetry.snapshot()
+        self.assertEqual(stats["dropped"], 0)
+        self.assertEqual(stats["discontinuities"], 0)
+        self.assertEqual(stats["received"], 4)
+
+    def test_stop_during_connect_closes_the_client(self):
+        """Test that a stop requested while connecting does not leave the new client running."""
+        ble = EEGBLE(lambda sender, data: None)
+        client = FakeClient()
+
+        async def open_connection():
+            # the disconnect ran while the client was still being created
+            ble.stop_requested = True
+            ble.client = client
+            return True
+
+        ble.open_connection = open_connection
+        asyncio.run(ble.connect())
+        self.assertFalse(client.notifying)
+        self.assertFalse(client.connected)
+
+    def test_packed_frame_sign_extension(self):
+        """Test that packed 24-bit values decode to the same signed values, including the extremes."""
+        channels = np.array([[-2**23, 2**23 - 1, -1, 0, 1, -40, 123456, -123456]] * 3)
+        frame = make_packed_frame(2**32 - 4, channels)
+        self.assertTrue(is_packed_frame(frame))
+
+        timestamps, channel_data = decode_packed_frame(frame)
+        self.assertEqual(timestamps.tolist(), [2**32 - 4, 0, 4])
+        self.assertEqual(channel_data.shape, (8, 3))
+        self.assertEqual(channel_data[:, 0].tolist(), channels[0].tolist())
+
+    def test_legacy_packets_are_not_packed_frames(self):
+        """Test that the legacy 36-byte layout is still detected and decoded."""
+        worker = BLEWorker(block_interval_ms=0)
+        received = []
+        worker.data_received.connect(lambda ts, data: received.append((ts, data)))
+
+        self.assertFalse(is_packed_frame(make_packets(1)))
+        worker.handle_notification(None, make_packets(1))
+        worker.handle_notification(None, make_packed_frame(1004, np.full((2, 8), -7)))
+        timestamps = np.concatenate([ts for ts, _ in received])
+        self.assertEqual(timestamps.tolist(), [1000, 1004, 1008])
+        self.assertEqual(received[-1][1][:, -1].tolist(), [-7] * 8)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+import os
+import sys
+import tempfile
+import unittest
+import subprocess
+from headless import find_source, parse_args
+
+class TestHeadless(unittest.TestCase):
+    def test_source_prefix(self):
+        """Test that sources can be named by the start of their registered name."""
+        self.assertEqual(find_source("synth"), "Synthetic (no device)")
+        self.assertEqual(find_source("BLE"), "BLE (ADS1299 PCB)")
+        with self.assertRaises(ValueError):
+            find_source("usb")
+
+    def test_config_file_defaults(self):
+        """Test that the config file sets defaults and the command line overrides them."""
+        with tempfile.NamedTemporaryFile('w', suffix='.ini', delete=False) as f:
+            f.write("[headless]\nsource = serial\nfreq = 8 12\ndetect = true\nwebsocket_port = 0\n")
+        try:
+            args = parse_args(["--config", f.name, "--source", "synthetic"])
+        finally:
+            os.remove(f.name)
+        self.assertEqual(args.source, "synthetic")
+        self.assertEqual(args.freq, [8.0, 12.0])
+        self.assertTrue(args.detect)
+        self.assertEqual(args.websocket_port, 0)
+
+    def test_no_gui_imports(self):
+        """Test that the headless entry point loads neither Qt widgets nor matplotlib."""
+        code = "import sys, headless; print(any(m in sys.modules for m in ('PyQt5.QtWidgets', 'matplotlib', 'mne')))"
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        self.assertEqual(output.stdout.strip(), "False")
+
+if __name__ == '__main__':
+    unittest.main()
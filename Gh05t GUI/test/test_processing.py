@@ -0,0 +1,299 @@
+import time
+import threading
+import unittest
+import numpy as np
+from scipy.signal import butter, iirnotch, lfilter, lfilter_zi, sosfilt, sosfiltfilt
+from utils.dsp import BandPower, FilterBank, FilterCascade, FilterCache, Pipeline, zero_phase_filter
+from utils.processing import ProcessingWorker, FileFilterWorker
+from utils.dsp_process import DSPProcess, create_shared_ring
+from utils.ring_buffer import RingBuffer
+
+class RecordingHandler:
+    """Stands in for FileHandler and keeps what would have been written."""
+    def __init__(self):
+        self.blocks = []
+        self.band_powers = []
+
+    def add_data(self, timestamps, channels, labels=None):
+        self.blocks.append((timestamps, channels, labels))
+
+    def add_band_power(self, timestamp, powers):
+        self.band_powers.append((timestamp, powers))
+
+class RecordingServer:
+    """Stands in for WebSocketServer and keeps the messages."""
+    def __init__(self):
+        self.messages = []
+
+    def send_data(self, data):
+        self.messages.append(data)
+
+class TestFilterBank(unittest.TestCase):
+    def test_blocks_match_one_continuous_filter(self):
+        """Test that filtering block by block keeps the state and skips zero samples."""
+        rng = np.random.default_rng(0)
+        data = rng.standard_normal((8, 300))
+        data[3, 100:150] = 0
+        data[5] = 0
+
+        filter_bank = FilterBank("Low Pass", [30, 35], 250)
+        filtered = np.hstack([filter_bank.process(data[:, i:i+50]) for i in range(0, 300, 50)])
+
+        b, a = butter(5, 30 / 125, btype='lowpass')
+        for channel in (0, 3):
+            mask = data[channel] != 0
+            expected, _ = lfilter(b, a, data[channel, mask], zi=lfilter_zi(b, a))
+            np.testing.assert_allclose(filtered[channel, mask], expected)
+        self.assertTrue(np.all(filtered[3, 100:150] == 0))
+        self.assertTrue(np.all(filtered[5] == 0))
+
+    def test_notch_matches_per_channel_filter(self):
+        """Test that the notch filters every channel like the per-channel (b, a) filter it replaces."""
+        data = np.random.default_rng(1).standard_normal((8, 200))
+        filtered = FilterBank("Notch", [60], 250).process(data)
+
+        b, a = iirnotch(60, 30, 250)
+        for channel in range(8):
+            expected, _ = lfilter(b, a, data[channel], zi=lfilter_zi(b, a))
+            np.testing.assert_allclose(filtered[channel], expected, atol=1e-10)
+
+    def test_high_order_band_stays_stable(self):
+        """Test that a narrow high-order band pass stays bounded where the (b, a) form blows up."""
+        data = np.random.default_rng(2).standard_normal((8, 2500))
+        filter_bank = FilterBank("Band Pass", [8, 9], 250, order=12)
+        zi = filter_bank.zi[:, 0].copy()
+        filtered = filter_bank.process(data)
+
+        b, a = butter(12, [8 / 125, 9 / 125], btype='band')
+        self.assertFalse(np.all(np.abs(lfilter(b, a, data[0])) < 10))
+        self.assertLess(np.abs(filtered).max(), 10)
+        np.testing.assert_allclose(filtered[0], sosfilt(filter_bank.sos, data[0], zi=zi)[0])
+
+class TestFilterCascade(unittest.TestCase):
+    STAGES = [("High Pass", [1, 1]), ("Notch", [60, 60]), ("Band Pass", [5, 30])]
+
+    def test_cascade_matches_stages_in_turn(self):
+        """Test that the fused cascade filters like its stages run one after the other."""
+        data = np.random.default_rng(3).standard_normal((8, 400))
+        cascade = FilterCascade(self.STAGES, 250)
+        cascade.zi[:] = 0  # the stages alone would each start from their own steady state
+        filtered = np.hstack([cascade.process(data[:, i:i+40]) for i in range(0, 400, 40)])
+
+        expected = data
+        for filter_type, freq_range in self.STAGES:
+            stage = FilterBank(filter_type, freq_range, 250)
+            stage.zi[:] = 0
+            expected = stage.process(expected)
+        np.testing.assert_allclose(filtered, expected, atol=1e-6)
+        np.testing.assert_allclose(cascade.filtfilt(data), sosfiltfilt(cascade.sos, data, axis=-1))
+
+    def test_kept_stages_keep_their_state(self):
+        """Test that adding a stage carries over the state of the stages already running."""
+        data = np.random.default_rng(4).standard_normal((8, 100))
+        cascade = FilterCascade(self.STAGES[:1], 250)
+        cascade.process(data)
+
+        extended = FilterCascade(self.STAGES[1:2] + self.STAGES[:1], 250, previous=cascade)
+        np.testing.assert_array_equal(extended.zi[extended.stage_slices[1]], cascade.zi)
+        fresh = FilterCascade(self.STAGES[1:2], 250)
+        np.testing.assert_array_equal(extended.zi[extended.stage_slices[0]], fresh.zi)
+
+    def test_pipeline_switches_between_blocks(self):
+        """Test that a new cascade takes effect at the next block and an empty one removes the filter."""
+        pipeline = Pipeline(250, 1.0, 8)
+        pipeline.set_filter_stages(self.STAGES)
+        pipeline.process(np.ones((8, 5)))
+        self.assertEqual(len(pipeline.filter_bank.stages), 3)
+
+        pipeline.set_filter_stages([])
+        processed, _, _ = pipeline.process(np.ones((8, 5)))
+        self.assertIsNone(pipeline.filter_bank)
+        np.testing.assert_array_equal(processed, 1.0)
+
+class TestZeroPhaseFilter(unittest.TestCase):
+    def setUp(self):
+        self.sos = FilterCascade([("Notch", [60, 60]), ("Band Pass", [5, 30])], 250).sos
+        self.data = np.random.default_rng(5).standard_normal((4, 5003))
+
+    def test_chunks_match_sosfiltfilt(self):
+        """Test that chunked filtering gives exactly what sosfiltfilt gives, whatever the chunk size."""
+        expected = sosfiltfilt(self.sos, self.data, axis=-1)
+        for chunk_size in (64, 1000, 5003, 100000):
+            np.testing.assert_allclose(zero_phase_filter(self.sos, self.data, chunk_size), expected, rtol=0, atol=1e-12)
+
+    def test_progress_and_cancel(self):
+        """Test that progress ends at 1 and a cancelled filtering returns None."""
+        fractions = []
+        zero_phase_filter(self.sos, self.data, 500, progress=fractions.append)
+        self.assertEqual(fractions[-1], 1.0)
+
+        cancel = threading.Event()
+        cancel.set()
+        self.assertIsNone(zero_phase_filter(self.sos, self.data, 500, cancel=cancel))
+
+    def test_worker_emits_result(self):
+        """Test that the background worker emits the filtered recording and reports short files."""
+        results = []
+        worker = FileFilterWorker(self.sos, self.data, chunk_size=1000)
+        worker.finished_signal.connect(results.append)
+        worker.run()
+        np.testing.assert_allclose(results[0], sosfiltfilt(self.sos, self.data, axis=-1), atol=1e-12)
+
+        worker = FileFilterWorker(self.sos, self.data[:, :10])
+        worker.finished_signal.connect(results.append)
+        worker.run()
+        self.assertIsNone(results[1])
+
+class TestBandPower(unittest.TestCase):
+    def test_sine_power_lands_in_its_band(self):
+        """Test that a sine's power, half its squared amplitude, shows up in its band only."""
+        t = np.arange(0, 10, 1 / 250)
+        data = np.vstack((np.sin(2 * np.pi * 10 * t), 2 * np.sin(2 * np.pi * 20 * t)))
+        band_power = BandPower(250, channels=2)
+        for i in range(0, len(t), 5):
+            power = band_power.process(data[:, i:i+5])
+
+        alpha, beta = band_power.names.index("alpha"), band_power.names.index("beta")
+        self.assertAlmostEqual(power[alpha, 0], 0.5, delta=0.05)
+        self.assertAlmostEqual(power[beta, 1], 2.0, delta=0.2)
+        self.assertLess(power[:, 0].sum() - power[alpha, 0], 0.2)
+        self.assertLess(power[:, 1].sum() - power[beta, 1], 0.2)
+
+    def test_blocks_match_one_pass(self):
+        """Test that the state carries over between blocks."""
+        data = np.random.default_rng(0).standard_normal((4, 500))
+        whole = BandPower(250, channels=4).process(data)
+        blocks = BandPower(250, channels=4)
+        for i in range(0, 500, 7):
+            power = blocks.process(data[:, i:i+7])
+        np.testing.assert_allclose(power, whole)
+
+    def test_bands_past_nyquist_are_left_out(self):
+        """Test that a low sample rate drops the bands it cannot carry."""
+        self.assertEqual(BandPower(80).names, ["delta", "theta", "alpha", "beta"])
+
+class TestFilterCache(unittest.TestCase):
+    STAGES = [("High Pass", [1, 1]), ("Band Pass", [5, 30])]
+
+    def setUp(self):
+        self.data = np.random.default_rng(6).standard_normal((3, 20000))
+        self.cache = FilterCache(self.data, 250, size=2)
+
+    def test_spans_match_the_whole_file_filtered(self):
+        """Test that a span filtered on its own matches the same span of the filtered file."""
+        view = self.cache.get(self.STAGES)
+        expected = zero_phase_filter(view.sos, self.data)
+        for start, stop in ((0, 2000), (9000, 11000), (19500, 20000)):
+            np.testing.assert_allclose(view[:, start:stop], expected[:, start:stop], atol=1e-3 * np.abs(expected).max())
+        self.assertIsNone(view.full)
+
+        np.testing.assert_array_equal(view[1], expected[1])
+        self.assertIsNotNone(view.full)
+
+    def test_views_are_kept_by_setting(self):
+        """Test that a recent setting gives back its view and the oldest one is dropped."""
+        view = self.cache.get(self.STAGES)
+        self.assertIs(self.cache.get([("High Pass", [1, 1]), ("Band Pass", [5, 30])]), view)
+        self.cache.get([("Notch", [60, 60])])
+        self.cache.get([("Low Pass", [30, 30])])
+        self.assertIsNot(self.cache.get(self.STAGES), view)
+
+class TestProcessingWorker(unittest.TestCase):
+    def setUp(self):
+        self.ring = RingBuffer(9, 64)
+        self.handler = RecordingHandler()
+        self.worker = ProcessingWorker(self.ring, self.handler, adc_scale=2.0, channel_count=4)
+
+    def test_block_is_scaled_recorded_and_buffered(self):
+        """Test that a block reaches the recorder and the session buffer in millivolts."""
+        data = np.ones((8, 5))
+        self.worker.process_block(time.perf_counter(), np.arange(0, 20, 4), data)
+
+        _, recorded, labels = self.handler.blocks[0]
+        self.assertIsNone(labels)
+        np.testing.assert_array_equal(recorded[:4], 2.0)
+        np.testing.assert_array_equal(recorded[4:], 0.0)
+        samples, timestamps = self.ring.latest(5)
+        np.testing.assert_array_equal(samples[:8], recorded)
+        np.testing.assert_allclose(timestamps, [0, 0.004, 0.008, 0.012, 0.016])
+
+    def test_labels_follow_presses_and_toggles(self):
+        """Test that a press labels one sample and a toggle labels every sample."""
+        self.worker.set_labeling_mode(True)
+        self.worker.press_label()
+        self.worker.process_block(0, np.arange(3), np.ones((8, 3)))
+        self.worker.toggle_label()
+        self.worker.process_block(0, np.arange(3, 6), np.ones((8, 3)))
+        self.worker.process_block(0, np.arange(6, 9), np.ones((8, 3)))
+
+        self.assertEqual(self.handler.blocks[0][2].tolist(), [1, 0, 0])
+        self.assertEqual(self.handler.blocks[2][2].tolist(), [1, 1, 1])
+        np.testing.assert_array_equal(self.ring.latest(9)[0][8], [1, 0, 0, 0, 1, 1, 1, 1, 1])
+
+    def test_queued_blocks_are_processed_before_stopping(self):
+        """Test that blocks submitted from another thread are all recorded by the time stop returns."""
+        self.worker.start()
+        for i in range(10):
+            self.worker.submit(np.arange(i * 5, i * 5 + 5), np.ones((8, 5)))
+        self.worker.stop()
+        self.assertEqual(len(self.handler.blocks), 10)
+        self.assertEqual(self.ring.head, 50)
+
+    def test_tracked_frequencies_are_broadcast(self):
+        """Test that every block broadcasts the magnitudes of the tracked frequencies."""
+        server = RecordingServer()
+        self.worker.ws_server = server
+        self.worker.set_tracked_frequencies([10, 200, 12])
+        self.worker.process_block(0, np.arange(5), np.ones((8, 5)))
+        self.worker.set_tracked_frequencies([])
+        self.worker.process_block(0, np.arange(5, 10), np.ones((8, 5)))
+
+        self.assertEqual(len(server.messages), 1)
+        message = server.messages[0]["tracked"]
+        self.assertEqual(message["frequencies"], [10.0, 12.0])
+        self.assertEqual(np.shape(message["magnitudes"]), (2, 4))
+
+    def test_band_powers_are_buffered_recorded_and_broadcast(self):
+        """Test that with the band power stage on every block publishes its band powers."""
+        server = RecordingServer()
+        self.worker.ws_server = server
+        self.worker.process_block(0, np.arange(5), np.ones((8, 5)))
+        self.assertEqual(self.worker.band_ring.head, 0)
+
+        self.worker.set_band_power(True)
+        for i in range(1, 4):
+            self.worker.process_block(0, np.arange(i * 5, i * 5 + 5), np.ones((8, 5)))
+        self.assertEqual(self.worker.band_ring.head, 3)
+        self.assertEqual([timestamp for timestamp, _ in self.handler.band_powers], [9, 14, 19])
+        np.testing.assert_allclose(self.worker.band_ring.latest(1)[0][:, 0], self.handler.band_powers[-1][1].ravel(), rtol=1e-6)
+
+        message = server.messages[-1]["band_power"]
+        self.assertAlmostEqual(message["time"], 0.019)
+        self.assertEqual(len(message["alpha"]), 4)
+
+class TestDSPProcess(unittest.TestCase):
+    def test_blocks_are_processed_in_the_child_process(self):
+        """Test that the DSP process filters every submitted sample and the results get recorded."""
+        ring = create_shared_ring(9, 512)
+        handler = RecordingHandler()
+        worker = DSPProcess(ring, handler, adc_scale=2.0, channel_count=4)
+        try:
+            worker.start()
+            worker.set_labeling_mode(True)
+            worker.set_band_power(True)
+            for i in range(10):
+                worker.submit(np.arange(i * 20, i * 20 + 20, 4), np.ones((8, 5)))
+            worker.stop()
+
+            self.assertEqual(ring.head, 50)
+            self.assertEqual(sum(len(timestamps) for timestamps, _, _ in handler.blocks), 50)
+            timestamps, recorded, labels = handler.blocks[-1]
+            self.assertEqual(timestamps[-1], 196)
+            np.testing.assert_array_equal(recorded[:4], 2.0)
+            self.assertIsNotNone(labels)
+            self.assertEqual(handler.band_powers[-1][0], 196)
+        finally:
+            ring.close()
+
+if __name__ == "__main__":
+    unittest.main()
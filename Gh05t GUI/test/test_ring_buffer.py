@@ -0,0 +1,65 @@
+import threading
+import unittest
+import numpy as np
+from utils.ring_buffer import RingBuffer, SharedRingBuffer
+
+def block(start, n, channels=2):
+    """Samples whose value is their index, so reads can be checked against np.arange."""
+    values = np.arange(start, start + n, dtype=np.float64)
+    return np.tile(values, (channels, 1)), values
+
+class TestRingBuffer(unittest.TestCase):
+    def test_latest_is_contiguous_across_the_wrap(self):
+        """Test that the newest samples come back as one view once the buffer has wrapped."""
+        ring = RingBuffer(2, 8)
+        for start in range(0, 30, 3):
+            ring.write(*block(start, 3))
+
+        samples, timestamps = ring.latest(8)
+        self.assertTrue(np.shares_memory(samples, ring.data))
+        np.testing.assert_array_equal(timestamps, np.arange(22, 30))
+        np.testing.assert_array_equal(samples, np.tile(np.arange(22, 30), (2, 1)))
+        self.assertEqual(ring.latest(100)[1].size, 8)
+
+    def test_readers_keep_their_own_cursor(self):
+        """Test that every reader sees every sample once, however often it reads."""
+        ring = RingBuffer(2, 16)
+        fast, slow = ring.reader(), ring.reader()
+        fast_seen = []
+        for start in range(0, 12, 4):
+            ring.write(*block(start, 4))
+            fast_seen.extend(fast.read()[1])
+
+        np.testing.assert_array_equal(fast_seen, np.arange(12))
+        np.testing.assert_array_equal(slow.read(max_samples=5)[1], np.arange(5))
+        np.testing.assert_array_equal(slow.read()[1], np.arange(5, 12))
+        self.assertEqual(fast.available(), 0)
+
+    def test_overrun_skips_to_oldest_sample(self):
+        """Test that a reader lapped by the writer resumes at the oldest stored sample."""
+        ring = RingBuffer(1, 8)
+        reader = ring.reader()
+        ring.write(*block(0, 20, channels=1))
+
+        np.testing.assert_array_equal(reader.read()[1], np.arange(12, 20))
+        self.assertEqual(reader.overruns, 12)
+        np.testing.assert_array_equal(reader.window(3)[0][0], [17, 18, 19])
+
+class TestSharedRingBuffer(unittest.TestCase):
+    def test_attached_buffer_sees_writes_and_head(self):
+        """Test that a second attachment, as in the DSP process, shares samples and head."""
+        ring = SharedRingBuffer(2, 8, lock=threading.Lock())
+        attached = SharedRingBuffer(2, 8, ring.dtype, ring.lock, name=ring.shm.name)
+        try:
+            reader = attached.reader(start=0)
+            ring.write(*block(0, 11))
+            self.assertEqual(attached.head, 11)
+            samples, timestamps = reader.read_copy()
+            np.testing.assert_array_equal(timestamps, np.arange(3, 11))
+            self.assertEqual(reader.overruns, 3)
+        finally:
+            attached.close()
+            ring.close()
+
+if __name__ == "__main__":
+    unittest.main()
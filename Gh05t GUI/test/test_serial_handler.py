@@ -0,0 +1,53 @@
+import struct
+import unittest
+import numpy as np
+from utils.serial_handler import SerialWorker, decode_serial_block, FRAME_MARKER, FRAME_SIZE
+
+def make_frames(n_frames, start=0):
+    """Build n_frames raw 40-byte serial frames with known contents, some channels negative in 24 bits."""
+    frames = b''
+    for i in range(start, start + n_frames):
+        channels = [((i * 10 + ch - 40) & 0xFFFFFF) for ch in range(8)]
+        frames += struct.pack('<10I', FRAME_MARKER, 1000 + 4 * i, *channels)
+    return frames
+
+def reference_decode(buffer):
+    """The byte-by-byte resync loop from High_Performance/Recorded_data/eeg_data_to_file.py."""
+    timestamps = []
+    while len(buffer) >= FRAME_SIZE:
+        if struct.unpack('<I', buffer[0:4])[0] == FRAME_MARKER:
+            timestamps.append(struct.unpack('<10I', buffer[:FRAME_SIZE])[1])
+            buffer = buffer[FRAME_SIZE:]
+        else:
+            buffer = buffer[1:]
+    return timestamps
+
+class TestSerialDecoder(unittest.TestCase):
+    def test_block_decode_with_garbage_between_frames(self):
+        """Test that frames separated by stray bytes decode like the byte-by-byte parser."""
+        raw = b'\x01\x02\x03' + make_frames(3) + b'\x00' * 32 + make_frames(2, start=3) + b'\xce\xfa'
+        timestamps, channel_data, remainder, skipped = decode_serial_block(raw)
+
+        self.assertEqual(timestamps.tolist(), reference_decode(raw))
+        self.assertEqual(channel_data.shape, (8, 5))
+        self.assertEqual(channel_data[:, 0].tolist(), [ch - 40 for ch in range(8)])
+        self.assertEqual(remainder, b'\xce\xfa')
+        self.assertEqual(skipped, 3 + 32)
+
+    def test_frames_split_across_reads(self):
+        """Test that the worker reassembles frames and markers split over several reads."""
+        worker = SerialWorker("test", block_interval_ms=0)
+        received = []
+        worker.data_received.connect(lambda ts, data: received.append((ts, data)))
+
+        raw = make_frames(6)
+        for i in range(0, len(raw), 7):
+            worker.handle_data(raw[i:i+7])
+
+        timestamps = np.concatenate([ts for ts, _ in received])
+        self.assertEqual(timestamps.tolist(), [1000 + 4 * i for i in range(6)])
+        self.assertEqual(worker.data_buffer, b'')
+        self.assertEqual(worker.skipped_bytes, 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from utils import spectral
+from utils.spectral import BinTracker, SpectralEngine, spectrum, trackable
+from utils.ring_buffer import RingBuffer
+
+class TestSpectralEngine(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.wisdom_path = os.path.join(self.folder.name, "wisdom.pkl")
+        self.ring = RingBuffer(9, 4096)
+        self.data = np.random.default_rng(0).standard_normal((9, 2000)).astype(np.float32)
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def write(self, start, stop):
+        self.ring.write(self.data[:, start:stop], np.arange(start, stop) / 250)
+
+    def test_matches_the_spectrum_of_the_newest_window(self):
+        """Test that a full window gives the same spectrum as computing it directly."""
+        self.write(0, 1000)
+        engine = SpectralEngine(self.ring, 250, wisdom_path=self.wisdom_path)
+        freqs, magnitudes, num_samples, _ = engine.update()
+
+        expected_freqs, expected = spectrum(self.data[:8, 750:1000], 250)
+        np.testing.assert_allclose(freqs, expected_freqs)
+        np.testing.assert_allclose(magnitudes, expected, rtol=1e-4, atol=1e-6)
+        self.assertEqual(num_samples, 250)
+
+    def test_result_is_cached_until_a_hop_arrives(self):
+        """Test that the spectrum is only recomputed once a hop of new samples is buffered."""
+        self.write(0, 1000)
+        engine = SpectralEngine(self.ring, 250, hop=0.1, wisdom_path=self.wisdom_path)
+        first = engine.update()
+        self.write(1000, 1020)
+        self.assertIs(engine.update()[1], first[1])
+        self.write(1020, 1025)
+        second = engine.update()
+        self.assertEqual(second[3], first[3] + 1)
+
+        _, expected = spectrum(self.data[:8, 775:1025], 250)
+        np.testing.assert_allclose(second[1], expected, rtol=1e-4, atol=1e-6)
+
+    def test_welch_averages_overlapping_segments(self):
+        """Test that Welch averaging takes the RMS over half-overlapping segments."""
+        self.write(0, 1000)
+        engine = SpectralEngine(self.ring, 250, segments=3, wisdom_path=self.wisdom_path)
+        _, magnitudes, num_samples, _ = engine.update()
+
+        segments = [spectrum(self.data[:8, start:start + 250], 250)[1] for start in (500, 625, 750)]
+        expected = np.sqrt(np.mean(np.square(segments), axis=0))
+        np.testing.assert_allclose(magnitudes, expected, rtol=1e-4, atol=1e-6)
+        self.assertEqual(num_samples, 500)
+
+    def test_short_buffer_uses_what_is_there(self):
+        """Test that the spectrum right after the start covers the samples buffered so far."""
+        self.assertIsNone(SpectralEngine(self.ring, 250, wisdom_path=self.wisdom_path).update())
+        self.write(0, 100)
+        engine = SpectralEngine(self.ring, 250, wisdom_path=self.wisdom_path)
+        freqs, magnitudes, num_samples, _ = engine.update()
+        self.assertEqual(num_samples, 100)
+        np.testing.assert_allclose(magnitudes, spectrum(self.data[:8, :100], 250)[1], rtol=1e-4, atol=1e-6)
+
+    @unittest.skipIf(spectral.pyfftw is None, "pyFFTW is not installed")
+    def test_wisdom_is_saved(self):
+        """Test that planning saves the FFTW wisdom for the next session."""
+        SpectralEngine(self.ring, 250, window=0.9, wisdom_path=self.wisdom_path)
+        self.assertTrue(os.path.exists(self.wisdom_path))
+
+class TestBinTracker(unittest.TestCase):
+    def setUp(self):
+        self.data = np.random.default_rng(1).standard_normal((3, 2000)) + 5
+
+    def test_matches_the_fft_path(self):
+        """Test that tracked bins equal the spectrum of the same window, block after block."""
+        tracker = BinTracker([8, 10, 12], 250, channels=3)
+        freqs = None
+        for stop in range(7, 2000, 7):
+            magnitudes = tracker.process(self.data[:, stop - 7:stop])
+            if stop >= 250 and stop % 91 == 0:
+                freqs, expected = spectrum(self.data[:, stop - 250:stop], 250)
+                columns = [np.flatnonzero(freqs == frequency)[0] for frequency in (8, 10, 12)]
+                np.testing.assert_allclose(magnitudes, expected[:, columns], rtol=1e-4, atol=1e-6)
+        self.assertIsNotNone(freqs)
+
+    def test_frequencies_between_bins(self):
+        """Test that a frequency off the FFT bins matches the windowed DFT at that frequency."""
+        tracker = BinTracker([9.3], 250, channels=3)
+        for start in range(0, 1993, 13):
+            magnitudes = tracker.process(self.data[:, start:min(start + 13, 1993)])
+
+        window = self.data[:, 1743:1993] - self.data[:, 1743:1993].mean(axis=1, keepdims=True)
+        expected = np.abs((window * np.hamming(250)) @ np.exp(-2j * np.pi * 9.3 / 250 * np.arange(250))) / 250
+        np.testing.assert_allclose(magnitudes[:, 0], expected, atol=1e-12)
+
+    def test_unusable_frequencies_are_dropped(self):
+        """Test that frequencies outside (0, Nyquist) and repeats are not tracked."""
+        self.assertEqual(trackable([0, 10, 125, 300, 10, 12.5], 250), [10.0, 12.5])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+import numpy as np
+from utils.telemetry import LinkTelemetry
+
+class TestLinkTelemetry(unittest.TestCase):
+    def test_gaps_and_drops_across_chunks(self):
+        """Test that missing samples are counted inside a chunk and between chunks."""
+        telemetry = LinkTelemetry(sample_rate=250)
+        telemetry.update(np.array([0, 4, 8, 16]), arrival=0.0)
+        telemetry.update(np.array([28, 32]), arrival=0.02)
+
+        stats = telemetry.snapshot()
+        self.assertEqual(stats["received"], 6)
+        self.assertEqual(stats["gaps"], 2)
+        self.assertEqual(stats["dropped"], 3)
+        self.assertEqual(stats["largest_gap_ms"], 12)
+        self.assertEqual(sum(stats["jitter_ms"]["counts"]), 1)
+
+    def test_timestamp_wraparound_is_not_a_gap(self):
+        """Test that the uint32 millisecond counter rolling over is not counted as loss."""
+        telemetry = LinkTelemetry(sample_rate=250)
+        telemetry.update(np.array([2 ** 32 - 8, 2 ** 32 - 4, 0, 4]))
+        self.assertEqual(telemetry.snapshot()["dropped"], 0)
+
+    def test_backward_jump_is_a_discontinuity(self):
+        """Test that timestamps restarting (device reset, reconnect) re-anchor instead of counting as loss."""
+        telemetry = LinkTelemetry(sample_rate=250, interpolate_gaps=True)
+        telemetry.update(np.array([100000, 100004]), np.ones((8, 2)))
+        timestamps, _ = telemetry.update(np.array([0, 4]), np.zeros((8, 2)))
+        telemetry.update(np.array([8, 16]), np.zeros((8, 2)))
+
+        stats = telemetry.snapshot()
+        self.assertEqual(timestamps.tolist(), [0, 4])
+        self.assertEqual(stats["discontinuities"], 1)
+        self.assertEqual(stats["dropped"], 1)
+        self.assertEqual(stats["gaps"], 1)
+        self.assertEqual(stats["largest_gap_ms"], 8)
+        self.assertEqual(stats["filled"], 1)
+
+    def test_wraparound_between_chunks_counts_its_gap(self):
+        """Test that a gap spanning the 32-bit rollover is still counted as loss."""
+        telemetry = LinkTelemetry(sample_rate=250)
+        telemetry.update(np.array([2 ** 32 - 8, 2 ** 32 - 4]))
+        telemetry.update(np.array([4, 8]))
+
+        stats = telemetry.snapshot()
+        self.assertEqual(stats["dropped"], 1)
+        self.assertEqual(stats["discontinuities"], 0)
+        self.assertEqual(stats["largest_gap_ms"], 8)
+
+    def test_reset_continuity_keeps_counters(self):
+        """Test that after a reconnect the first chunk is not compared with the one before."""
+        telemetry = LinkTelemetry(sample_rate=250)
+        telemetry.update(np.array([0, 4, 12]))
+        telemetry.reset_continuity()
+        telemetry.update(np.array([5000, 5004]))
+
+        stats = telemetry.snapshot()
+        self.assertEqual(stats["received"], 5)
+        self.assertEqual(stats["dropped"], 1)
+        self.assertEqual(stats["discontinuities"], 0)
+
+    def test_interpolation_fills_short_gaps(self):
+        """Test that short gaps are filled on a uniform time base and long gaps are left alone."""
+        telemetry = LinkTelemetry(sample_rate=250, interpolate_gaps=True, max_fill=2)
+        telemetry.update(np.array([0, 4]), np.vstack([[0.0, 4.0]] * 8))
+        timestamps, samples = telemetry.update(np.array([12, 40]), np.vstack([[12.0, 40.0]] * 8))
+
+        self.assertEqual(timestamps.tolist(), [8, 12, 40])
+        self.assertEqual(samples[0].tolist(), [8.0, 12.0, 40.0])
+        self.assertEqual(telemetry.snapshot()["filled"], 1)
+
+if __name__ == "__main__":
+    unittest.main()
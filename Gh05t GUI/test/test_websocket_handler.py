@@ -0,0 +1,117 @@
+import json
+import asyncio
+import time
+import socket
+import struct
+import threading
+import unittest
+import numpy as np
+from PyQt5.QtCore import Qt
+from utils.websocket_handler import EEGWebSocket, decode_frame, FRAME_MAGIC, BURST_FRAME_MAGIC
+
+def make_datagram(value):
+    return json.dumps({f"CH{i}": value + i for i in range(8)}).encode()
+
+def make_frame(sequence, samples):
+    """Build a binary frame the way the Pico firmware packs it, from an (N, 8) array."""
+    samples = np.asarray(samples, dtype='<u2')
+    return struct.pack('<HHH', FRAME_MAGIC, sequence, len(samples)) + samples.tobytes()
+
+class TestUDPReceiver(unittest.TestCase):
+    def setUp(self):
+        self.worker = EEGWebSocket(block_interval_ms=0)
+        self.worker.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.worker.socket.bind(("127.0.0.1", 0))
+        self.worker.socket.setblocking(False)
+        self.sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.received = []
+        # direct, blocks from the receiver's thread are collected without a Qt event loop
+        self.worker.data_received.connect(lambda ts, data: self.received.append((ts, data)), Qt.DirectConnection)
+
+    def tearDown(self):
+        self.worker.socket.close()
+        self.sender.close()
+
+    def test_pending_datagrams_are_drained_in_one_batch(self):
+        """Test that one wakeup decodes every queued datagram and counts malformed ones."""
+        address = self.worker.socket.getsockname()
+        for value in range(1, 10):
+            self.sender.sendto(make_datagram(value * 100), address)
+        self.sender.sendto(b"not json", address)
+
+        self.worker.handle_datagrams(make_datagram(0))
+
+        self.assertEqual(len(self.received), 1)
+        timestamps, channel_data = self.received[0]
+        self.assertEqual(channel_data.shape, (8, 10))
+        self.assertEqual(channel_data[0].tolist(), [value * 100 for value in range(10)])
+        self.assertEqual(channel_data[:, 0].tolist(), list(range(8)))
+        self.assertEqual(self.worker.stats()["received"], 11)
+        self.assertEqual(self.worker.stats()["decode_errors"], 1)
+
+    def test_binary_frames_and_json_fallback(self):
+        """Test that binary frames and JSON datagrams decode in order and sequence gaps are counted."""
+        samples = np.arange(32).reshape((4, 8)) + 4000
+        sequence, decoded, device_stamps = decode_frame(make_frame(7, samples))
+        self.assertEqual(sequence, 7)
+        self.assertEqual(decoded.tolist(), samples.T.tolist())
+        self.assertIsNone(device_stamps)
+
+        timestamps, channel_data = self.worker.decode_datagrams([
+            make_frame(65535, samples), make_datagram(10), make_frame(2, samples[:1]), make_frame(2, samples)[:-1],
+        ])
+        self.assertEqual(channel_data.shape, (8, 6))
+        self.assertEqual(channel_data[:, 4].tolist(), [10 + i for i in range(8)])
+        self.assertEqual(channel_data[:, 5].tolist(), samples[0].tolist())
+        self.assertEqual(self.worker.lost_frames, 2)
+        self.assertEqual(self.worker.decode_errors, 1)
+
+    def test_burst_frames_carry_device_timestamps(self):
+        """Test that burst frames are stamped with the device time of each sample."""
+        frame = struct.pack('<HHH', BURST_FRAME_MAGIC, 0, 3)
+        for i in range(3):
+            frame += struct.pack('<I8H', 500 + 2 * i, *range(i, i + 8))
+
+        self.worker.timestamp = 99
+        timestamps, channel_data = self.worker.decode_datagrams([frame, make_datagram(0)])
+        self.assertEqual(timestamps.tolist(), [500, 502, 504, 99])
+        self.assertEqual(channel_data[:, 2].tolist(), list(range(2, 10)))
+
+    def run_worker(self):
+        """Runs the receiver on its own event loop, reading the test socket, in a plain thread."""
+        self.worker.open_socket = lambda: self.worker.socket
+        thread = threading.Thread(target=self.worker.run, daemon=True)
+        thread.start()
+        return thread
+
+    def test_frames_through_the_endpoint_arrive_in_order(self):
+        """Test that frames read by the event loop's transport are decoded in the order they were sent."""
+        address = self.worker.socket.getsockname()
+        thread = self.run_worker()
+        frames = 200
+        for sequence in range(frames):
+            self.sender.sendto(make_frame(sequence, [[sequence] * 8, [sequence + 1000] * 8]), address)
+
+        deadline = time.time() + 5
+        while self.worker.stats()["received"] < frames and time.time() < deadline:
+            time.sleep(0.01)
+        self.worker.stop()
+        thread.join(timeout=2)
+
+        self.assertFalse(thread.is_alive())
+        self.assertIsInstance(self.worker.loop, asyncio.SelectorEventLoop)
+        channel_data = np.hstack([data for _, data in self.received])
+        expected = [value for sequence in range(frames) for value in (sequence, sequence + 1000)]
+        self.assertEqual(channel_data[0].tolist(), expected)
+        self.assertEqual(self.worker.stats()["received"], frames)
+        self.assertEqual(self.worker.stats()["lost_frames"], 0)
+
+    def test_stop_before_the_loop_runs(self):
+        """Test that a stop() coming before connect() reached its wait still ends the receiver."""
+        self.worker.stop()
+        thread = self.run_worker()
+        thread.join(timeout=2)
+        self.assertFalse(thread.is_alive())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,26 @@
-from utils.file_handler import load_file, export_data_from_import, FileHandler
-from utils.plot_manager import PlotManager
-from utils.ble_handler import EEGBLE, BLEWorker
-from utils.websocket_handler import EEGWebSocket, WebSocketServer
-from utils.signal_processing import SignalProcessingWindow
\ No newline at end of file
+import importlib
+
+# public name -> defining module. Modules are only imported when a name is first used, so a
+# headless tool importing utils.ble_handler does not load Qt widgets, matplotlib or MNE.
+_EXPORTS = {
+    "load_file": "utils.file_handler",
+    "export_data_from_import": "utils.file_handler",
+    "FileHandler": "utils.file_handler",
+    "PlotManager": "utils.plot_manager",
+    "EEGBLE": "utils.ble_handler",
+    "BLEWorker": "utils.ble_handler",
+    "EEGWebSocket": "utils.websocket_handler",
+    "WebSocketServer": "utils.websocket_handler",
+    "SerialWorker": "utils.serial_handler",
+    "SyntheticSource": "utils.synthetic_source",
+    "SignalProcessingWindow": "utils.signal_processing",
+    "ProcessingWorker": "utils.processing",
+    "FileFilterWorker": "utils.processing",
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name]), name)
+    raise AttributeError(f"module 'utils' has no attribute {name!r}")
@@ -0,0 +1,142 @@
+import time
+import logging
+import importlib
+import numpy as np
+from PyQt5.QtCore import QThread, pyqtSignal
+
+BLOCK_INTERVAL_MS = 20  # cadence at which sources hand blocks to the GUI
+ADS1299_SCALE = 5 / 8388607 * 1000  # signed 24-bit counts to millivolts with a 5 V reference
+
+SOURCES = {}  # registered AcquisitionSource classes by menu name
+SOURCE_MODULES = ["utils.ble_handler", "utils.websocket_handler", "utils.serial_handler", "utils.synthetic_source"]
+
+acquisition_logger = logging.getLogger(__name__)
+
+def load_sources():
+    """Imports the built-in source modules so they register themselves.
+
+    A module whose dependencies are not installed (e.g. bleak on a box without Bluetooth)
+    is skipped, the other sources stay available."""
+    for module in SOURCE_MODULES:
+        try:
+            importlib.import_module(module)
+        except ImportError as e:
+            acquisition_logger.warning(f"{module} not available: {e}")
+
+def register_source(source_class):
+    """Class decorator that makes an acquisition source available to the GUI.
+
+    :param source_class: The AcquisitionSource subclass to register under its name.
+
+    :return: The class, unchanged."""
+    SOURCES[source_class.name] = source_class
+    return source_class
+
+def available_sources():
+    """Names of the registered sources, in registration order.
+
+    :return list: Source names."""
+    load_sources()
+    return list(SOURCES)
+
+def create_source(name, **kwargs):
+    """Creates a registered source.
+
+    :param name: The registered source name.
+    :param kwargs: Passed on to the source constructor.
+
+    :return AcquisitionSource: The new, not yet started, source."""
+    load_sources()
+    return SOURCES[name](**kwargs)
+
+class BlockAccumulator:
+    """Collects decoded samples from a source and releases them as one block per interval.
+
+    Sources push whatever they decoded from a packet or notification and only emit
+    a Qt signal when a block is returned, so the receiving thread handles a few
+    dozen blocks per second instead of one call per sample."""
+
+    def __init__(self, interval_ms=BLOCK_INTERVAL_MS):
+        """Initializes the accumulator.
+
+        :param interval_ms: Minimum time in milliseconds between released blocks. 0 releases every chunk."""
+        self.interval = interval_ms / 1000.0
+        self.timestamps = []
+        self.samples = []
+        self.last_flush = time.perf_counter()
+
+    def add(self, timestamps, samples):
+        """Queues a decoded chunk and returns a block once the interval has elapsed.
+
+        :param timestamps: (N,) array of sample timestamps in milliseconds.
+        :param samples: (channels, N) array of samples.
+
+        :return tuple: (timestamps, samples) for the whole block, or None if the block is not due yet."""
+        if len(timestamps) == 0:
+            return None
+
+        self.timestamps.append(timestamps)
+        self.samples.append(samples)
+
+        if time.perf_counter() - self.last_flush >= self.interval:
+            return self.flush()
+        return None
+
+    def flush(self):
+        """Releases everything queued so far.
+
+        :return tuple: (timestamps, samples) for the queued samples, or None if nothing is queued."""
+        self.last_flush = time.perf_counter()
+        if not self.timestamps:
+            return None
+
+        if len(self.timestamps) == 1:
+            block = (self.timestamps[0], self.samples[0])
+        else:
+            block = (np.concatenate(self.timestamps), np.concatenate(self.samples, axis=1))
+
+        self.timestamps = []
+        self.samples = []
+        return block
+
+class AcquisitionSource(QThread):
+    """Base class for everything that streams samples into the GUI.
+
+    A source declares how many channels it really carries, its sample rate and the scale
+    from its raw values to millivolts, and emits (timestamps, samples) blocks on
+    data_received. The GUI treats every source the same way, so a new transport only has
+    to subclass this, emit blocks and be registered with register_source."""
+    status_update_signal = pyqtSignal(str)
+    data_received = pyqtSignal(object, object)  # (N,) timestamps, (8, N) samples
+    connection_failed_signal = pyqtSignal()
+    telemetry_signal = pyqtSignal(object)  # link quality dict, for sources that track it
+
+    name = None  # label of the source in the Real-Time Input menu
+    channel_count = 8  # channels with real data, rows past this are zeroed
+    sample_rate = 250  # nominal samples per second
+    adc_scale = 1.0  # raw value to millivolts
+
+    @classmethod
+    def configure(cls, parent):
+        """Asks the user for whatever the source needs before it can start.
+
+        :param parent: The widget to show dialogs on.
+
+        :return dict: Keyword arguments for the constructor, or None if the user cancelled."""
+        return {}
+
+    def stop(self):
+        """Stops the source and waits for its thread to finish."""
+        self.wait(1000)
+
+    def reconnect(self):
+        """Restarts the source."""
+        self.stop()
+        self.start()
+
+    def emit_block(self, block):
+        """Emits a block returned by a BlockAccumulator.
+
+        :param block: (timestamps, samples), or None if no block is due."""
+        if block is not None:
+            self.data_received.emit(*block)
@@ -0,0 +1,359 @@
+"""Streaming adaptive detectors and filters, several channels per call.
+
+Each detector or filter is an object holding the state of every channel in preallocated
+arrays, channels first. process takes a (channels, N) block and returns per-sample
+(channels, N) results, with the state carried over to the next block, and reset returns
+to the initial state. The GUI detector uses them, and the Machine_Learning notebooks can
+import them in place of their per-sample functions.
+
+The SDED recurrences are kept exactly as the detector computed them one sample at a time,
+so a block gives the same results, bit for bit, as the per-sample references in
+test/test_adaptive.py called on every sample of every channel in turn. Their loops over
+channels and samples are compiled with numba, which requirements.txt installs. Without it
+they run over plain Python floats, which for up to a few dozen channels is still faster
+than stepping numpy arrays sample by sample. The NLMS filters, with their longer weight
+vectors, step numpy arrays of every channel instead."""
+import sys
+from abc import ABC, abstractmethod
+import numpy as np
+from scipy.special import expit
+
+try:
+    import numba
+except ImportError:  # the kernels run as plain Python, just slower
+    numba = None
+
+SPIKE_LEVEL = 5000  # a fixed-threshold detection must also exceed this value
+NLMS_BLOCK_CAPACITY = 256  # samples per block the NLMS tap-delay line is allocated for, it grows for larger blocks
+
+def compiled(function):
+    """Compiles a kernel with numba when it is installed.
+
+    :param function: The kernel.
+
+    :return function: The compiled kernel, or the kernel itself without numba."""
+    if numba is None:
+        return function
+    # a frozen build has no source files to keep the cache next to, it compiles on every start
+    return numba.njit(cache=not getattr(sys, "frozen", False))(function)
+
+def sded_fixed_kernel(x, eff_dc, delta, alpha, alpha_delta, spike_level, meas, spikes):
+    """Runs the fixed (or single adaptive) threshold SDED over a block, updating the state in place.
+
+    Indexes rows then items, so it takes numpy arrays (compiled) as well as nested lists
+    (plain Python).
+
+    :param x: (channels, N) samples.
+    :param eff_dc: (channels,) DC estimates.
+    :param delta: (channels,) thresholds.
+    :param alpha: DC adaptation rate.
+    :param alpha_delta: Threshold adaptation rate, 0 to keep the thresholds fixed.
+    :param spike_level: Value a sample over the threshold must exceed to count as a spike.
+    :param meas: (channels, N) output, |x - eff_dc| of every sample.
+    :param spikes: (channels, N) output, whether every sample is a spike."""
+    alpha_red = alpha / 2
+    alpha_delta_red = alpha_delta / 2
+    for ch in range(len(x)):
+        row, meas_row, spike_row = x[ch], meas[ch], spikes[ch]
+        dc, threshold = eff_dc[ch], delta[ch]
+        for i in range(len(row)):
+            sample = row[i]
+            m = abs(sample - dc)
+            if m > threshold:
+                if alpha_delta > 0:
+                    threshold = (alpha_delta_red * m ** 2 + (1 - alpha_delta_red) * threshold ** 2) ** 0.5
+                spike_row[i] = sample > spike_level
+                dc = alpha_red * (sample + dc) / 2 + (1 - alpha_red) * dc
+            else:
+                if alpha_delta > 0:
+                    threshold = (alpha_delta * m ** 2 + (1 - alpha_delta) * threshold ** 2) ** 0.5
+                spike_row[i] = False
+                dc = alpha * sample + (1 - alpha) * dc
+            meas_row[i] = m
+        eff_dc[ch], delta[ch] = dc, threshold
+
+def sded_dual_kernel(x, eff_mean, eff_std, delta_min, delta_max, t, alpha, gamma0_min, gamma0_max,
+                     desired, adapt, q, max_cap, meas, spikes):
+    """Runs the dual threshold SDED over a block, updating the state in place.
+
+    :param x: (channels, N) samples.
+    :param eff_mean: (channels,) mean estimates.
+    :param eff_std: (channels,) standard deviation estimates.
+    :param delta_min: (channels,) lower thresholds.
+    :param delta_max: (channels,) upper thresholds.
+    :param t: (channels,) counts of threshold changes.
+    :param alpha: Mean and standard deviation adaptation rate.
+    :param gamma0_min: Initial learning rate of delta_min.
+    :param gamma0_max: Initial learning rate of delta_max.
+    :param desired: (N,) labels of the samples, only read when adapting.
+    :param adapt: Whether the thresholds adapt to the labels.
+    :param q: Slowdown of the mean and deviation updates on spikes.
+    :param max_cap: Upper limit of delta_max.
+    :param meas: (channels, N) output, |x - eff_mean| of every sample.
+    :param spikes: (channels, N) output, whether every sample is a spike."""
+    for ch in range(len(x)):
+        row, meas_row, spike_row = x[ch], meas[ch], spikes[ch]
+        mean, std, low, high, count = eff_mean[ch], eff_std[ch], delta_min[ch], delta_max[ch], t[ch]
+        for i in range(len(row)):
+            sample = row[i]
+            m = abs(sample - mean)
+            spike = m > low and m < high
+            alpha_eff = alpha / q if spike else alpha
+            mean = alpha_eff * sample + (1 - alpha_eff) * mean
+            std = (alpha_eff * m ** 2 + (1 - alpha_eff) * std ** 2) ** 0.5
+
+            if adapt:
+                gamma_min = gamma0_min / (1 + count)
+                gamma_max = gamma0_max / (1 + count)
+                new_low, new_high = low, high
+                label = desired[i]
+                if label == 1 and not spike:
+                    # missed positive, expand the violated bound toward the deviation
+                    count += 1
+                    if m <= low:
+                        new_low = low + gamma_min * (m - low)
+                    else:
+                        new_high = high + gamma_max * (m - high)
+                elif label == 0 and spike:
+                    # false positive, move the nearer bound past the deviation
+                    count += 1
+                    if abs(low - m) < abs(high - m):
+                        new_low = low + gamma_min * (m - low)
+                    else:
+                        new_high = high + gamma_max * (m - high)
+                new_low = max(0.0, new_low)
+                new_high = min(max_cap, new_high)
+                if new_low >= new_high:  # an inverted band keeps the previous thresholds
+                    new_low, new_high = low, high
+                low, high = new_low, new_high
+
+            meas_row[i] = m
+            spike_row[i] = spike
+        eff_mean[ch], eff_std[ch], delta_min[ch], delta_max[ch], t[ch] = mean, std, low, high, count
+
+sded_fixed_compiled = compiled(sded_fixed_kernel)
+sded_dual_compiled = compiled(sded_dual_kernel)
+
+def run_kernel(kernel, x, state, *args):
+    """Runs a kernel over a block, compiled or over plain floats.
+
+    :param kernel: The compiled kernel, or the kernel itself without numba.
+    :param x: (channels, N) samples.
+    :param state: The (channels,) state arrays, updated in place.
+    :param args: The remaining kernel arguments, block arrays as numpy arrays.
+
+    :return tuple: The (channels, N) float measurements and bool spikes."""
+    x = np.ascontiguousarray(x, dtype=float)
+    meas = np.empty(x.shape)
+    spikes = np.empty(x.shape, dtype=bool)
+    if numba is not None:
+        kernel(x, *state, *args, meas, spikes)
+        return meas, spikes
+
+    # numpy scalars are slow one at a time, so the kernel runs on Python floats and lists
+    lists = [s.tolist() for s in state]
+    args = [a.tolist() if isinstance(a, np.ndarray) else a for a in args]
+    meas_rows = [[0.0] * x.shape[1] for _ in range(x.shape[0])]
+    spike_rows = [[False] * x.shape[1] for _ in range(x.shape[0])]
+    kernel(x.tolist(), *lists, *args, meas_rows, spike_rows)
+    for array, values in zip(state, lists):
+        array[:] = values
+    meas[:] = meas_rows
+    spikes[:] = spike_rows
+    return meas, spikes
+
+class FixedSDED:
+    """SDED detector of several channels with one threshold per channel.
+
+    A sample deviating from the DC estimate by more than the threshold, and larger than
+    the spike level, is a spike. The DC estimate follows the signal, more slowly during
+    deviations. With alpha_delta > 0 the threshold tracks the RMS deviation as well (the
+    adaptive variant)."""
+
+    def __init__(self, channels=8, alpha=0.1, delta=1000, alpha_delta=0, spike_level=SPIKE_LEVEL):
+        """Initializes the detector with a zero DC estimate.
+
+        :param channels: Number of channels.
+        :param alpha: DC adaptation rate.
+        :param delta: Initial threshold.
+        :param alpha_delta: Threshold adaptation rate, 0 to keep the threshold fixed.
+        :param spike_level: Value a sample over the threshold must exceed to count as a spike."""
+        self.alpha = alpha
+        self.alpha_delta = alpha_delta
+        self.spike_level = spike_level
+        self.delta_init = delta
+        self.eff_dc = np.zeros(channels)
+        self.delta = np.full(channels, float(delta))
+
+    def reset(self):
+        """Returns the DC estimates and thresholds to their initial values."""
+        self.eff_dc[:] = 0
+        self.delta[:] = self.delta_init
+
+    def process(self, data):
+        """Runs the detector over a block.
+
+        :param data: (channels, N) array of samples.
+
+        :return tuple: The (channels, N) deviations from the DC estimate and spikes."""
+        return run_kernel(sded_fixed_compiled, data, (self.eff_dc, self.delta),
+                          self.alpha, self.alpha_delta, self.spike_level)
+
+class DualSDED:
+    """SDED detector of several channels with a band of two thresholds per channel.
+
+    A sample whose deviation from the mean estimate lies between delta_min and delta_max
+    is a spike. Given the true labels, the thresholds adapt on every misclassified sample
+    with a learning rate decaying with the number of changes so far, counted per channel."""
+
+    def __init__(self, channels=8, alpha=0.1, delta_min=1000, delta_max=1000, gamma0_min=1, gamma0_max=1,
+                 q=2, max_cap=19000):
+        """Initializes the detector with zero mean and deviation estimates.
+
+        :param channels: Number of channels.
+        :param alpha: Mean and standard deviation adaptation rate.
+        :param delta_min: Initial lower threshold.
+        :param delta_max: Initial upper threshold.
+        :param gamma0_min: Initial learning rate of delta_min.
+        :param gamma0_max: Initial learning rate of delta_max.
+        :param q: Slowdown of the mean and deviation updates on spikes.
+        :param max_cap: Upper limit of delta_max."""
+        self.alpha = alpha
+        self.gamma0_min = gamma0_min
+        self.gamma0_max = gamma0_max
+        self.q = q
+        self.max_cap = max_cap
+        self.delta_init = (delta_min, delta_max)
+        self.eff_mean = np.zeros(channels)
+        self.eff_std = np.zeros(channels)
+        self.delta_min = np.full(channels, float(delta_min))
+        self.delta_max = np.full(channels, float(delta_max))
+        self.t = np.zeros(channels, dtype=np.int64)
+
+    def reset(self):
+        """Returns the estimates, thresholds and change counts to their initial values."""
+        self.eff_mean[:] = 0
+        self.eff_std[:] = 0
+        self.delta_min[:], self.delta_max[:] = self.delta_init
+        self.t[:] = 0
+
+    def process(self, data, desired=None):
+        """Runs the detector over a block.
+
+        :param data: (channels, N) array of samples.
+        :param desired: The true label (0 or 1) of every sample, or one for the block, to adapt
+                        the thresholds. None keeps them as they are.
+
+        :return tuple: The (channels, N) deviations from the mean estimate and spikes."""
+        n = np.shape(data)[1]
+        adapt = desired is not None
+        labels = np.broadcast_to(np.asarray(desired if adapt else 0, dtype=float), (n,))
+        state = (self.eff_mean, self.eff_std, self.delta_min, self.delta_max, self.t)
+        return run_kernel(sded_dual_compiled, data, state, self.alpha, self.gamma0_min, self.gamma0_max,
+                          np.ascontiguousarray(labels), adapt, self.q, self.max_cap)
+
+class AdaptiveFilter(ABC):
+    """Normalized LMS style filter of several channels, one weight vector per channel.
+
+    Every sample of a channel is predicted from the last taps samples of its reference,
+    delay samples back, and the weights move toward the prediction error scaled by the
+    reference power. The reference is either a separate signal, such as a channel picking
+    up only the interference, or the channel itself, which makes the filter a linear
+    predictor: the error keeps what cannot be predicted from the past (transients such as
+    EMG bursts and blinks) and drops what can (drift, mains hum). The references are kept
+    in a preallocated tap-delay line, and the blocks are processed one sample at a time for
+    all channels at once. Subclasses choose the output, see output."""
+
+    def __init__(self, channels=8, taps=64, mu=0.5, eps=1e-6, delay=1):
+        """Initializes the filter with zero weights and an all zero reference history.
+
+        :param channels: Number of channels.
+        :param taps: Number of weights per channel.
+        :param mu: Learning rate, between 0 and 2.
+        :param eps: Regularization of the reference power.
+        :param delay: Samples between the newest reference sample used and the sample predicted,
+                      at least 1 when the channel is its own reference."""
+        self.channels = channels
+        self.taps = taps
+        self.mu = mu
+        self.eps = eps
+        self.delay = delay
+        self.history = taps - 1 + delay  # reference samples carried over from the previous block
+        self.weights = np.zeros((channels, taps))
+        self.line = np.zeros((channels, self.history + NLMS_BLOCK_CAPACITY))  # history, then the block
+
+    def reset(self):
+        """Forgets the weights and the reference history."""
+        self.weights[:] = 0
+        self.line[:] = 0
+
+    @abstractmethod
+    def output(self, v):
+        """The prediction of the weighted sum of the taps.
+
+        :param v: (channels,) weighted sums.
+
+        :return np.ndarray: (channels,) predictions."""
+
+    def process(self, data, reference=None):
+        """Filters a block, adapting the weights on every sample.
+
+        :param data: (channels, N) array of samples, the signal the filter predicts.
+        :param reference: (channels, N) or (N,) array, the reference of every channel or one shared
+                          by all of them. None uses the channels themselves, delayed.
+
+        :return tuple: The (channels, N) predictions and errors, data minus the predictions."""
+        data = np.asarray(data, dtype=float)
+        n = data.shape[1]
+        if reference is None:
+            if self.delay < 1:
+                raise ValueError("a channel predicting itself needs a delay of at least one sample")
+            reference = data
+        if self.history + n > self.line.shape[1]:
+            line = np.zeros((self.channels, self.history + n))
+            line[:, :self.history] = self.line[:, :self.history]
+            self.line = line
+        self.line[:, self.history:self.history + n] = reference
+
+        # window i ends delay samples before sample i
+        windows = np.lib.stride_tricks.sliding_window_view(self.line[:, :self.history + n], self.taps, axis=1)[:, :n]
+        steps = self.mu / (np.einsum('cnt,cnt->cn', windows, windows) + self.eps)
+        estimate = np.empty_like(data)
+        error = np.empty_like(data)
+        weights = self.weights
+        for i in range(n):
+            x = windows[:, i]
+            estimate[:, i] = self.output(np.einsum('ct,ct->c', weights, x))
+            error[:, i] = data[:, i] - estimate[:, i]
+            weights += (steps[:, i] * error[:, i])[:, None] * x
+
+        self.line[:, :self.history] = self.line[:, n:n + self.history]
+        return estimate, error
+
+class NLMS(AdaptiveFilter):
+    """Normalized LMS filter, the prediction is the weighted sum itself.
+
+    The same update as apply_nlms_filter in the HLDS and Noise_Reduction notebooks."""
+
+    def output(self, v):
+        """The prediction of the weighted sum of the taps, the sum itself.
+
+        :param v: (channels,) weighted sums.
+
+        :return np.ndarray: (channels,) predictions."""
+        return v
+
+class EDNLMS(AdaptiveFilter):
+    """Event detecting NLMS, the prediction is the sigmoid of the weighted sum.
+
+    Trained on 0/1 event labels, or on the signal itself, the output is a probability-like
+    value between 0 and 1. The same update as apply_ednlms_filter in the EDAPA notebook,
+    which keeps the plain NLMS step without the sigmoid's derivative."""
+
+    def output(self, v):
+        """The prediction of the weighted sum of the taps, its sigmoid.
+
+        :param v: (channels,) weighted sums.
+
+        :return np.ndarray: (channels,) predictions."""
+        return expit(v)
@@ -1,55 +1,181 @@
 import asyncio
 import sys
 from bleak import BleakClient, BleakScanner
-from PyQt5.QtCore import QThread, pyqtSignal, QTimer
+from PyQt5.QtCore import QThread, pyqtSignal, QTimer, QSettings
 import logging
 import struct
 import time
+import numpy as np
+from utils.acquisition import AcquisitionSource, BlockAccumulator, register_source, BLOCK_INTERVAL_MS, ADS1299_SCALE
+from utils.telemetry import LinkTelemetry
 
 SERVICE_UUID = "4fafc201-1fb5-459e-8fcc-c5c9c331914b"
 CHARACTERISTIC_UUID = "beb5483e-36e1-4688-b7f5-ea07361b26a8"
 DEVICE_NAME = "ADS1299_BLE"
 
+TELEMETRY_INTERVAL = 1.0  # seconds between link telemetry reports
+SCAN_TIMEOUT = 10.0  # seconds, the scan returns as soon as the device is seen
+CONNECT_TIMEOUT = 5.0
+RECONNECT_DELAY_MIN = 0.5  # backoff between reconnect attempts, doubled up to the max
+RECONNECT_DELAY_MAX = 8.0
+
+# one packet = [timestamp/milliseconds (uint32), channels 1-8 (int32 each)]
+PACKET_SIZE = 36
+PACKET_DTYPE = np.dtype([('timestamp', '<u4'), ('channels', '<i4', (8,))])
+
+# packed frame = header [magic (uint16), version (uint8), sample count (uint8), base timestamp/milliseconds (uint32)]
+# followed by count records of [timestamp offset/milliseconds (uint16), channels 1-8 (24-bit big-endian, 3 bytes each)]
+# one frame fits in one notification: 8 + 26 * count bytes, so 9 samples with a 247 byte ATT MTU
+PACKED_MAGIC = 0x5AA5
+PACKED_VERSION = 1
+PACKED_HEADER_DTYPE = np.dtype([('magic', '<u2'), ('version', 'u1'), ('count', 'u1'), ('timestamp', '<u4')])
+PACKED_RECORD_DTYPE = np.dtype([('offset', '<u2'), ('channels', 'u1', (8, 3))])
+PACKED_HEADER_SIZE = PACKED_HEADER_DTYPE.itemsize
+PACKED_RECORD_SIZE = PACKED_RECORD_DTYPE.itemsize
+
 logging.basicConfig(level=logging.INFO)
 bleak_logger = logging.getLogger(__name__)
 
+def decode_ble_block(buffer):
+    """Decodes every complete packet in the buffer at once through a structured dtype view.
+
+    :param buffer (bytes-like): The raw BLE bytes, possibly ending with a partial packet.
+
+    :return tuple: A tuple containing the timestamps ((N,) int64 array), the channel data
+               ((8, N) int32 array) and the leftover partial bytes."""
+    n_packets = len(buffer) // PACKET_SIZE
+    records = np.frombuffer(buffer, dtype=PACKET_DTYPE, count=n_packets)
+
+    timestamps = records['timestamp'].astype(np.int64)
+    channel_data = np.ascontiguousarray(records['channels'].T)
+    remainder = bytes(buffer[n_packets * PACKET_SIZE:])
+    return timestamps, channel_data, remainder
+
+def is_packed_frame(data):
+    """Checks whether a notification holds a packed 24-bit frame rather than legacy 36-byte packets.
+
+    :param data (bytes-like): One BLE notification.
+
+    :return bool: True if the header magic, version and sample count match the notification length."""
+    if len(data) < PACKED_HEADER_SIZE:
+        return False
+    header = np.frombuffer(data, dtype=PACKED_HEADER_DTYPE, count=1)[0]
+    return (header['magic'] == PACKED_MAGIC and header['version'] == PACKED_VERSION
+            and len(data) == PACKED_HEADER_SIZE + header['count'] * PACKED_RECORD_SIZE)
+
+def decode_packed_frame(data):
+    """Decodes a packed frame, sign-extending all 24-bit channel values at once.
+
+    :param data (bytes-like): One notification holding a complete packed frame.
+
+    :return tuple: A tuple containing the timestamps ((N,) int64 array) and the channel data
+               ((8, N) int32 array)."""
+    header = np.frombuffer(data, dtype=PACKED_HEADER_DTYPE, count=1)[0]
+    records = np.frombuffer(data, dtype=PACKED_RECORD_DTYPE, count=header['count'], offset=PACKED_HEADER_SIZE)
+
+    timestamps = (int(header['timestamp']) + records['offset'].astype(np.int64)) % 2**32
+    raw = records['channels'].astype(np.int32)
+    values = (raw[..., 0] << 16) | (raw[..., 1] << 8) | raw[..., 2]
+    channel_data = np.ascontiguousarray(((values ^ 0x800000) - 0x800000).T)
+    return timestamps, channel_data
+
 class EEGBLE(QThread):
     """A class for managing BLE connections to an EEG device.
     
-    Inherits from Qthreads and handlings scanning for, connecting, and receiving notifications from the device."""
+    Inherits from Qthreads and handlings scanning for, connecting, and receiving notifications from the device.
+    The address of the last good connection is kept in QSettings so the next connection can skip the scan,
+    and a dropped link is reconnected automatically with backoff."""
     update_status = pyqtSignal(str)
     failure = pyqtSignal()
 
-    def __init__(self, notification_callback):
+    def __init__(self, notification_callback, reconnect_callback=None):
         """Initializes the EEGBLE instance.
 
-        :param notification_callback (callable): Function to handle incoming notifications."""
+        :param notification_callback (callable): Function to handle incoming notifications.
+        :param reconnect_callback (callable): Called without arguments when a dropped link is about to be
+            reconnected, before any notification of the new connection."""
         super().__init__()
         self.client = None
         self.notification_callback = notification_callback
+        self.reconnect_callback = reconnect_callback
+        self.settings = QSettings("GH05T", "BLE")
+        self.stop_requested = False
+        self.link_lost = None
 
     async def connect(self):
-        """Scans for BLE devices, connects to the specified device, and starts
-        notifications."""
-        bleak_logger.info("Scanning for devices...")
-        self.update_status.emit("Scanning for devices...")
-        devices = await BleakScanner.discover(timeout=10.0)
-        esp32_address = None
+        """Connects to the device and starts notifications, then keeps the link up by
+        reconnecting with backoff whenever it drops."""
+        self.stop_requested = False
+        self.link_lost = asyncio.Event()
+        if not await self.open_connection():
+            self.failure.emit()
+            return
+        if self.stop_requested:
+            # stopped while connecting, the disconnect may have missed the new client
+            await self.close_client()
+            return
 
-        for device in devices:
-            if device.name and DEVICE_NAME in device.name:
-                esp32_address = device.address
+        while not self.stop_requested:
+            await self.link_lost.wait()
+            if self.stop_requested:
                 break
 
-        if esp32_address is None:
+            dropped_at = time.perf_counter()
+            delay = RECONNECT_DELAY_MIN
+            bleak_logger.info("Connection lost, reconnecting...")
+            self.update_status.emit("Connection lost, reconnecting...")
+            if self.reconnect_callback is not None:
+                # the device may reboot meanwhile, what arrives next does not continue what came before
+                self.reconnect_callback()
+
+            while not self.stop_requested:
+                if await self.open_connection():
+                    if self.stop_requested:
+                        await self.close_client()
+                        return
+                    gap = time.perf_counter() - dropped_at
+                    bleak_logger.info(f"Time to reconnect: {gap:.2f} s")
+                    self.update_status.emit(f"Reconnected after {gap:.2f} s")
+                    break
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RECONNECT_DELAY_MAX)
+
+    async def open_connection(self):
+        """Connects directly to the cached address, falling back to a scan that returns
+        as soon as the device is seen.
+
+        :return bool: True once notifications are running."""
+        address = self.settings.value("last_address", None)
+        if address:
+            bleak_logger.info(f"Connecting to last known device ({address})...")
+            self.update_status.emit("Connecting to last known device...")
+            if await self.start_client(address):
+                return True
+
+        bleak_logger.info("Scanning for devices...")
+        self.update_status.emit("Scanning for devices...")
+        device = await BleakScanner.find_device_by_filter(
+            lambda d, adv: bool(d.name and DEVICE_NAME in d.name), timeout=SCAN_TIMEOUT
+        )
+
+        if device is None:
             self.update_status.emit("Device not found.")
-            self.failure.emit()
-            return
+            return False
+
+        return await self.start_client(device)
+
+    async def start_client(self, device):
+        """Connects to the device and enables notifications.
 
+        :param device: The address (str) or BLEDevice to connect to.
+
+        :return bool: True if the connection succeeded."""
         try:
-            bleak_logger.info(f"Connecting to device ({esp32_address})...")
+            bleak_logger.info(f"Connecting to device ({device})...")
             self.update_status.emit(f"Connecting to device...")
-            self.client = BleakClient(esp32_address, disconnected_callback=self.disconnect, 
+            self.link_lost.clear()
+            self.client = BleakClient(device, disconnected_callback=self.handle_disconnect,
+                                       timeout=CONNECT_TIMEOUT,
                                        winrt=dict(
                                             use_cached_services=False,
                                             scanning_mode="active"
@@ -57,8 +183,7 @@ class EEGBLE(QThread):
             await self.client.connect()
             if not self.client.is_connected:
                 self.update_status.emit("Failed to connect to device.")
-                self.failure.emit()
-                return
+                return False
 
             bleak_logger.info("Connected successfully!")
             self.update_status.emit("Connected successfully!")
@@ -66,18 +191,34 @@ class EEGBLE(QThread):
             await self.client.start_notify(CHARACTERISTIC_UUID, self.notification_callback)
             print("Notifications enabled.")
 
-            while self.client.is_connected:
-                await asyncio.sleep(0.2)
+            self.settings.setValue("last_address", self.client.address)
+            return True
 
         except Exception as e:
             self.update_status.emit(f"An error occurred during connection: {e}")
-            self.failure.emit()
             logging.exception(e)
             if self.client and self.client.is_connected:
                 await self.client.disconnect()
+            return False
+
+    def handle_disconnect(self, client):
+        """Called by bleak when the link drops, wakes the connect loop to start reconnecting.
+
+        :param client: The BleakClient that disconnected."""
+        if not self.stop_requested:
+            bleak_logger.info(f"Device ({client.address}) disconnected.")
+        if self.link_lost is not None:
+            self.link_lost.set()
 
     async def disconnect_client(self):
         """Disconnects the BLE client and stops notifications."""
+        self.stop_requested = True
+        if self.link_lost is not None:
+            self.link_lost.set()
+        await self.close_client()
+
+    async def close_client(self):
+        """Stops notifications and disconnects the current client, if any."""
         if self.client:
             try:
                 await self.client.stop_notify(CHARACTERISTIC_UUID)
@@ -86,48 +227,90 @@ class EEGBLE(QThread):
                 print(f"Error during disconnection: {e}")
             print("Disconnected successfully!")
 
-class BLEWorker(QThread):
+@register_source
+class BLEWorker(AcquisitionSource):
     """A class for managing the BLE worker thread that communicates with the EEG device.
     
-    This class inherits from QThread and handles notifications and data processing."""
-    status_update_signal = pyqtSignal(str)
-    data_received = pyqtSignal(int, list)
-    connection_failed_signal = pyqtSignal()
+    This class is an AcquisitionSource and handles notifications and data processing.
+    It also emits LinkTelemetry.snapshot() dicts on telemetry_signal."""
+    name = "BLE (ADS1299 PCB)"
+    channel_count = 8
+    sample_rate = 250
+    adc_scale = ADS1299_SCALE
+
+    def __init__(self, block_interval_ms=BLOCK_INTERVAL_MS, interpolate_gaps=False):
+        """Initializes the BLEWorker instance and sets up the BLE device.
 
-    def __init__(self):
-        """Initializes the BLEWorker instance and sets up the BLE device."""
+        :param block_interval_ms: How often decoded samples are emitted as one block.
+        :param interpolate_gaps: Fill short gaps in the device timestamps with interpolated samples."""
         super().__init__()
-        self.ble_device = EEGBLE(self.handle_notification)
+        self.ble_device = EEGBLE(self.handle_notification, self.handle_reconnect)
         self.ble_device.update_status.connect(self.update)
         self.ble_device.failure.connect(self.error)
         self.data_buffer = bytearray()
+        self.accumulator = BlockAccumulator(block_interval_ms)
+        self.telemetry = LinkTelemetry(interpolate_gaps=interpolate_gaps)
+        self.last_report = time.perf_counter()
+        self.loop = None
 
     async def run_ble(self):
         """Initiates the BLE connection process by calling the connect method
         on the EEGBLE instance."""
         await self.ble_device.connect()
+        self.flush()
 
-    async def disconnect(self):
-        """Disconnects the BLE device by calling the disconnect_client method
-        on the EEGBLE instance."""
-        await self.ble_device.disconnect_client()
+    def disconnect(self):
+        """Stops reconnecting and disconnects the BLE device by scheduling the
+        disconnect_client method on the worker's event loop."""
+        self.ble_device.stop_requested = True
+        if self.loop is not None and self.loop.is_running():
+            asyncio.run_coroutine_threadsafe(self.ble_device.disconnect_client(), self.loop)
+
+    def stop(self):
+        """Disconnects the BLE device and waits for the worker thread to finish."""
+        self.disconnect()
+        super().stop()
 
     def handle_notification(self, sender, data):
         """Handles incoming BLE notifications by processing the received data.
 
         :param sender: The sender of the notification.
-        :param data (bytes): The raw data received from the BLE device. 
-            Received in the format [timestamp/milliseconds (1 byte), channels 1-8 (3 bytes each)]"""
-        self.data_buffer.extend(data)
+        :param data (bytes): The raw data received from the BLE device. Either a packed frame
+            (see PACKED_HEADER_DTYPE) or legacy packets in the format
+            [timestamp/milliseconds (uint32), channels 1-8 (int32 each)], detected per notification.
+            Every decoded chunk is passed through the link telemetry before it is queued."""
+        try:
+            if not self.data_buffer and is_packed_frame(data):
+                timestamps, channel_data = decode_packed_frame(data)
+            else:
+                self.data_buffer.extend(data)
+                if len(self.data_buffer) < PACKET_SIZE:
+                    return
+                timestamps, channel_data, remainder = decode_ble_block(self.data_buffer)
+                self.data_buffer = bytearray(remainder)
+        except Exception as e:
+            print(f"Error processing BLE data: {e}")
+            self.status_update_signal.emit(f"Error processing BLE data: {e}")
+            self.data_buffer = bytearray()
+            return
+
+        timestamps, channel_data = self.telemetry.update(timestamps, channel_data)
+        if time.perf_counter() - self.last_report >= TELEMETRY_INTERVAL:
+            self.last_report = time.perf_counter()
+            self.telemetry_signal.emit(self.telemetry.snapshot())
 
-        while len(self.data_buffer) >= 36:
-            full_packet = self.data_buffer[:36]
-            self.data_buffer = self.data_buffer[36:]
+        self.emit_block(self.accumulator.add(timestamps, channel_data))
+
+    def handle_reconnect(self):
+        """Ends the stream from before a dropped link: the samples queued so far are emitted, a
+        partial packet is discarded and the telemetry restarts its time base, keeping its counters."""
+        self.flush()
+        self.data_buffer = bytearray()
+        self.telemetry.reset_continuity()
 
-            result = self.process_ble_data(full_packet)
-            if result:
-                timestamp, channel_data = result
-                self.data_received.emit(timestamp, channel_data)
+    def flush(self):
+        """Emits any samples still waiting for the next block."""
+        self.emit_block(self.accumulator.flush())
 
     def process_ble_data(self, raw_data):
         """Processes the raw BLE data and extracts the timestamp and channel data.
@@ -153,9 +336,9 @@ class BLEWorker(QThread):
     def run(self):
         """The main loop for the QThread, sets up a new asyncio event loop
         and starts the BLE connection process."""
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        loop.run_until_complete(self.run_ble())
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self.run_ble())
 
     def update(self, message):
         """Emits a status update signal with the given message.
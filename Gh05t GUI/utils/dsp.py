@@ -0,0 +1,602 @@
+import os
+import threading
+import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from scipy.signal import butter, iirnotch, tf2sos, sosfilt, sosfilt_zi, sosfiltfilt, lfilter
+from utils.spectral import BinTracker, MAX_TRACKED
+from utils.adaptive import FixedSDED, DualSDED, NLMS
+
+FILTER_ORDER = 5
+NOTCH_Q = 30
+NLMS_TAPS = 64  # weights per channel of the detector's NLMS stage
+FILE_FILTER_CHUNK = 65536  # samples per channel filtered at once in file mode
+FILTER_CACHE_SIZE = 3  # filtered copies of a loaded file kept for switching back to a setting
+SETTLING_TOLERANCE = 1e-4  # impulse response level, relative to its peak, treated as settled
+BANDS = [("delta", 1, 4), ("theta", 4, 8), ("alpha", 8, 13), ("beta", 13, 30), ("gamma", 30, 45)]  # (name, low Hz, high Hz)
+BAND_FILTER_ORDER = 2  # Butterworth order of each band, 4 poles per band pass
+BAND_POWER_SMOOTHING = 0.5  # seconds, time constant of the band power averages
+
+def design_filter(filter_type, freq_range, fs, order=FILTER_ORDER, Q=NOTCH_Q):
+    """Designs the IIR filter behind a Signal Processing filter setting.
+
+    :param filter_type: "Low Pass", "High Pass", "Band Pass" or "Notch".
+    :param freq_range: [low, high] in Hz, only the first value is used except for Band Pass.
+    :param fs: Sample rate in Hz.
+    :param order: Butterworth filter order.
+    :param Q: Quality factor of the notch.
+
+    :return np.ndarray: (n_sections, 6) second-order sections."""
+    nyquist = 0.5 * fs
+    if filter_type == "Notch":
+        return tf2sos(*iirnotch(freq_range[0], Q, fs))
+    if filter_type == "Band Pass":
+        return butter(order, [c / nyquist for c in freq_range], btype='band', output='sos')
+    return butter(order, freq_range[0] / nyquist, btype=filter_type.lower().replace(" ", ""), output='sos')
+
+class FilterBank:
+    """Causal IIR filter for every channel of a stream, keeping its state from block to block.
+
+    The filter is designed once as second-order sections, which stay stable at high orders
+    and narrow bands where (b, a) coefficients do not. The state of all channels is one
+    (n_sections, channels, 2) array, so a block is filtered by a single sosfilt call
+    whatever the channel count.
+
+    Zero samples are channels or packets with no data. They are skipped so they do not
+    advance the filter state, and they stay zero in the output. Channels that are all zero
+    cost nothing, only a channel with some zero samples falls back to its own sosfilt call."""
+
+    def __init__(self, filter_type, freq_range, fs, channels=8, order=FILTER_ORDER):
+        """Designs the filter and initializes the state of every channel.
+
+        :param filter_type: See design_filter.
+        :param freq_range: See design_filter.
+        :param fs: Sample rate in Hz.
+        :param channels: Number of channels filtered.
+        :param order: Butterworth filter order."""
+        self.filter_type = filter_type
+        self.freq_range = list(freq_range)
+        self.sos = design_filter(filter_type, freq_range, fs, order)
+        # steady state for a unit step, as lfilter_zi gives for the (b, a) filter
+        self.zi = np.repeat(sosfilt_zi(self.sos)[:, None, :], channels, axis=1)
+
+    def process(self, data):
+        """Filters a block.
+
+        :param data: (channels, N) array of samples.
+
+        :return np.ndarray: (channels, N) filtered samples."""
+        present = data != 0
+        complete = present.all(axis=1)
+        if complete.all():
+            filtered, self.zi = sosfilt(self.sos, data, axis=1, zi=self.zi)
+            return filtered
+
+        filtered = np.zeros(data.shape)
+        if complete.any():
+            rows = np.flatnonzero(complete)
+            filtered[rows], self.zi[:, rows] = sosfilt(self.sos, data[rows], axis=1, zi=self.zi[:, rows])
+        for channel in np.flatnonzero(present.any(axis=1) & ~complete):
+            mask = present[channel]
+            filtered[channel, mask], self.zi[:, channel] = sosfilt(self.sos, data[channel, mask], zi=self.zi[:, channel])
+        return filtered
+
+class FilterCascade(FilterBank):
+    """Chain of filter stages, e.g. High Pass, then Notch, then Band Pass, run as one FilterBank.
+
+    The sections of every stage are stacked into one SOS matrix, so the whole chain is one
+    sosfilt call per block in real time and one sosfiltfilt call for a file. A cascade
+    built from a previous one takes over the state of the stages the two have in common,
+    so adding or removing a stage does not restart the others."""
+
+    def __init__(self, stages, fs, channels=8, order=FILTER_ORDER, previous=None):
+        """Designs every stage and initializes the state of every channel.
+
+        :param stages: List of (filter_type, freq_range) pairs, see design_filter, in the order they are applied.
+        :param fs: Sample rate in Hz.
+        :param channels: Number of channels filtered.
+        :param order: Butterworth filter order.
+        :param previous: FilterCascade whose state is taken over for the stages kept, or None."""
+        self.stages = [(filter_type, list(freq_range)) for filter_type, freq_range in stages]
+        sections = [design_filter(filter_type, freq_range, fs, order) for filter_type, freq_range in self.stages]
+        self.sos = np.vstack(sections)
+        self.zi = np.repeat(sosfilt_zi(self.sos)[:, None, :], channels, axis=1)
+
+        ends = np.cumsum([len(stage_sections) for stage_sections in sections])
+        self.stage_slices = [slice(end - len(stage_sections), end) for end, stage_sections in zip(ends, sections)]
+        if previous is not None:
+            self.take_state(previous)
+
+    def take_state(self, previous):
+        """Copies the filter state of every stage that is also in the previous cascade.
+
+        :param previous: The cascade being replaced."""
+        if previous.zi.shape[1] != self.zi.shape[1]:
+            return
+        unused = list(range(len(previous.stages)))
+        for stage, stage_slice in zip(self.stages, self.stage_slices):
+            for i in unused:
+                if previous.stages[i] == stage:
+                    self.zi[stage_slice] = previous.zi[previous.stage_slices[i]]
+                    unused.remove(i)
+                    break
+
+    def filtfilt(self, data):
+        """Zero-phase filters a whole recording, forwards and backwards through the cascade.
+
+        :param data: (channels, N) array of samples.
+
+        :return np.ndarray: (channels, N) filtered samples, see zero_phase_filter."""
+        return zero_phase_filter(self.sos, data)
+
+def zero_phase_padlen(sos):
+    """Edge padding sosfiltfilt uses for a filter, in samples.
+
+    :param sos: (n_sections, 6) second-order sections.
+
+    :return int: Samples mirrored at each end."""
+    ntaps = 2 * len(sos) + 1 - min((sos[:, 2] == 0).sum(), (sos[:, 5] == 0).sum())
+    return 3 * int(ntaps)
+
+def _filtfilt_channel(sos, x, out, chunk_size, padlen, tick, cancel):
+    """Forward-backward filters one channel chunk by chunk, like sosfiltfilt with odd padding.
+
+    The forward pass writes into out and the backward pass filters out in place, from the
+    end, so only a chunk is ever allocated on top of out.
+
+    :return bool: False if cancelled."""
+    zi = sosfilt_zi(sos)
+    n = len(x)
+    front = 2 * x[0] - x[padlen:0:-1]
+    back = 2 * x[-1] - x[-2:-padlen - 2:-1]
+
+    _, state = sosfilt(sos, front, zi=zi * front[0])
+    for start in range(0, n, chunk_size):
+        if cancel is not None and cancel.is_set():
+            return False
+        out[start:start + chunk_size], state = sosfilt(sos, x[start:start + chunk_size], zi=state)
+        tick()
+    back, state = sosfilt(sos, back, zi=state)
+
+    # backwards from the end of the padding, whose state the recording continues from
+    _, state = sosfilt(sos, back[::-1], zi=zi * back[-1])
+    for stop in range(n, 0, -chunk_size):
+        if cancel is not None and cancel.is_set():
+            return False
+        start = max(stop - chunk_size, 0)
+        filtered, state = sosfilt(sos, out[start:stop][::-1], zi=state)
+        out[start:stop] = filtered[::-1]
+        tick()
+    return True
+
+def zero_phase_filter(sos, data, chunk_size=FILE_FILTER_CHUNK, workers=None, progress=None, cancel=None):
+    """Zero-phase filters a whole recording in chunks, giving the same result as sosfiltfilt.
+
+    sosfiltfilt pads, filters and reverses the whole array at once, which takes several
+    copies of the recording. Here every channel is filtered forwards and then backwards
+    one chunk at a time into the output, so memory beyond the output stays at a chunk per
+    worker. Channels are filtered in parallel, sosfilt releases the GIL.
+
+    :param sos: (n_sections, 6) second-order sections, e.g. FilterCascade.sos.
+    :param data: (channels, N) array of samples.
+    :param chunk_size: Samples per channel filtered at once.
+    :param workers: Number of threads, one per channel up to the CPU count if None.
+    :param progress: Called with the fraction done, from the worker threads, or None.
+    :param cancel: threading.Event that stops the filtering when set, or None.
+
+    :return np.ndarray: (channels, N) filtered samples, or None if cancelled."""
+    data = np.atleast_2d(data)
+    padlen = zero_phase_padlen(sos)
+    if data.shape[1] <= padlen:
+        raise ValueError(f"Recording too short to filter, needs more than {padlen} samples")
+
+    out = np.empty(data.shape)
+    steps = 2 * len(data) * -(-data.shape[1] // chunk_size)
+    done = [0]
+    progress_lock = threading.Lock()
+
+    def tick():
+        if progress is None:
+            return
+        with progress_lock:
+            done[0] += 1
+            fraction = done[0] / steps
+        progress(fraction)
+
+    workers = workers or min(len(data), os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        jobs = [pool.submit(_filtfilt_channel, sos, data[channel], out[channel], chunk_size, padlen, tick, cancel)
+                for channel in range(len(data))]
+        finished = [job.result() for job in jobs]
+    return out if all(finished) else None
+
+def settling_samples(sos, tolerance=SETTLING_TOLERANCE, limit=2 ** 20):
+    """Length of the impulse response of a filter until it stays below tolerance of its peak.
+
+    A span filtered with this many extra samples on each side matches the same span of the
+    whole filtered recording to about that tolerance.
+
+    :param sos: (n_sections, 6) second-order sections.
+    :param tolerance: Level, relative to the peak, below which the response counts as settled.
+    :param limit: Longest response looked at, in samples.
+
+    :return int: Number of samples."""
+    n = 256
+    while True:
+        impulse = np.zeros(n)
+        impulse[0] = 1
+        response = np.abs(sosfilt(sos, impulse))
+        last = np.flatnonzero(response > tolerance * response.max())[-1] + 1
+        if last < n // 2 or n >= limit:
+            return int(last)
+        n *= 2
+
+class FilteredView:
+    """A loaded recording as it looks through a filter, computed as far as it is looked at.
+
+    Behaves like the (channels, N) filtered array for the plots: slicing a range of samples
+    zero-phase filters only that range plus settling margins, so the visible part of a long
+    file shows at once. Once the whole recording has been filtered (full is set, e.g. by
+    a FileFilterWorker) slices come straight from it. Anything that needs the whole array
+    (np.asarray, a row of every sample) filters it on the spot."""
+    ndim = 2
+    dtype = np.dtype(np.float64)
+
+    def __init__(self, sos, data):
+        """Initializes the view, nothing is filtered yet.
+
+        :param sos: (n_sections, 6) second-order sections.
+        :param data: (channels, N) array with the unfiltered recording."""
+        self.sos = sos
+        self.source = data
+        self.shape = data.shape
+        self.size = data.size
+        self.margin = settling_samples(sos)
+        self.full = None
+        self.last_span = None  # (start, stop, filtered), the animations ask for the same span more than once
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __array__(self, dtype=None, copy=None):
+        if self.full is None:
+            self.full = zero_phase_filter(self.sos, self.source)
+        return self.full if dtype is None else self.full.astype(dtype)
+
+    @property
+    def T(self):
+        return np.asarray(self).T
+
+    def __getitem__(self, key):
+        if self.full is not None:
+            return self.full[key]
+        rows, columns = key if isinstance(key, tuple) else (key, slice(None))
+        if isinstance(columns, slice) and columns.step in (None, 1):
+            start, stop, _ = columns.indices(self.shape[1])
+            return self.span(start, max(start, stop))[rows]
+        return np.asarray(self)[key]
+
+    def span(self, start, stop):
+        """Filters the samples in [start, stop) of every channel.
+
+        :param start: First sample.
+        :param stop: Sample after the last one.
+
+        :return np.ndarray: (channels, stop - start) filtered samples."""
+        if self.last_span is not None and self.last_span[:2] == (start, stop):
+            return self.last_span[2]
+        low = max(start - self.margin, 0)
+        high = min(stop + self.margin, self.shape[1])
+        if high - low <= zero_phase_padlen(self.sos) or (low == 0 and high == self.shape[1]):
+            return np.asarray(self)[:, start:stop]
+        filtered = sosfiltfilt(self.sos, self.source[:, low:high], axis=-1)[:, start - low:stop - low]
+        self.last_span = (start, stop, filtered)
+        return filtered
+
+class FilterCache:
+    """FilteredViews of one loaded recording, by filter cascade.
+
+    Applying a cascade that was used recently gives back its view, already filtered if its
+    background pass finished, so switching between settings does not filter again. Only
+    the most recent few are kept, each full view holds a copy of the recording."""
+
+    def __init__(self, data, fs, size=FILTER_CACHE_SIZE):
+        """Initializes an empty cache.
+
+        :param data: (channels, N) array with the unfiltered recording.
+        :param fs: Sample rate in Hz.
+        :param size: Number of views kept."""
+        self.data = data
+        self.fs = fs
+        self.size = size
+        self.views = OrderedDict()
+
+    def get(self, stages):
+        """The view of the recording through a cascade, created if not cached.
+
+        :param stages: List of (filter_type, freq_range) pairs, see FilterCascade.
+
+        :return FilteredView: The view."""
+        key = tuple((filter_type, tuple(freq_range)) for filter_type, freq_range in stages)
+        if key in self.views:
+            self.views.move_to_end(key)
+            return self.views[key]
+        view = FilteredView(FilterCascade(stages, self.fs).sos, self.data)
+        self.views[key] = view
+        while len(self.views) > self.size:
+            self.views.popitem(last=False)
+        return view
+
+class BandPower:
+    """Streaming power of every channel in the EEG bands.
+
+    Each band is a band-pass filter whose output is squared and exponentially averaged,
+    so a block costs the same few operations per sample whatever the history length,
+    with the filter and average states kept from block to block. All channels of a band
+    go through one sosfilt call and all bands through one average.
+
+    The power is in the squared unit of the samples (mV² for the pipeline)."""
+
+    def __init__(self, fs, channels=8, bands=BANDS, smoothing=BAND_POWER_SMOOTHING, order=BAND_FILTER_ORDER):
+        """Designs the band filters.
+
+        :param fs: Sample rate in Hz.
+        :param channels: Number of channels.
+        :param bands: List of (name, low, high) bands in Hz, bands reaching Nyquist are left out.
+        :param smoothing: Time constant of the averages in seconds.
+        :param order: Butterworth order of each band filter."""
+        self.bands = [band for band in bands if band[2] < 0.5 * fs]
+        self.names = [name for name, _, _ in self.bands]
+        self.channels = channels
+        self.sos = [butter(order, [low, high], btype='band', fs=fs, output='sos') for _, low, high in self.bands]
+        self.zi = [np.zeros((sos.shape[0], channels, 2)) for sos in self.sos]
+
+        # exponential average y[n] = a * x[n] + (1 - a) * y[n - 1]
+        self.alpha = 1 - np.exp(-1 / (smoothing * fs))
+        self.average_zi = np.zeros((len(self.bands) * channels, 1))
+        self.power = np.zeros((len(self.bands), channels))
+
+    def process(self, data):
+        """Updates the band powers with a block.
+
+        :param data: (channels, N) array of samples.
+
+        :return np.ndarray: (bands, channels) power after the last sample of the block."""
+        if data.shape[1] == 0:
+            return self.power
+        squared = np.empty((len(self.bands), self.channels, data.shape[1]))
+        for i, sos in enumerate(self.sos):
+            filtered, self.zi[i] = sosfilt(sos, data, axis=1, zi=self.zi[i])
+            np.square(filtered, out=squared[i])
+
+        averaged, self.average_zi = lfilter([self.alpha], [1, self.alpha - 1], squared.reshape(-1, data.shape[1]),
+                                            axis=1, zi=self.average_zi)
+        self.power = averaged[:, -1].reshape(len(self.bands), self.channels)
+        return self.power
+
+class EMGDetector:
+    """EMG/eye-blink detector state and update rules (SDED thresholds with an NLMS stage).
+
+    Holds no Qt objects, so the same detector runs in the processing thread or in the DSP
+    process. Its stages switch on the number of samples processed since restart, not on
+    the clock, so the same samples give the same spikes however fast they are processed."""
+
+    def __init__(self, sampling_rate=250):
+        """Initializes the detector with untrained thresholds.
+
+        :param sampling_rate: Sample rate of the source in Hz, the stage durations are counted in its samples."""
+        self.alpha = 0.1
+        self.alpha_delta = 0.1 # adaptive change
+        self.delta_init = 1000 # threshold
+        self.use_adaptive = False 
+        self.nlms_start = 5  # seconds after the start of labeling before the NLMS stage runs
+        self.adapt_duration = 10  # seconds the thresholds adapt to the labels before the default model detects
+        self.sampling_rate = sampling_rate
+        self.processed = 0  # samples since restart
+
+        # second stage: each channel predicted from its own past, the prediction error goes to the thresholds
+        self.canceller = NLMS(8, NLMS_TAPS, mu=0.99, eps=1e-6)
+        self.cancelling = False
+
+        # per-channel SDED state, the thresholds of all 8 channels are updated in one call
+        self.fixed = FixedSDED(8, self.alpha, self.delta_init)
+        self.dual = DualSDED(8, self.alpha, self.delta_init, self.delta_init, q=2, max_cap=19000)
+
+    def restart(self, sampling_rate=None):
+        """Starts counting the stage durations again, when the model is applied. The thresholds and weights are kept.
+
+        :param sampling_rate: Sample rate of the source in Hz, None to keep the current one."""
+        if sampling_rate is not None:
+            self.sampling_rate = sampling_rate
+        self.processed = 0
+
+    def adapting(self):
+        """Whether the default model still adapts its thresholds to the labels instead of detecting.
+
+        :return bool: True during the first adapt_duration seconds of samples after restart."""
+        return self.processed < self.adapt_duration * self.sampling_rate
+
+    def detect_emg(self, raw_data, label=None, mode=None):
+        """Runs a block through the detector: the NLMS stage, once it started, then the SDED thresholds.
+
+        :param raw_data: (8, N) array of samples.
+        :param label: True label of the samples, read in adaptive mode.
+        :param mode: 'adaptive' to adapt the dual thresholds to label.
+
+        :return tuple: The (8, N) spikes and the (8, N) samples the thresholds were applied to."""
+        x = np.asarray(raw_data, dtype=float)
+
+        # NLMS Implementation -- Second Stage of Training
+        started = self.processed >= self.nlms_start * self.sampling_rate
+        self.processed += x.shape[1]
+        if started:
+            if not self.cancelling:
+                # the dual thresholds learn again, at the first rate, on the filtered signal
+                self.cancelling = True
+                self.dual.t[:] = 0
+            _, x = self.canceller.process(x)
+
+        if self.use_adaptive:
+            _, spikes = self.dual.process(x, label if mode == 'adaptive' else None)
+        else:
+            _, spikes = self.fixed.process(x)
+        return spikes, x
+
+class Pipeline:
+    """The real-time processing of one session, without the threads or processes around it.
+
+    Scales raw values to millivolts, filters, tracks the band powers and chosen frequencies,
+    runs the detector and assigns labels. Settings can be changed from another thread while blocks are processed,
+    they apply from the next block."""
+
+    def __init__(self, sampling_rate=250, adc_scale=1.0, channel_count=8):
+        """Initializes the pipeline with no filter, detector or labeling.
+
+        :param sampling_rate: Sample rate of the source in Hz.
+        :param adc_scale: Raw value to millivolts.
+        :param channel_count: Channels with real data, rows past this are zeroed."""
+        self.sampling_rate = sampling_rate
+        self.adc_scale = adc_scale
+        self.channel_count = channel_count
+        self.settings_lock = threading.Lock()
+
+        self.filter_bank = None
+        self.pending_stages = None  # cascade to switch to at the next block
+        self.labeling_mode = False
+        self.label = 0
+        self.toggle = 0
+        self.detector = None
+        self.default_model = 0
+        self.band_power_enabled = False
+        self.band_power = None
+        self.band_powers = None  # (len(BANDS), 8) band powers after the last block, None while off
+        self.pending_frequencies = None  # frequencies to track from the next block
+        self.bin_tracker = None
+        self.bin_magnitudes = None  # (MAX_TRACKED, 8) magnitudes of the tracked frequencies, None while off
+
+    def set_filter(self, filter_type, freq_range):
+        """Selects a single real-time filter.
+
+        :param filter_type: "Low Pass", "High Pass", "Band Pass", "Notch", or None for no filter.
+        :param freq_range: [low, high] in Hz."""
+        self.set_filter_stages([] if filter_type is None else [(filter_type, freq_range)])
+
+    def set_filter_stages(self, stages):
+        """Selects the real-time filter cascade. Stages kept from the current cascade keep their state.
+
+        :param stages: List of (filter_type, freq_range) pairs in the order they are applied, empty for no filter."""
+        with self.settings_lock:
+            self.pending_stages = list(stages)
+
+    def set_band_power(self, enabled):
+        """Turns the band power stage on or off, its averages start over when turned on.
+
+        :param enabled: True to track the power of every channel in the BANDS."""
+        with self.settings_lock:
+            self.band_power_enabled = enabled
+
+    def set_tracked_frequencies(self, frequencies):
+        """Selects the frequencies whose magnitudes are tracked, see BinTracker.
+
+        :param frequencies: Frequencies in Hz, empty to stop tracking."""
+        with self.settings_lock:
+            self.pending_frequencies = list(frequencies)
+
+    def set_labeling_mode(self, enabled):
+        """Turns labeling of the samples on or off.
+
+        :param enabled: True to assign labels to every sample."""
+        with self.settings_lock:
+            self.labeling_mode = enabled
+
+    def press_label(self):
+        """Marks the next sample with label 1."""
+        with self.settings_lock:
+            self.label = 1
+
+    def toggle_label(self):
+        """Starts or stops marking every sample with label 1."""
+        with self.settings_lock:
+            self.toggle = not self.toggle
+
+    def set_model(self, detector, default_model):
+        """Selects the EMG detector run on every block, restarted at the sample rate of the pipeline.
+
+        :param detector: EMGDetector to run, or None to stop detecting.
+        :param default_model: Whether the default eye-blink model is selected, detection adapts to the labels first."""
+        if detector is not None:
+            detector.restart(self.sampling_rate)
+        with self.settings_lock:
+            self.detector = detector
+            self.default_model = default_model
+
+    def process(self, data):
+        """Runs one block through the pipeline.
+
+        :param data: (8, N) array with the raw samples.
+
+        :return tuple: The (8, N) processed samples, the (N,) labels and whether labeling
+                       mode was on for this block (the labels are all zero if not)."""
+        new_data = np.array(data, dtype=float).reshape((8, -1))
+        n_samples = new_data.shape[1]
+
+        # raw values to millivolts, channels the source does not carry stay at zero
+        new_data *= self.adc_scale
+        new_data[self.channel_count:] = 0
+
+        with self.settings_lock:
+            stages, self.pending_stages = self.pending_stages, None
+            detector = self.detector
+            default_model = self.default_model
+            band_power_enabled = self.band_power_enabled
+            frequencies, self.pending_frequencies = self.pending_frequencies, None
+
+        if stages is not None:
+            # rebuilt here, between blocks, so the state taken over is not being updated meanwhile;
+            # only the channels the source carries are filtered, the rest stay zero
+            self.filter_bank = FilterCascade(stages, self.sampling_rate, self.channel_count, previous=self.filter_bank) if stages else None
+        filter_bank = self.filter_bank
+
+        processed = new_data
+        if filter_bank is not None:
+            processed = np.zeros(new_data.shape)
+            processed[:self.channel_count] = filter_bank.process(new_data[:self.channel_count])
+
+        if not band_power_enabled:
+            self.band_power = self.band_powers = None
+        else:
+            if self.band_power is None:
+                self.band_power = BandPower(self.sampling_rate, self.channel_count)
+            power = self.band_power.process(processed[:self.channel_count])
+            self.band_powers = np.zeros((len(BANDS), 8))
+            self.band_powers[:power.shape[0], :self.channel_count] = power
+
+        if frequencies is not None:
+            tracker = BinTracker(frequencies, self.sampling_rate, self.channel_count)
+            self.bin_tracker = tracker if tracker.frequencies else None
+        self.bin_magnitudes = None
+        if self.bin_tracker is not None:
+            magnitudes = self.bin_tracker.process(processed[:self.channel_count])
+            self.bin_magnitudes = np.zeros((MAX_TRACKED, 8))
+            self.bin_magnitudes[:magnitudes.shape[1], :self.channel_count] = magnitudes.T
+
+        spikes = np.zeros(n_samples, dtype=bool)
+        if detector is not None and default_model:
+            if detector.adapting():
+                detector.detect_emg(new_data, self.label, mode='adaptive')
+            else:
+                spikes = np.any(detector.detect_emg(new_data)[0], axis=0)
+
+        with self.settings_lock:
+            labeling_mode = self.labeling_mode
+            if labeling_mode:
+                # a pressed or detected label marks one sample, a toggled label marks every sample
+                labels = np.full(n_samples, int(self.toggle))
+                labels[0] = self.label
+                labels[spikes] = 1
+                self.label = int(self.toggle)
+            else:
+                labels = np.zeros(n_samples)
+                if np.any(spikes):
+                    self.label = 1
+        return processed, labels, labeling_mode
@@ -0,0 +1,235 @@
+import time
+import logging
+import multiprocessing
+import numpy as np
+from PyQt5.QtCore import QThread, pyqtSignal
+from utils.dsp import Pipeline, EMGDetector, BANDS
+from utils.processing import BAND_RING_CAPACITY, BIN_RING_CAPACITY, publish_band_power, tracked_message
+from utils.spectral import MAX_TRACKED, trackable
+from utils.ring_buffer import SharedRingBuffer
+
+RAW_CAPACITY = 8192  # raw samples the DSP process may fall behind before samples are lost
+MAX_BLOCK = 256  # most samples the DSP process takes from the raw ring at once
+POLL_INTERVAL = 0.002  # seconds the DSP process waits for control messages when the raw ring is empty
+RECORD_INTERVAL = 0.01  # seconds between reads of the result ring by the recorder thread
+STOP_TIMEOUT = 10  # seconds to wait for the DSP process to start up if needed and finish the raw ring
+
+logging.basicConfig(level=logging.INFO)
+dsp_logger = logging.getLogger(__name__)
+
+# spawn, not fork, so the child does not inherit the Qt and bleak threads
+CONTEXT = multiprocessing.get_context("spawn")
+
+def create_shared_ring(channels, capacity):
+    """Creates a SharedRingBuffer whose lock works with the DSP process.
+
+    :param channels: Number of rows stored per sample.
+    :param capacity: Number of samples kept.
+
+    :return SharedRingBuffer: The new buffer, close it once the session ends."""
+    return SharedRingBuffer(channels, capacity, lock=CONTEXT.Lock())
+
+def run_dsp_process(raw_ring, result_ring, band_ring, bin_ring, control, sampling_rate, adc_scale, channel_count):
+    """Entry point of the DSP process.
+
+    Takes raw samples from raw_ring, runs them through a Pipeline and writes the processed
+    samples with their labels to result_ring. Settings arrive on the control pipe as
+    (command, *arguments) tuples, ("stop",) finishes the raw ring and exits.
+
+    :param raw_ring: SharedRingBuffer with 8 rows of raw samples, timestamps in milliseconds.
+    :param result_ring: SharedRingBuffer with 8 processed rows and a label row, timestamps in seconds.
+    :param band_ring: SharedRingBuffer receiving a column of band powers per block, see ProcessingWorker.band_ring.
+    :param bin_ring: SharedRingBuffer receiving a column of tracked frequency magnitudes per block, see Pipeline.bin_magnitudes.
+    :param control: Child end of the control Pipe.
+    :param sampling_rate: Sample rate of the source in Hz.
+    :param adc_scale: Raw value to millivolts.
+    :param channel_count: Channels with real data."""
+    pipeline = Pipeline(sampling_rate, adc_scale, channel_count)
+    reader = raw_ring.reader(start=0)
+    commands = {
+        "filter": pipeline.set_filter,
+        "stages": pipeline.set_filter_stages,
+        "band_power": pipeline.set_band_power,
+        "track": pipeline.set_tracked_frequencies,
+        "labeling": pipeline.set_labeling_mode,
+        "press": pipeline.press_label,
+        "toggle": pipeline.toggle_label,
+        "model": lambda enabled, default_model: pipeline.set_model(
+            EMGDetector(sampling_rate) if enabled else None, default_model),
+    }
+
+    stopping = False
+    processed_samples = 0
+    while True:
+        while control.poll():
+            command, *arguments = control.recv()
+            if command == "stop":
+                stopping = True
+            else:
+                commands[command](*arguments)
+
+        samples, timestamps = reader.read_copy(MAX_BLOCK)
+        if len(timestamps) == 0:
+            if stopping:
+                break
+            control.poll(POLL_INTERVAL)
+            continue
+
+        processed, labels, _ = pipeline.process(samples)
+        result_ring.write(np.vstack((processed, labels)), timestamps / 1000.0)
+        if pipeline.band_powers is not None:
+            band_ring.write(pipeline.band_powers.reshape(-1, 1), timestamps[-1:] / 1000.0)
+        if pipeline.bin_magnitudes is not None:
+            bin_ring.write(pipeline.bin_magnitudes.reshape(-1, 1), timestamps[-1:] / 1000.0)
+        processed_samples += len(timestamps)
+
+    control.send(("stopped", processed_samples, reader.overruns))
+    raw_ring.close()
+    result_ring.close()
+    band_ring.close()
+    bin_ring.close()
+
+class DSPProcess(QThread):
+    """Runs the real-time pipeline in a separate process, connected through shared memory.
+
+    A drop-in for ProcessingWorker. submit writes raw blocks into a shared ring, the DSP
+    process filters, detects and labels them into the session ring (a SharedRingBuffer the
+    plots read), and this thread records the results and broadcasts labels, band powers and
+    tracked frequencies. DSP and
+    rendering then no longer share one GIL. Settings go to the DSP process over a Pipe."""
+    status_update_signal = pyqtSignal(str)
+
+    def __init__(self, ring, file_handler, ws_server=None, sampling_rate=250, adc_scale=1.0, channel_count=8):
+        """Creates the raw ring and starts the DSP process.
+
+        :param ring: SharedRingBuffer with 8 channel rows and a label row that receives the processed samples.
+        :param file_handler: FileHandler that records every processed sample.
+        :param ws_server: WebSocketServer that labels are broadcast on, or None.
+        :param sampling_rate: Sample rate of the source in Hz.
+        :param adc_scale: Raw value to millivolts.
+        :param channel_count: Channels with real data, rows past this are zeroed."""
+        super().__init__()
+        self.ring = ring
+        self.file_handler = file_handler
+        self.ws_server = ws_server
+        self.sampling_rate = sampling_rate
+        self.channel_count = channel_count
+        self.labeling_mode = False
+        self.tracked_frequencies = []
+        self.running = False
+
+        self.raw_ring = create_shared_ring(8, RAW_CAPACITY)
+        self.band_ring = create_shared_ring(len(BANDS) * 8, BAND_RING_CAPACITY)
+        self.bin_ring = create_shared_ring(MAX_TRACKED * 8, BIN_RING_CAPACITY)
+        self.control, child_control = CONTEXT.Pipe()
+        self.process = CONTEXT.Process(
+            target=run_dsp_process,
+            args=(self.raw_ring, ring, self.band_ring, self.bin_ring, child_control, sampling_rate, adc_scale, channel_count),
+            daemon=True,
+        )
+        self.process.start()
+        self.recorder_reader = ring.reader()
+        self.band_reader = self.band_ring.reader()
+        self.bin_reader = self.bin_ring.reader()
+
+    def send(self, *message):
+        """Sends a control message to the DSP process, from the GUI thread.
+
+        :param message: The command and its arguments."""
+        self.control.send(message)
+
+    def submit(self, timestamps, data):
+        """Writes a block from the source to the raw ring, called from the source's thread.
+
+        :param timestamps: (N,) array with the timestamp of each sample in milliseconds.
+        :param data: (8, N) array with the raw samples."""
+        if data is None or len(timestamps) == 0:
+            return
+        self.raw_ring.write(np.asarray(data).reshape((8, -1)), np.asarray(timestamps))
+
+    def set_filter(self, filter_type, freq_range):
+        """Selects the real-time filter, see Pipeline.set_filter."""
+        self.send("filter", filter_type, list(freq_range))
+
+    def set_filter_stages(self, stages):
+        """Selects the real-time filter cascade, see Pipeline.set_filter_stages."""
+        self.send("stages", [(filter_type, list(freq_range)) for filter_type, freq_range in stages])
+
+    def set_band_power(self, enabled):
+        """Turns the band power stage on or off, see Pipeline.set_band_power."""
+        self.send("band_power", enabled)
+
+    def set_tracked_frequencies(self, frequencies):
+        """Selects the tracked frequencies, see Pipeline.set_tracked_frequencies."""
+        self.tracked_frequencies = trackable(frequencies, self.sampling_rate)
+        self.send("track", [float(frequency) for frequency in frequencies])
+
+    def set_labeling_mode(self, enabled):
+        """Turns labeling on or off, see Pipeline.set_labeling_mode."""
+        self.labeling_mode = enabled
+        self.send("labeling", enabled)
+
+    def press_label(self):
+        """Marks the next sample with label 1."""
+        self.send("press")
+
+    def toggle_label(self):
+        """Starts or stops marking every sample with label 1."""
+        self.send("toggle")
+
+    def set_model(self, detector, default_model):
+        """Selects the EMG detector. The DSP process runs its own EMGDetector, so only whether
+        there is one is sent.
+
+        :param detector: Any detector to enable detection, or None to disable it.
+        :param default_model: Whether the default eye-blink model is selected."""
+        self.send("model", detector is not None, default_model)
+
+    def run(self):
+        """The main loop for the QThread, records processed samples until stop is called."""
+        self.running = True
+        while self.running:
+            time.sleep(RECORD_INTERVAL)
+            self.record()
+        self.record()
+
+    def record(self):
+        """Hands everything the DSP process wrote since the last call to the recorder."""
+        while self.recorder_reader.available():
+            samples, timestamps = self.recorder_reader.read_copy()
+            # back to integer milliseconds for raw_data.bin
+            timestamps = np.rint(timestamps * 1000).astype(np.int64)
+            if self.labeling_mode:
+                labels = samples[8]
+                self.file_handler.add_data(timestamps, samples[:8], labels)
+                if self.ws_server is not None:
+                    self.ws_server.send_data({"label": int(labels.max())})
+            else:
+                self.file_handler.add_data(timestamps, samples[:8])
+        if self.band_reader.available():
+            powers, timestamps = self.band_reader.read_copy()
+            for column, timestamp in enumerate(np.rint(timestamps * 1000).astype(np.int64)):
+                publish_band_power(self.file_handler, self.ws_server, timestamp, powers[:, column].reshape(len(BANDS), 8), self.channel_count)
+        if self.bin_reader.available():
+            magnitudes, timestamps = self.bin_reader.read_copy()
+            if self.ws_server is not None and self.tracked_frequencies:
+                for column, timestamp in enumerate(timestamps):
+                    self.ws_server.send_data(tracked_message(timestamp, self.tracked_frequencies,
+                                                             magnitudes[:, column].reshape(MAX_TRACKED, 8), self.channel_count))
+
+    def stop(self):
+        """Lets the DSP process finish the raw ring, records the rest and releases the shared memory."""
+        if self.process.is_alive():
+            self.send("stop")
+            if self.control.poll(STOP_TIMEOUT):
+                _, processed, overruns = self.control.recv()
+                dsp_logger.info(f"DSP process stopped after {processed} samples, {overruns} lost")
+            self.process.join(STOP_TIMEOUT)
+            if self.process.is_alive():
+                self.process.terminate()
+
+        self.running = False
+        self.wait(1000)
+        self.raw_ring.close()
+        self.band_ring.close()
+        self.bin_ring.close()
@@ -1,17 +1,30 @@
+import os
 import pyedflib
 import csv
 import numpy as np
 import struct
 from threading import Thread, Lock
 from queue import Queue, Empty
+from utils.dsp import BANDS
+
+# one raw_data.bin entry = [timestamp (uint32), channels 1-8 (float32), has_label (uint8), label (float32)]
+RAW_ENTRY_DTYPE = np.dtype([
+    ('timestamp', '<u4'),
+    ('channels', '<f4', (8,)),
+    ('has_label', 'u1'),
+    ('label', '<f4'),
+])
 
 class FileHandler:
-    def __init__(self):
+    def __init__(self, raw_file_path="data/raw_data.bin"):
         """Initialize the file handler with a background writer.
         
-        :param raw_file_path: Path to the binary file for storing raw data."""
-        self.raw_file_path = "data/raw_data.bin"  
+        :param raw_file_path: Path to the binary file for storing raw data, band powers go to
+                              a CSV file next to it."""
+        self.raw_file_path = raw_file_path
+        self.band_power_path = os.path.splitext(raw_file_path)[0] + "_band_power.csv"
         self.data_queue = Queue()
+        self.band_queue = Queue()
         self.running = True
         self.lock = Lock()
         self.worker_thread = Thread(target=self._write_worker, daemon=True)
@@ -26,26 +39,50 @@ class FileHandler:
                         data = self.data_queue.get(timeout=0.1)
                         data_batch.append(data)
                 except Empty:
-                    data_batch = []
+                    pass  # write whatever arrived before the queue went quiet
                 
                 if data_batch:
-                    packed = b''
-                    for timestamp, channels, label in data_batch:
-                        has_label = 1 if label is not None else 0
-                        label_value = label if has_label else 0.0
-                        packed += struct.pack(
-                            '<I8fBf',
-                            timestamp,
-                            *channels,
-                            has_label,
-                            label_value
-                        )
-                    f.write(packed)
+                    for timestamps, channels, labels in data_batch:
+                        entries = np.zeros(len(timestamps), dtype=RAW_ENTRY_DTYPE)
+                        entries['timestamp'] = timestamps
+                        entries['channels'] = np.asarray(channels).T
+                        if labels is not None:
+                            entries['has_label'] = 1
+                            entries['label'] = labels
+                        f.write(entries.tobytes())
                     f.flush()
 
-    def add_data(self, timestamp, channels, label=None):
-        """Add new data to the write queue (non-blocking)."""
-        self.data_queue.put((timestamp, channels, label))
+                band_rows = []
+                while not self.band_queue.empty():
+                    band_rows.append(self.band_queue.get_nowait())
+                if band_rows:
+                    self._write_band_power(band_rows)
+
+    def _write_band_power(self, rows):
+        """Appends band power rows to the band power CSV file, with a header if it is new.
+
+        :param rows: List of (timestamp, powers) as given to add_band_power."""
+        with open(self.band_power_path, 'a', newline='') as f:
+            writer = csv.writer(f)
+            if f.tell() == 0:
+                writer.writerow(["Time"] + [f"Ch{ch + 1} {name}" for name, _, _ in BANDS for ch in range(8)])
+            for timestamp, powers in rows:
+                writer.writerow([timestamp / 1000.0] + np.asarray(powers).ravel().tolist())
+
+    def add_data(self, timestamps, channels, labels=None):
+        """Add a block of new data to the write queue (non-blocking).
+
+        :param timestamps: (N,) array of sample timestamps in milliseconds.
+        :param channels: (8, N) array of channel data.
+        :param labels: Optional (N,) array of labels."""
+        self.data_queue.put((timestamps, channels, labels))
+
+    def add_band_power(self, timestamp, powers):
+        """Add the band powers after a block to the write queue (non-blocking).
+
+        :param timestamp: Timestamp of the last sample of the block in milliseconds.
+        :param powers: (len(BANDS), 8) array of band powers."""
+        self.band_queue.put((timestamp, np.array(powers)))
 
     def stop(self):
         """Stop the background writer and clean up."""
@@ -1,13 +1,14 @@
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
 from PyQt5.QtWidgets import QSizePolicy
-import pyfftw
 import numpy as np
 import time
 import mne
 from mne.channels import make_dig_montage
 from matplotlib.collections import LineCollection
 import matplotlib.animation as animation
+from utils.spectral import spectrum
+from utils.dsp import BANDS
 
 class PlotManager:
     def __init__(self, window):
@@ -38,11 +39,17 @@ class PlotManager:
         self.animf = None
         self.animf_show = False
         self.anim_topography = None
+        self.anim_band_power = None
+        self.band_bars = None
+        self.band_powers = None  # (len(BANDS), 8) newest band powers in real-time mode
         self.topo = False
         self.offset = 0
         self.dt = 0
         self.n_plot = 2000  # max data in data buffer
         self.sigbufs_plot = None
+        self.reader = None  # RingReader on the session buffer in real-time mode
+        self.spectral = None  # SpectralEngine shared by the real-time spectrum plots
+        self.spectrum_version = None  # version of the spectrum drawn last
 
         self.figure.patch.set_alpha(0)
         self.canvas.setStyleSheet("background:#85a0bb;")
@@ -59,6 +66,7 @@ class PlotManager:
         self.ble_reading = False
         self.web_socket = False
         self.sampling_rate = 250
+        self.channel_count = 8  # channels with data in real-time mode
         self.labeling_mode = False
 
         self.canvas.mpl_connect('button_press_event', self.on_press)
@@ -411,26 +419,24 @@ class PlotManager:
             return
         
         try:
-            data = marray.astype(np.float32)
-            data -= np.mean(data, axis=1, keepdims=True)
-            
-            window = np.hamming(num_samples)
-            windowed_data = data * window
+            freqs, magnitudes = spectrum(marray, sampling_rate)
+        except Exception as e:
+            print(f"FFT error: {str(e)}")
+            return
 
-            fft_data = np.fft.rfft(windowed_data, axis=1)
-            freqs = np.fft.rfftfreq(num_samples, d=1/sampling_rate)
-            
-            freq_mask = (freqs >= 0.1) & (freqs <= 80)
-            freqs = freqs[freq_mask]
-            magnitudes = np.abs(fft_data[:, freq_mask]) / num_samples
+        self.draw_spectrum(freqs, magnitudes, num_samples / sampling_rate, polar, ax)
 
-            # Check if there are any frequencies left after masking
-            if magnitudes.size == 0:
-                print("No frequencies in the 0.1-80 Hz range. Adjust FFT parameters.")
-                return
+    def draw_spectrum(self, freqs, magnitudes, seconds, polar=False, ax=None):
+        """Draw a real-time spectrum.
 
-        except Exception as e:
-            print(f"FFT error: {str(e)}")
+        :param freqs: (F,) frequencies in Hz.
+        :param magnitudes: (channels, F) magnitudes.
+        :param seconds: Length of the data behind the spectrum, for the title.
+        :param polar: Whether to draw on the polar axes.
+        :param ax: Axes to draw on, the FFT axes by default."""
+        # Check if there are any frequencies left after masking
+        if magnitudes.size == 0:
+            print("No frequencies in the 0.1-80 Hz range. Adjust FFT parameters.")
             return
 
         ax = self.fft_ax if ax is None else ax
@@ -446,13 +452,12 @@ class PlotManager:
                 ax.plot(freqs, magnitudes[i], label=self.channel_names[i])
             
             ax.set_xlim(0.1, 80)
-            max_mag = np.max(magnitudes) if magnitudes.size > 0 else 1
             ax.set_ylim(0, 100)
             ax.grid(True)
             ax.set_xlabel('Frequency (Hz)')
             ax.set_ylabel('Magnitude (µV²/Hz)')
             ax.legend(loc='upper right')
-            ax.set_title(f'Real-Time Spectrum ({num_samples/sampling_rate:.1f}s window)')
+            ax.set_title(f'Real-Time Spectrum ({seconds:.1f}s window)')
 
         self.canvas.draw()
 
@@ -599,6 +604,9 @@ class PlotManager:
         :param channel_names: Optional list of channel names for the plot.
         :param plot_type: String specifying the type of plot ("Time Series", "FFT", or "Real Time Time Plot")."""
         self.ax.clear()
+        # clearing the axes took the cursor line and its value labels with it
+        self.vertical_line = None
+        self.annotations.clear()
         self.data = data
         self.plot_type = plot_type
         self.sampling_rate = sampling_rate
@@ -629,6 +637,9 @@ class PlotManager:
             self.animf_show = True
         elif plot_type == "Real Time Time Plot":
             self.real_time_stackplot(data,seconds=time[-1], ylabels=self.channel_names)
+        elif plot_type == "Band Power":
+            self.setup_band_power_plot(self.channel_count)
+            self.start_band_power_animation()
         elif plot_type == "Head Topography":
             if self.ble_reading or self.web_socket:
                 self.initialize_topography(self.electrode_placements)
@@ -859,6 +870,10 @@ class PlotManager:
             self.anim_topography.event_source.stop()
             self.anim_topography = None
 
+        if self.anim_band_power is not None:
+            self.anim_band_power.event_source.stop()
+            self.anim_band_power = None
+
     def start_rt_animation(self):
         """Start the real-time animation for the fft and time series plots"""
         if self.animt is None:
@@ -880,6 +895,16 @@ class PlotManager:
                 cache_frame_data=False
             )
 
+    def start_band_power_animation(self):
+        if self.anim_band_power is None:
+            self.anim_band_power = animation.FuncAnimation(
+                self.figure,
+                self.real_band_power_animate,
+                interval=100,
+                blit=False,
+                cache_frame_data=False
+            )
+
     def start_topo_animation(self):
         if self.anim_topography is None:
             self.anim_topography = animation.FuncAnimation(
@@ -917,6 +942,18 @@ class PlotManager:
     
     def real_fft_animate(self, frame):
         """Update the plot for each frame of the animation."""
+        polar = self.plot_type == "Polar FFT"
+        if not hasattr(self, 'fft_ax'):
+            self.setup_fft_plot(polar=polar)
+
+        if self.spectral is not None:
+            # the engine only recomputes once a hop of new samples arrived, redraw only then
+            result = self.spectral.update()
+            if result is not None and result[3] != self.spectrum_version:
+                freqs, magnitudes, num_samples, self.spectrum_version = result
+                self.draw_spectrum(freqs, magnitudes, num_samples / self.sampling_rate, polar, self.fft_ax)
+            return self.fft_ax.lines + self.fft_ax.collections
+
         if self.data_rt.size == 0:
             return []
         
@@ -926,17 +963,42 @@ class PlotManager:
         else:
             fft_data = self.data_rt
 
-        if self.plot_type == "Polar FFT":
-            if not hasattr(self, 'fft_ax'):
-                self.setup_fft_plot(polar=True)
-            self.real_time_fft(fft_data, sampling_rate=self.sampling_rate, polar=True, ax=self.fft_ax)
-        else:
-            if not hasattr(self, 'fft_ax'):
-                self.setup_fft_plot(polar=False)
-            self.real_time_fft(fft_data, sampling_rate=self.sampling_rate, polar=False, ax=self.fft_ax)
+        self.real_time_fft(fft_data, sampling_rate=self.sampling_rate, polar=polar, ax=self.fft_ax)
 
         return self.fft_ax.lines + self.fft_ax.collections
     
+    def real_band_power_animate(self, frame):
+        """Update the band power bars with the newest band powers."""
+        if self.band_bars is None or self.band_powers is None:
+            return []
+
+        powers = self.band_powers[:, :len(self.band_bars)]
+        total = powers.sum(axis=0)
+        relative = np.divide(powers, total, out=np.zeros_like(powers), where=total > 0)
+        for channel, bars in enumerate(self.band_bars):
+            for bar, height in zip(bars, relative[:, channel]):
+                bar.set_height(height)
+        return [bar for bars in self.band_bars for bar in bars]
+
+    def setup_band_power_plot(self, channel_count=8):
+        """Initialize the band power plot, one bar per channel in every band.
+
+        :param channel_count: Number of channels shown."""
+        self.figure.clear()
+        self.ax = self.figure.add_subplot(111)
+        width = 0.8 / channel_count
+        positions = np.arange(len(BANDS))
+        self.band_bars = [self.ax.bar(positions + (channel - (channel_count - 1) / 2) * width, np.zeros(len(BANDS)),
+                                      width, label=self.channel_names[channel])
+                          for channel in range(channel_count)]
+        self.ax.set_xticks(positions)
+        self.ax.set_xticklabels([f"{name}\n{low}-{high} Hz" for name, low, high in BANDS])
+        self.ax.set_ylim(0, 1)
+        self.ax.set_ylabel('Relative Power')
+        self.ax.set_title('Real-Time Band Power')
+        self.ax.legend(loc='upper right', fontsize='small')
+        self.canvas.draw()
+
     def real_topo_animate(self, frame):
         """Update the plot for each frame of the animation."""
         if self.data_rt.size == 0:
@@ -946,38 +1008,60 @@ class PlotManager:
 
         return self.ax.collections
     
-    def handle_real_time_data(self, new_data, timestamp):
-        """Handle incoming real-time data and update the data buffers.
+    def attach_buffer(self, ring):
+        """Read real-time data from a shared session buffer instead of keeping a copy.
+
+        :param ring: RingBuffer holding 8 channel rows and a label row, timestamps in seconds."""
+        self.reader = ring.reader()
+
+    def handle_real_time_data(self, new_data=None, timestamps=None):
+        """Handle a block of incoming real-time data and update the data buffers.
         
-        :param new_data: 1D array of shape (8,) containing the new data.
-        :param timestamp: Integer representing the timestamp of the new data."""
-        new_data = np.array(new_data).reshape((-1, 1))
+        With a session buffer attached the samples are already stored there, and the plot
+        buffers are refreshed with a snapshot of the newest n_plot samples.
+
+        :param new_data: 2D array of shape (8, N), or (9, N) with a label row, containing the new data.
+        :param timestamps: 1D array of shape (N,) with the timestamp of each sample in milliseconds."""
+        if self.reader is not None and self.plot_type == "Band Power":
+            # the band power ring holds one column of len(BANDS) x 8 powers per block
+            powers, _ = self.reader.snapshot(1)
+            if powers.shape[1]:
+                self.band_powers = powers[:, 0].reshape(len(BANDS), 8)
+            return
+
+        if self.reader is not None:
+            window, self.time_buffer = self.reader.snapshot(self.n_plot)
+            self.data_rt = window[:8]
+            self.label_buffer = window[8]
+            return
+
+        new_data = np.asarray(new_data)
 
         has_label = new_data.shape[0] == 9
         if has_label:
-            label = new_data[-1, 0]
+            labels = new_data[-1, :]
             channel_data = new_data[:-1, :]
         else:
-            label = None
+            labels = None
             channel_data = new_data 
 
-        timestamp_s = timestamp / 1000.0
+        timestamps_s = np.asarray(timestamps) / 1000.0
 
         if self.data_rt.size == 0:
-            self.data_rt = channel_data
+            self.data_rt = channel_data[:, -self.n_plot:]
         else:
             self.data_rt = np.hstack((self.data_rt, channel_data))[:, -self.n_plot:]
 
         if has_label:
             if not hasattr(self, 'label_buffer'):
-                self.label_buffer = np.array([label])
+                self.label_buffer = labels[-self.n_plot:]
             else:
-                self.label_buffer = np.append(self.label_buffer, label)[-self.n_plot:]
+                self.label_buffer = np.append(self.label_buffer, labels)[-self.n_plot:]
 
         if self.time_buffer.size == 0:
-            self.time_buffer = np.array([timestamp_s])
+            self.time_buffer = timestamps_s[-self.n_plot:]
         else:
-            self.time_buffer = np.append(self.time_buffer[-self.n_plot:], timestamp_s)
+            self.time_buffer = np.append(self.time_buffer, timestamps_s)[-self.n_plot:]
 
     def _frequency_to_theta(self, frequencies):
         """Convert frequencies to polar angles"""
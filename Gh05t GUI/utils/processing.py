@@ -0,0 +1,231 @@
+import time
+import queue
+import logging
+import threading
+import numpy as np
+from PyQt5.QtCore import QThread, pyqtSignal
+from utils.dsp import Pipeline, BANDS, FILE_FILTER_CHUNK, zero_phase_filter
+from utils.ring_buffer import RingBuffer
+
+QUEUE_TIMEOUT = 0.1  # seconds between checks for a stop request while idle
+BAND_RING_CAPACITY = 256  # band power updates kept for the plots, one per block
+BIN_RING_CAPACITY = 256  # tracked frequency updates kept, one per block
+
+logging.basicConfig(level=logging.INFO)
+processing_logger = logging.getLogger(__name__)
+
+def band_power_message(timestamp, powers, channel_count):
+    """The WebSocket message carrying the band powers of a block.
+
+    :param timestamp: Time of the last sample of the block in seconds.
+    :param powers: (len(BANDS), 8) band powers, see Pipeline.band_powers.
+    :param channel_count: Channels with real data.
+
+    :return dict: {"band_power": {"time": timestamp, band name: [power of each channel], ...}}."""
+    message = {"time": float(timestamp)}
+    for (name, _, _), power in zip(BANDS, powers):
+        message[name] = power[:channel_count].tolist()
+    return {"band_power": message}
+
+def publish_band_power(file_handler, ws_server, timestamp, powers, channel_count):
+    """Records the band powers of a block and broadcasts them.
+
+    :param file_handler: FileHandler the powers are recorded with.
+    :param ws_server: WebSocketServer the powers are broadcast on, or None.
+    :param timestamp: Time of the last sample of the block in milliseconds.
+    :param powers: (len(BANDS), 8) band powers.
+    :param channel_count: Channels with real data."""
+    file_handler.add_band_power(timestamp, powers)
+    if ws_server is not None:
+        ws_server.send_data(band_power_message(timestamp / 1000.0, powers, channel_count))
+
+def tracked_message(timestamp, frequencies, magnitudes, channel_count):
+    """The WebSocket message carrying the magnitudes of the tracked frequencies after a block.
+
+    :param timestamp: Time of the last sample of the block in seconds.
+    :param frequencies: The tracked frequencies in Hz.
+    :param magnitudes: (MAX_TRACKED, 8) magnitudes, see Pipeline.bin_magnitudes.
+    :param channel_count: Channels with real data.
+
+    :return dict: {"tracked": {"time": timestamp, "frequencies": [...], "magnitudes": [[magnitude of each channel], ...]}}."""
+    return {"tracked": {
+        "time": float(timestamp),
+        "frequencies": list(frequencies),
+        "magnitudes": magnitudes[:len(frequencies), :channel_count].tolist(),
+    }}
+
+class ProcessingWorker(QThread):
+    """Runs the real-time pipeline of a session on its own thread.
+
+    Blocks from the acquisition source are queued by submit, which is safe to call from
+    the source's thread. The worker scales, filters, detects, labels, records and
+    broadcasts labels, then writes the result to the session RingBuffer. Band powers, when
+    turned on, go to band_ring, the recorder and the WebSocket, the magnitudes of tracked
+    frequencies to the WebSocket. The GUI only takes
+    snapshots of that buffer at frame rate, so a slow redraw never holds up detection or
+    storage.
+
+    Settings changed from the GUI (filter, labeling, model) go through the setters below
+    and are picked up at the next block."""
+    status_update_signal = pyqtSignal(str)
+
+    def __init__(self, ring, file_handler, ws_server=None, sampling_rate=250, adc_scale=1.0, channel_count=8):
+        """Initializes the ProcessingWorker instance.
+
+        :param ring: RingBuffer with 8 channel rows and a label row that receives the processed samples.
+        :param file_handler: FileHandler that records every processed block.
+        :param ws_server: WebSocketServer that labels are broadcast on, or None.
+        :param sampling_rate: Sample rate of the source in Hz.
+        :param adc_scale: Raw value to millivolts.
+        :param channel_count: Channels with real data, rows past this are zeroed."""
+        super().__init__()
+        self.ring = ring
+        self.file_handler = file_handler
+        self.ws_server = ws_server
+        self.channel_count = channel_count
+        self.pipeline = Pipeline(sampling_rate, adc_scale, channel_count)
+        # one column of len(BANDS) x 8 powers (bands first) per block, timestamps in seconds
+        self.band_ring = RingBuffer(len(BANDS) * 8, BAND_RING_CAPACITY)
+
+        self.blocks = queue.Queue()
+        self.running = False
+        self.latency = 0.0  # seconds from submit to the block being in the ring buffer
+
+    @property
+    def labeling_mode(self):
+        """Whether labeling mode is on."""
+        return self.pipeline.labeling_mode
+
+    def submit(self, timestamps, data):
+        """Queues a block from the source, called from the source's thread.
+
+        :param timestamps: (N,) array with the timestamp of each sample in milliseconds.
+        :param data: (8, N) array with the raw samples."""
+        if data is None or len(timestamps) == 0:
+            return
+        self.blocks.put((time.perf_counter(), timestamps, data))
+
+    def set_filter(self, filter_type, freq_range):
+        """Selects the real-time filter, see Pipeline.set_filter."""
+        self.pipeline.set_filter(filter_type, freq_range)
+
+    def set_filter_stages(self, stages):
+        """Selects the real-time filter cascade, see Pipeline.set_filter_stages."""
+        self.pipeline.set_filter_stages(stages)
+
+    def set_band_power(self, enabled):
+        """Turns the band power stage on or off, see Pipeline.set_band_power."""
+        self.pipeline.set_band_power(enabled)
+
+    def set_tracked_frequencies(self, frequencies):
+        """Selects the tracked frequencies, see Pipeline.set_tracked_frequencies."""
+        self.pipeline.set_tracked_frequencies(frequencies)
+
+    def set_labeling_mode(self, enabled):
+        """Turns labeling on or off, see Pipeline.set_labeling_mode."""
+        self.pipeline.set_labeling_mode(enabled)
+
+    def press_label(self):
+        """Marks the next sample with label 1."""
+        self.pipeline.press_label()
+
+    def toggle_label(self):
+        """Starts or stops marking every sample with label 1."""
+        self.pipeline.toggle_label()
+
+    def set_model(self, detector, default_model):
+        """Selects the EMG detector, see Pipeline.set_model."""
+        self.pipeline.set_model(detector, default_model)
+
+    def run(self):
+        """The main loop for the QThread, processes queued blocks until stop is called."""
+        self.running = True
+        while self.running:
+            try:
+                block = self.blocks.get(timeout=QUEUE_TIMEOUT)
+            except queue.Empty:
+                continue
+            self.process_block(*block)
+
+        # anything received before the stop still gets recorded
+        while not self.blocks.empty():
+            self.process_block(*self.blocks.get_nowait())
+
+    def process_block(self, submitted, timestamps, data):
+        """Runs one block through the pipeline, records it and stores it for the plots.
+
+        :param submitted: time.perf_counter() at which the block was queued.
+        :param timestamps: (N,) array with the timestamp of each sample in milliseconds.
+        :param data: (8, N) array with the raw samples."""
+        processed, labels, labeling_mode = self.pipeline.process(data)
+
+        if labeling_mode:
+            self.file_handler.add_data(timestamps, processed, labels)
+            if self.ws_server is not None:
+                self.ws_server.send_data({"label": int(labels.max())})
+        else:
+            self.file_handler.add_data(timestamps, processed)
+        band_powers = self.pipeline.band_powers
+        if band_powers is not None:
+            self.band_ring.write(band_powers.reshape(-1, 1), np.asarray(timestamps[-1:]) / 1000.0)
+            publish_band_power(self.file_handler, self.ws_server, timestamps[-1], band_powers, self.channel_count)
+        tracker = self.pipeline.bin_tracker
+        if tracker is not None and self.ws_server is not None:
+            self.ws_server.send_data(tracked_message(timestamps[-1] / 1000.0, tracker.frequencies,
+                                                     self.pipeline.bin_magnitudes, self.channel_count))
+
+        self.ring.write(np.vstack((processed, labels)), np.asarray(timestamps) / 1000.0)
+        self.latency = time.perf_counter() - submitted
+
+    def stop(self):
+        """Processes what is still queued and waits for the worker thread to finish."""
+        self.running = False
+        self.wait(1000)
+
+class FileFilterWorker(QThread):
+    """Zero-phase filters a loaded recording in the background, see zero_phase_filter.
+
+    The GUI stays responsive while an hour-long file is filtered, gets the progress in
+    percent and can cancel the filtering, e.g. when another filter is applied."""
+    progress_signal = pyqtSignal(int)
+    finished_signal = pyqtSignal(object)  # filtered (channels, N) array, or None if cancelled or failed
+    status_update_signal = pyqtSignal(str)
+
+    def __init__(self, sos, data, chunk_size=FILE_FILTER_CHUNK):
+        """Initializes the FileFilterWorker instance.
+
+        :param sos: (n_sections, 6) second-order sections to apply.
+        :param data: (channels, N) array with the recording, left unchanged.
+        :param chunk_size: Samples per channel filtered at once."""
+        super().__init__()
+        self.sos = sos
+        self.data = data
+        self.chunk_size = chunk_size
+        self.cancel_event = threading.Event()
+        self.percent = -1
+
+    def run(self):
+        """The main function for the QThread, filters the recording and emits the result."""
+        try:
+            filtered = zero_phase_filter(self.sos, self.data, self.chunk_size,
+                                         progress=self.report_progress, cancel=self.cancel_event)
+        except ValueError as e:
+            processing_logger.warning(f"Filtering failed: {e}")
+            self.status_update_signal.emit(f"Filtering failed: {e}")
+            filtered = None
+        self.data = None
+        self.finished_signal.emit(filtered)
+
+    def report_progress(self, fraction):
+        """Emits the progress whenever the percentage changes, called from the filter threads.
+
+        :param fraction: Fraction of the recording filtered."""
+        percent = int(fraction * 100)
+        if percent != self.percent:
+            self.percent = percent
+            self.progress_signal.emit(percent)
+
+    def cancel(self):
+        """Stops the filtering and waits for the worker thread to finish."""
+        self.cancel_event.set()
+        self.wait()
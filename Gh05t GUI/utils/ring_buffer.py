@@ -0,0 +1,222 @@
+import threading
+import numpy as np
+from multiprocessing import shared_memory
+
+HEADER_SIZE = 64  # bytes before the samples in a shared ring, the head counter sits at the start
+
+class RingBuffer:
+    """Preallocated circular buffer of multichannel samples shared by every real-time consumer.
+
+    The storage is written twice, once at index % capacity and once a capacity further,
+    so any run of up to capacity consecutive samples is one contiguous slice. Readers get
+    views into the buffer instead of copies, and writing a block costs the same no matter
+    how long the windows the readers look at are.
+
+    Views are only safe in the thread that writes. Other threads take copies with snapshot,
+    which holds the lock so a block is never seen half written."""
+
+    def __init__(self, channels, capacity, dtype=np.float32):
+        """Allocates the buffer.
+
+        :param channels: Number of rows stored per sample.
+        :param capacity: Number of samples kept before the oldest are overwritten.
+        :param dtype: Sample type, timestamps are always float64."""
+        self.channels = channels
+        self.capacity = capacity
+        self.data = np.zeros((channels, 2 * capacity), dtype=dtype)
+        self.timestamps = np.zeros(2 * capacity, dtype=np.float64)
+        self.head = 0  # samples written since the buffer was created
+        self.lock = threading.Lock()
+
+    def write(self, samples, timestamps):
+        """Appends a block, overwriting the oldest samples once the buffer is full.
+
+        :param samples: (channels, N) array of samples.
+        :param timestamps: (N,) array with the timestamp of each sample."""
+        n = len(timestamps)
+        if n == 0:
+            return
+        with self.lock:
+            if n > self.capacity:
+                # only the newest capacity samples can be kept
+                self.head += n - self.capacity
+                samples, timestamps = samples[:, -self.capacity:], timestamps[-self.capacity:]
+                n = self.capacity
+
+            start = self.head % self.capacity
+            first = min(n, self.capacity - start)
+            for offset in (0, self.capacity):
+                self.data[:, offset + start:offset + start + first] = samples[:, :first]
+                self.data[:, offset:offset + n - first] = samples[:, first:]
+                self.timestamps[offset + start:offset + start + first] = timestamps[:first]
+                self.timestamps[offset:offset + n - first] = timestamps[first:]
+            self.head += n
+
+    def window(self, stop, n):
+        """The samples in [stop - n, stop), limited to what is still stored.
+
+        :param stop: Sample count (as in head) the window ends at.
+        :param n: Number of samples wanted.
+
+        :return tuple: (samples, timestamps) views into the buffer, valid until the next write
+                       overwrites them."""
+        n = max(0, min(n, stop, stop - (self.head - self.capacity)))
+        start = (stop - n) % self.capacity
+        return self.data[:, start:start + n], self.timestamps[start:start + n]
+
+    def latest(self, n):
+        """The newest n samples.
+
+        :param n: Number of samples wanted.
+
+        :return tuple: (samples, timestamps) views, see window."""
+        return self.window(self.head, n)
+
+    def reader(self, start=None):
+        """Creates a read cursor.
+
+        :param start: Sample count (as in head) to start reading at, the newest sample if None.
+
+        :return RingReader: The new reader."""
+        reader = RingReader(self)
+        if start is not None:
+            reader.cursor = start
+        return reader
+
+    def close(self):
+        """Releases the buffer. Nothing to do for a buffer in process memory."""
+
+class SharedRingBuffer(RingBuffer):
+    """RingBuffer stored in multiprocessing.shared_memory, for a writer and readers in different processes.
+
+    The head counter lives in the shared block too, and the lock is a multiprocessing lock,
+    so write, snapshot and read_copy work across processes exactly as RingBuffer does within
+    one. Pass the buffer to a child process as a Process argument, it reattaches to the same
+    memory there."""
+
+    def __init__(self, channels, capacity, dtype=np.float32, lock=None, name=None):
+        """Allocates the shared memory, or attaches to an existing block.
+
+        :param channels: Number of rows stored per sample.
+        :param capacity: Number of samples kept before the oldest are overwritten.
+        :param dtype: Sample type, timestamps are always float64.
+        :param lock: multiprocessing lock shared by every process using the buffer.
+        :param name: Name of an existing block to attach to, a new block is created if None."""
+        self.channels = channels
+        self.capacity = capacity
+        self.dtype = np.dtype(dtype)
+        self.lock = lock
+        self.owner = name is None
+
+        data_size = channels * 2 * capacity * self.dtype.itemsize
+        size = HEADER_SIZE + data_size + 2 * capacity * 8
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            try:
+                self.shm = shared_memory.SharedMemory(name=name, track=False)
+            except TypeError:  # before Python 3.13, child processes share the creator's resource tracker anyway
+                self.shm = shared_memory.SharedMemory(name=name)
+
+        self.header = np.ndarray((1,), dtype=np.int64, buffer=self.shm.buf)
+        self.data = np.ndarray((channels, 2 * capacity), dtype=self.dtype, buffer=self.shm.buf, offset=HEADER_SIZE)
+        self.timestamps = np.ndarray((2 * capacity,), dtype=np.float64, buffer=self.shm.buf, offset=HEADER_SIZE + data_size)
+        if self.owner:
+            self.header[0] = 0
+
+    @property
+    def head(self):
+        """Samples written since the buffer was created."""
+        return int(self.header[0])
+
+    @head.setter
+    def head(self, value):
+        self.header[0] = value
+
+    def __getstate__(self):
+        return {"channels": self.channels, "capacity": self.capacity, "dtype": self.dtype.str,
+                "lock": self.lock, "name": self.shm.name}
+
+    def __setstate__(self, state):
+        self.__init__(state["channels"], state["capacity"], state["dtype"], state["lock"], state["name"])
+
+    def close(self):
+        """Detaches from the shared memory, and frees it in the process that created it."""
+        self.header = self.data = self.timestamps = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+class RingReader:
+    """Read cursor of one consumer of a RingBuffer.
+
+    Each consumer keeps its own position, so a plot, the detector and anything else
+    reading the same session see every sample without the others having to wait."""
+
+    def __init__(self, ring):
+        """Initializes the reader at the current head of the buffer.
+
+        :param ring: The RingBuffer to read from."""
+        self.ring = ring
+        self.cursor = ring.head
+        self.overruns = 0  # samples overwritten before this reader got to them
+
+    def available(self):
+        """Number of unread samples, including any already overwritten.
+
+        :return int: Samples written since the cursor."""
+        return self.ring.head - self.cursor
+
+    def read(self, max_samples=None):
+        """Returns the unread samples and moves the cursor past them.
+
+        If the writer lapped the reader, the overwritten samples are skipped and counted
+        in overruns.
+
+        :param max_samples: Read at most this many samples, all unread samples if None.
+
+        :return tuple: (samples, timestamps) views, see RingBuffer.window."""
+        n = self.available()
+        if n > self.ring.capacity:
+            self.overruns += n - self.ring.capacity
+            self.cursor = self.ring.head - self.ring.capacity
+            n = self.ring.capacity
+        if max_samples is not None:
+            n = min(n, max_samples)
+        self.cursor += n
+        return self.ring.window(self.cursor, n)
+
+    def read_copy(self, max_samples=None):
+        """Like read, but returns copies taken under the lock, for a reader in another thread or process.
+
+        :param max_samples: Read at most this many samples, all unread samples if None.
+
+        :return tuple: (samples, timestamps) copies."""
+        with self.ring.lock:
+            samples, timestamps = self.read(max_samples)
+            return samples.copy(), timestamps.copy()
+
+    def snapshot(self, n):
+        """Moves the cursor to the newest sample and copies the n samples before it.
+
+        Safe to call while another thread writes.
+
+        :param n: Number of samples wanted.
+
+        :return tuple: (samples, timestamps) copies."""
+        with self.ring.lock:
+            self.cursor = self.ring.head
+            samples, timestamps = self.ring.window(self.cursor, n)
+            return samples.copy(), timestamps.copy()
+
+    def seek_end(self):
+        """Marks everything written so far as read."""
+        self.cursor = self.ring.head
+
+    def window(self, n):
+        """The n samples up to the cursor, without moving it.
+
+        :param n: Number of samples wanted.
+
+        :return tuple: (samples, timestamps) views, see RingBuffer.window."""
+        return self.ring.window(self.cursor, n)
@@ -0,0 +1,187 @@
+import logging
+import numpy as np
+from utils.acquisition import AcquisitionSource, BlockAccumulator, register_source, BLOCK_INTERVAL_MS, ADS1299_SCALE
+
+try:
+    import serial
+    from serial.tools import list_ports
+except ImportError:  # pyserial is only needed for the serial source
+    serial = None
+    list_ports = None
+
+BAUD_RATE = 115200
+READ_SIZE = 4096  # bytes requested per read, the read returns early once READ_TIMEOUT passes
+READ_TIMEOUT = 0.01
+
+# one frame = [marker 0xFEEDFACE (uint32), timestamp/milliseconds (uint32), channels 1-8 (uint32 each)]
+# the channels hold the raw 24-bit ADS1299 values in the low three bytes
+FRAME_MARKER = 0xFEEDFACE
+FRAME_SIZE = 40
+FRAME_DTYPE = np.dtype([('marker', '<u4'), ('timestamp', '<u4'), ('channels', '<u4', (8,))])
+MARKER_BYTES = np.frombuffer(np.uint32(FRAME_MARKER).astype('<u4').tobytes(), dtype=np.uint8)
+
+logging.basicConfig(level=logging.INFO)
+serial_logger = logging.getLogger(__name__)
+
+def find_frame_starts(data):
+    """Finds every frame marker in the buffer and keeps the ones that start non-overlapping frames.
+
+    :param data (np.ndarray): The buffer as a uint8 array.
+
+    :return np.ndarray: Offsets of the frames to decode, in order."""
+    if len(data) < len(MARKER_BYTES):
+        return np.empty(0, dtype=np.int64)
+    matches = data[:-3] == MARKER_BYTES[0]
+    for i in range(1, 4):
+        matches &= data[i:len(data) - 3 + i] == MARKER_BYTES[i]
+    starts = np.flatnonzero(matches)
+
+    # a marker inside a frame can only come from garbage, walk the markers one by one only then
+    if len(starts) > 1 and np.any(np.diff(starts) < FRAME_SIZE):
+        kept = []
+        next_free = 0
+        for start in starts:
+            if start >= next_free:
+                kept.append(start)
+                next_free = start + FRAME_SIZE
+        starts = np.array(kept, dtype=np.int64)
+    return starts
+
+def decode_serial_block(buffer):
+    """Decodes every complete frame in the buffer, skipping any bytes between frames.
+
+    :param buffer (bytes-like): The raw serial bytes, possibly ending with a partial frame.
+
+    :return tuple: A tuple containing the timestamps ((N,) int64 array), the channel data
+               ((8, N) int32 array, sign-extended from 24 bits), the leftover bytes to keep for
+               the next read and the number of bytes skipped while resyncing."""
+    data = np.frombuffer(buffer, dtype=np.uint8)
+    starts = find_frame_starts(data)
+    complete = starts[starts + FRAME_SIZE <= len(data)]
+
+    if len(complete) == 0:
+        # keep a partial frame, or just enough bytes to complete a marker split across reads
+        keep_from = starts[0] if len(starts) else max(len(data) - 3, 0)
+        return np.empty(0, dtype=np.int64), np.empty((8, 0), dtype=np.int32), bytes(buffer[keep_from:]), int(keep_from)
+
+    first = complete[0]
+    if np.all(np.diff(complete) == FRAME_SIZE):
+        # evenly spaced frames are read in place
+        records = np.frombuffer(buffer, dtype=FRAME_DTYPE, count=len(complete), offset=first)
+    else:
+        records = data[complete[:, None] + np.arange(FRAME_SIZE)].view(FRAME_DTYPE).reshape(-1)
+
+    end = complete[-1] + FRAME_SIZE
+    partial = starts[starts >= end]
+    keep_from = partial[0] if len(partial) else max(end, len(data) - 3)
+    skipped = int(keep_from - len(complete) * FRAME_SIZE)
+
+    timestamps = records['timestamp'].astype(np.int64)
+    values = (records['channels'] & 0xFFFFFF).astype(np.int32)
+    channel_data = np.ascontiguousarray(((values ^ 0x800000) - 0x800000).T)
+    return timestamps, channel_data, bytes(buffer[keep_from:]), skipped
+
+def available_ports():
+    """Lists the serial ports that can be opened.
+
+    :return list: Port names, e.g. COM4 or /dev/ttyUSB0."""
+    if list_ports is None:
+        return []
+    return [port.device for port in list_ports.comports()]
+
+@register_source
+class SerialWorker(AcquisitionSource):
+    """Streams 0xFEEDFACE framed records from the High Performance receiver over a serial port.
+
+    The frames carry the same ADS1299 counts as BLEWorker, so the GUI filters, detector and
+    recorder take the samples unchanged."""
+    name = "Serial (High Performance)"
+    channel_count = 8
+    sample_rate = 250
+    adc_scale = ADS1299_SCALE
+
+    @classmethod
+    def configure(cls, parent):
+        """Asks for the serial port to open.
+
+        :param parent: The widget to show the dialog on.
+
+        :return dict: {"port": name}, or None if the user cancelled."""
+        from PyQt5.QtWidgets import QInputDialog  # only the GUI configures sources interactively
+        port, ok = QInputDialog.getItem(parent, "Serial Input", "Serial port:", available_ports(), 0, True)
+        if not ok or not port:
+            return None
+        return {"port": port}
+
+    def __init__(self, port, baudrate=BAUD_RATE, block_interval_ms=BLOCK_INTERVAL_MS):
+        """Initializes the SerialWorker instance.
+
+        :param port: The serial port to open.
+        :param baudrate: The serial baud rate.
+        :param block_interval_ms: How often decoded samples are emitted as one block."""
+        super().__init__()
+        self.port = port
+        self.baudrate = baudrate
+        self.data_buffer = b''
+        self.accumulator = BlockAccumulator(block_interval_ms)
+        self.running = False
+        self.skipped_bytes = 0
+        self.frames = 0
+
+    def run(self):
+        """The main loop for the QThread, reads the port until disconnect is called."""
+        if serial is None:
+            self.status_update_signal.emit("pyserial is not installed.")
+            self.connection_failed_signal.emit()
+            return
+
+        try:
+            connection = serial.Serial(self.port, self.baudrate, timeout=READ_TIMEOUT)
+        except serial.SerialException as e:
+            print(f"Failed to open {self.port}: {e}")
+            self.status_update_signal.emit(f"Failed to open {self.port}: {e}")
+            self.connection_failed_signal.emit()
+            return
+
+        serial_logger.info(f"Connected to {self.port}")
+        self.status_update_signal.emit(f"Connected to {self.port}")
+        self.running = True
+        try:
+            while self.running:
+                data = connection.read(max(connection.in_waiting, READ_SIZE))
+                if data:
+                    self.handle_data(data)
+        except serial.SerialException as e:
+            print(f"Serial connection lost: {e}")
+            self.status_update_signal.emit(f"Serial connection lost: {e}")
+        finally:
+            connection.close()
+            self.flush()
+            serial_logger.info(f"Serial port closed, {self.frames} frames, {self.skipped_bytes} bytes skipped")
+
+    def handle_data(self, data):
+        """Decodes the frames completed by newly read bytes.
+
+        :param data (bytes): The bytes returned by the read."""
+        self.data_buffer += data
+        if len(self.data_buffer) < FRAME_SIZE:
+            return
+
+        timestamps, channel_data, self.data_buffer, skipped = decode_serial_block(self.data_buffer)
+        self.frames += len(timestamps)
+        self.skipped_bytes += skipped
+
+        self.emit_block(self.accumulator.add(timestamps, channel_data))
+
+    def flush(self):
+        """Emits any samples still waiting for the next block."""
+        self.emit_block(self.accumulator.flush())
+
+    def disconnect(self):
+        """Stops reading and closes the port."""
+        self.running = False
+
+    def stop(self):
+        """Closes the port and waits for the worker thread to finish."""
+        self.disconnect()
+        super().stop()
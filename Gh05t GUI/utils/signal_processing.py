@@ -1,16 +1,45 @@
 from PyQt5.QtWidgets import (
-    QDialog, QVBoxLayout, QCheckBox, QPushButton, QLabel, QComboBox, QHBoxLayout, QFileDialog, QMessageBox, QGroupBox, QSpacerItem, QSizePolicy
+    QDialog, QVBoxLayout, QCheckBox, QPushButton, QLabel, QComboBox, QHBoxLayout, QFileDialog, QMessageBox, QGroupBox, QSpacerItem, QSizePolicy, QListWidget, QLineEdit
 )
 from PyQt5.QtCore import pyqtSignal, Qt, QSettings
 import joblib
 from scipy.signal import butter, filtfilt, sosfiltfilt, iirnotch, tf2sos, lfilter_zi, lfilter
-import numpy as np
-import time
+import json
+from utils.dsp import EMGDetector
+from utils.spectral import MAX_TRACKED
+
+def describe_stage(filter_type, freq_range):
+    """Text for one stage of the filter cascade, e.g. "Band Pass 5-30 Hz".
+
+    :param filter_type: "Low Pass", "High Pass", "Band Pass" or "Notch".
+    :param freq_range: [low, high] in Hz.
+
+    :return str: The description."""
+    if filter_type == "Band Pass":
+        return f"{filter_type} {freq_range[0]}-{freq_range[1]} Hz"
+    return f"{filter_type} {freq_range[0]} Hz"
+
+def parse_frequencies(text):
+    """Reads the frequencies typed into the tracking field, e.g. "8, 10, 12.5".
+
+    :param text: Frequencies in Hz separated by commas, semicolons or spaces.
+
+    :return list: The positive frequencies, anything else is skipped."""
+    frequencies = []
+    for part in text.replace(",", " ").replace(";", " ").split():
+        try:
+            frequency = float(part)
+        except ValueError:
+            continue
+        if frequency > 0:
+            frequencies.append(frequency)
+    return frequencies
 
 class SignalProcessingWindow(QDialog):
     update_status_signal = pyqtSignal(str)
-    apply_filter_signal = pyqtSignal(str, list, int)
+    apply_filter_signal = pyqtSignal(list, int)  # [(filter_type, freq_range), ...] stages, 1 to clear
     apply_model_signal = pyqtSignal(int)
+    track_frequencies_signal = pyqtSignal(list)  # frequencies in Hz, empty to stop tracking
     label_signal = pyqtSignal()
 
     def __init__(self, parent=None, rt=False):
@@ -57,6 +86,30 @@ class SignalProcessingWindow(QDialog):
 
         filter_layout.addLayout(filter_row_layout)
 
+        # stages are applied top to bottom, e.g. High Pass drift removal, a 60 Hz Notch, then a Band Pass
+        stage_row_layout = QHBoxLayout()
+        self.stage_list = QListWidget()
+        self.stage_list.setFixedHeight(70)
+        stage_row_layout.addWidget(self.stage_list)
+
+        stage_button_layout = QVBoxLayout()
+        self.add_stage_button = QPushButton("Add Stage")
+        self.add_stage_button.setCursor(Qt.PointingHandCursor)
+        self.add_stage_button.setStyleSheet("background-color: #2C3E50; color: white;")
+        self.add_stage_button.clicked.connect(self.add_stage)
+        self.add_stage_button.clicked.connect(self.save_settings)
+        stage_button_layout.addWidget(self.add_stage_button)
+
+        self.remove_stage_button = QPushButton("Remove Stage")
+        self.remove_stage_button.setCursor(Qt.PointingHandCursor)
+        self.remove_stage_button.setStyleSheet("background-color: #2C3E50; color: white;")
+        self.remove_stage_button.clicked.connect(self.remove_stage)
+        self.remove_stage_button.clicked.connect(self.save_settings)
+        stage_button_layout.addWidget(self.remove_stage_button)
+        stage_row_layout.addLayout(stage_button_layout)
+
+        filter_layout.addLayout(stage_row_layout)
+
         spacer_1_layout = QHBoxLayout()
         spacer_1_layout.addSpacerItem(QSpacerItem(30, 20, QSizePolicy.Expanding, QSizePolicy.Minimum))
 
@@ -128,6 +181,34 @@ class SignalProcessingWindow(QDialog):
         model_group.setLayout(model_layout)
         layout.addWidget(model_group)
 
+        # magnitudes of a few frequencies (SSVEP stimuli, the alpha band) broadcast on the WebSocket every block
+        self.tracking_group = QGroupBox("Frequency Tracking")
+        self.tracking_group.setStyleSheet("color: white; font-size: 14px; font-weight: bold;")
+        tracking_layout = QHBoxLayout()
+
+        tracking_layout.addWidget(QLabel("Frequencies (Hz):"))
+        self.frequencies_input = QLineEdit()
+        self.frequencies_input.setPlaceholderText("e.g. 8, 10, 12")
+        self.frequencies_input.setToolTip(f"Up to {MAX_TRACKED} frequencies, separated by commas")
+        tracking_layout.addWidget(self.frequencies_input)
+
+        self.track_button = QPushButton("Track")
+        self.track_button.setCursor(Qt.PointingHandCursor)
+        self.track_button.setStyleSheet("background-color: #2C3E50; color: white;")
+        self.track_button.clicked.connect(self.track_frequencies)
+        self.track_button.clicked.connect(self.save_settings)
+        tracking_layout.addWidget(self.track_button)
+
+        self.stop_tracking_button = QPushButton("Stop Tracking")
+        self.stop_tracking_button.setCursor(Qt.PointingHandCursor)
+        self.stop_tracking_button.setStyleSheet("background-color: #2C3E50; color: white;")
+        self.stop_tracking_button.clicked.connect(self.stop_tracking)
+        self.stop_tracking_button.clicked.connect(self.save_settings)
+        tracking_layout.addWidget(self.stop_tracking_button)
+
+        self.tracking_group.setLayout(tracking_layout)
+        layout.addWidget(self.tracking_group)
+
         labeling_group = QGroupBox("Labeling Mode")
         labeling_group.setStyleSheet("color: white; font-size: 14px; font-weight: bold;")
         labeling_layout = QVBoxLayout()
@@ -154,6 +235,7 @@ class SignalProcessingWindow(QDialog):
 
         self.filter_type = None
         self.freq_range = []
+        self.filter_stages = []
         self.model = "None"
         self.model_path = None
         self.labeling_mode = False
@@ -166,21 +248,8 @@ class SignalProcessingWindow(QDialog):
         self.buffer_size = 500
         self.max_raw = 0
 
-        self.alpha = 0.1
-        self.alpha_delta = 0.1 # adaptive change
-        self.delta_init = 1000 # threshold
-        self.use_adaptive = False 
-
-        self.weights = np.zeros(64)  # buffer weights
-
-        self.t = 0
-        self.eff_mean = [0.0] * 8
-        self.eff_dc = [0.0] * 8
-        self.delta_min = [self.delta_init] * 8
-        self.delta_max = [self.delta_init] * 8
-
-        # lms weight history
-        self.w_lms_k = []
+        # EMG detection state, kept free of Qt so it can also run off the GUI thread or process
+        self.detector = EMGDetector()
 
         self.load_settings()
 
@@ -191,10 +260,11 @@ class SignalProcessingWindow(QDialog):
             self.apply_ml_button.setVisible(False)
             self.import_model_button.setVisible(False)
             self.use_default_model_checkbox.setVisible(False)
+            self.tracking_group.setVisible(False)
             self.status_label.setText("Cannot enable labeling or import model in file input mode")
 
     def apply_filter(self):
-        """Apply the selected filter to the data."""
+        """Apply the filter cascade, or the selected filter if no stages were added, to the data."""
         self.filter_type = self.filter_type_combo.currentText()
         freq_min = int(self.freq_min_input.currentText())
         freq_max = int(self.freq_max_input.currentText())
@@ -203,17 +273,56 @@ class SignalProcessingWindow(QDialog):
         self.clear_filter_button.setVisible(True)
         self.apply_filter_button.setVisible(False)
 
-        if self.filter_type == "None":
+        stages = self.filter_stages
+        if not stages and self.filter_type != "None":
+            stages = [(self.filter_type, self.freq_range)]
+
+        if not stages:
             self.update_status_signal.emit("No filter applied.")
-        elif self.filter_type == "Low Pass" or self.filter_type == "High Pass":
-            self.apply_filter_signal.emit(self.filter_type, self.freq_range, 0)
-            self.update_status_signal.emit(f"Applying {self.filter_type} filter with threshold {freq_min} Hz")
-        elif self.filter_type == "Band Pass":
-            self.apply_filter_signal.emit(self.filter_type, self.freq_range, 0)
-            self.update_status_signal.emit(f"Applying {self.filter_type} filter with range {freq_min}-{freq_max} Hz")
-        elif self.filter_type == "Notch":
-            self.apply_filter_signal.emit(self.filter_type, self.freq_range, 0)
-            self.update_status_signal.emit(f"Applying {self.filter_type} filter at {freq_min} Hz")
+        else:
+            self.apply_filter_signal.emit(stages, 0)
+            self.update_status_signal.emit("Applying filter: " + " -> ".join(describe_stage(*stage) for stage in stages))
+
+    def track_frequencies(self):
+        """Start tracking the frequencies typed in."""
+        frequencies = parse_frequencies(self.frequencies_input.text())[:MAX_TRACKED]
+        if not frequencies:
+            self.update_status_signal.emit("No frequencies to track.")
+            return
+        self.frequencies_input.setText(", ".join(f"{frequency:g}" for frequency in frequencies))
+        self.track_frequencies_signal.emit(frequencies)
+        self.update_status_signal.emit("Tracking " + ", ".join(f"{frequency:g}" for frequency in frequencies) + " Hz")
+
+    def stop_tracking(self):
+        """Stop tracking frequencies."""
+        self.track_frequencies_signal.emit([])
+        self.update_status_signal.emit("Frequency tracking stopped.")
+
+    def add_stage(self):
+        """Add the selected filter to the end of the cascade."""
+        filter_type = self.filter_type_combo.currentText()
+        if filter_type == "None":
+            return
+        freq_range = [int(self.freq_min_input.currentText()), int(self.freq_max_input.currentText())]
+        self.filter_stages.append((filter_type, freq_range))
+        self.stage_list.addItem(describe_stage(filter_type, freq_range))
+        self.update_applied_stages()
+
+    def remove_stage(self):
+        """Remove the selected stage, or the last one if none is selected, from the cascade."""
+        if not self.filter_stages:
+            return
+        row = self.stage_list.currentRow()
+        if row < 0:
+            row = len(self.filter_stages) - 1
+        del self.filter_stages[row]
+        self.stage_list.takeItem(row)
+        self.update_applied_stages()
+
+    def update_applied_stages(self):
+        """Send the edited cascade on if a real-time filter is applied, the stages kept keep their state."""
+        if self.rt and self.clear_filter_button.isVisible():
+            self.apply_filter_signal.emit(self.filter_stages, 0)
 
     def clear_filter(self):
         """Clear the applied filter."""
@@ -223,7 +332,7 @@ class SignalProcessingWindow(QDialog):
         self.freq_min_input.setCurrentIndex(0)
         self.freq_max_input.setCurrentIndex(0)
         self.clear_filter_button.setVisible(False)
-        self.apply_filter_signal.emit(self.filter_type, self.freq_range, 1)
+        self.apply_filter_signal.emit([], 1)
         if hasattr(self, 'butter_states'):
             self.butter_states.clear()
         if hasattr(self, 'notch_states'):
@@ -339,7 +448,7 @@ class SignalProcessingWindow(QDialog):
         self.clear_model_button.setVisible(False)
         self.use_default_model_checkbox.setChecked(False)
 
-        self.start_time_label = time.time()
+        self.detector.restart()
         self.update_status_signal.emit("Model cleared.")
 
     def toggle_labeling_mode(self, state):
@@ -365,6 +474,12 @@ class SignalProcessingWindow(QDialog):
             self.clear_filter_button.setVisible(True)
             self.apply_filter_button.setVisible(False)
 
+        self.filter_stages = [tuple(stage) for stage in json.loads(settings.value("filter_stages", "[]"))]
+        for stage in self.filter_stages:
+            self.stage_list.addItem(describe_stage(*stage))
+
+        self.frequencies_input.setText(settings.value("tracked_frequencies", ""))
+
         min_freq = settings.value("freq_min", "0")
         self.freq_min_input.setCurrentText(min_freq)
         max_freq = settings.value("freq_max", "0")
@@ -387,8 +502,8 @@ class SignalProcessingWindow(QDialog):
         self.apply_ml_button.setVisible(not self.labeling_mode)
         self.use_default_model_checkbox.setVisible(not self.labeling_mode)
 
-        self.filtered_data = settings.value("filtered_data", None)
-        self.original_data = settings.value("original_data", None)
+        # the recordings themselves stay in the main window, only whether one is filtered is saved
+        filter_applied = settings.value("filter_applied", "False") == "True"
         self.max_raw = settings.value("max_raw", 0)
 
         # self.eff_dc = settings.value("eff_dc", [])
@@ -399,7 +514,7 @@ class SignalProcessingWindow(QDialog):
 
         self.rt = settings.value("rt", False)
 
-        if self.filtered_data is not None:
+        if filter_applied:
             self.clear_filter_button.setVisible(True)
             self.apply_filter_button.setVisible(False)
 
@@ -411,12 +526,13 @@ class SignalProcessingWindow(QDialog):
         settings.setValue("freq_min", self.freq_min_input.currentText())
         settings.setValue("freq_max", self.freq_max_input.currentText())
         settings.setValue("freq_range", self.freq_range)
+        settings.setValue("filter_stages", json.dumps(self.filter_stages))
+        settings.setValue("tracked_frequencies", self.frequencies_input.text())
         settings.setValue("model", self.model)
         settings.setValue("model_buffer", self.model_buffer)
         settings.setValue("model_path", self.model_path)
         settings.setValue("labeling_mode", str(self.labeling_mode_checkbox.isChecked()))
-        settings.setValue("original_data", self.original_data)
-        settings.setValue("filtered_data", self.filtered_data)
+        settings.setValue("filter_applied", str(not self.clear_filter_button.isHidden()))
         settings.setValue("rt", self.rt)
         settings.setValue("butter_states", self.butter_states)
         settings.setValue("notch_states", self.notch_states)
@@ -424,214 +540,3 @@ class SignalProcessingWindow(QDialog):
         
         # settings.setValue("eff_dc", self.eff_dc)
         # settings.setValue("delta", self.delta)
-
-    # model for emg
-    def detect_emg(self, raw_data, buffer, label=None, mode=None):
-        """
-        Process data through EMG detection pipeline with moving average
-        Returns: (spikes, filtered_data)
-        """
-        spikes = [0] * 8
-        measurements = [0] * 8
-
-        # NLMS Implementation -- Second Stage of Training
-        elapsed_time = time.time() - self.start_time_label
-        # print(elapsed_time)
-        if elapsed_time > 5:
-            # tolerance to reset t to zero
-            if 5.01 > elapsed_time > 5:
-                self.t = 0
-            #LMS implementation
-            x_ref = np.random.normal(self.eff_mean, self.eff_std, 64)
-            self.weights, x = self.apply_nlms_filter(x_ref, self.weights, buffer[-1], mu=0.99, eps=1e-6)
-
-        for ch in range(8):
-            x_sample = x[ch, 0]
-            
-            if self.use_adaptive:
-                (self.eff_mean[ch], self.eff_dc[ch], self.delta_min[ch], self.delta_max[ch], self.t, measurements[ch], spikes[ch]) = self.apply_sded_dual(
-                    x_sample, self.eff_mean[ch], self.eff_dc[ch], self.alpha[ch], self.delta_min[ch], self.delta_max[ch], self.t, 0, 1, 1, label, mode, 2, 19000)
-            else:
-                (self.eff_dc[ch], measurements[ch], 
-                spikes[ch]) = self._apply_sded_fixed(
-                    x_sample, self.eff_dc[ch], self.alpha, self.delta[ch]
-                )
-
-        return np.array(spikes), raw_data
-
-    @staticmethod
-    def _apply_sded_fixed(x, eff_dc, alpha, delta):
-        """Fixed threshold version with moving average compensation"""
-        meas = np.abs(x - eff_dc)
-        alpha_red = alpha/2
-        
-        if meas > delta:
-            new_eff_dc = alpha_red * (x + eff_dc) / 2 + (1 - alpha_red) * eff_dc
-            if x > 5000:
-                spike = 1
-            else: spike = 0
-        else:
-            new_eff_dc = alpha * x + (1 - alpha) * eff_dc
-            spike = 0
-            
-        return new_eff_dc, meas, spike
-
-    @staticmethod
-    def _apply_sded_adaptive(x, eff_dc, alpha_dc, alpha_delta, delta):
-        """Adaptive threshold version with moving average compensation"""
-        meas = np.abs(x - eff_dc)
-        alpha_dc_red = alpha_dc/2
-        alpha_delta_red = alpha_delta/2
-        
-        if meas > delta:
-            new_delta = (alpha_delta_red * meas**2 + (1 - alpha_delta_red) * delta**2)**(1/2)
-            if x > 5000:
-                spike = 1
-            else: spike = 0
-            new_eff_dc = alpha_dc_red * (x + eff_dc)/2 + (1 - alpha_dc_red) * eff_dc
-        else:
-            new_delta = (alpha_delta * meas**2 + (1 - alpha_delta) * delta**2)**(1/2)
-            spike = 0
-            new_eff_dc = alpha_dc * x + (1 - alpha_dc) * eff_dc
-            
-        return new_eff_dc, new_delta, meas, spike
-
-    def apply_nlms_filter(self, x_ref, w_lms_k, x_dsr, mu=None, eps=None):
-        """
-        Applies the NLMS filter to the input signal x_in.
-
-        x_in: input signal (M x 1)
-        w_lms_k: filter weights at time k (M x 1)
-        y_noisy: noisy output signal (scalar)
-        mu: learning rate
-        eps: regularization parameter
-        """
-        if mu is None:
-            raise ValueError("mu must be specified.")
-        if eps is None:
-            raise ValueError("eps must be specified.")
-            
-        y_hat = np.dot(w_lms_k, x_ref)
-        e = x_dsr - y_hat
-        x_pow  = np.dot(x_ref, x_ref)
-        mu_eff = mu / (x_pow + eps)
-        w_lms_k1 = w_lms_k + mu_eff * e * x_ref
-
-        return w_lms_k1, e
-
-    def apply_sded_dual(self,
-        x,
-        eff_mean,
-        eff_std,
-        alpha,
-        delta_min,
-        delta_max,
-        t=0,
-        gamma0_min=1,
-        gamma0_max=1,
-        desired=None,
-        mode='adaptive',
-        q=2,
-        max_cap=19000
-    ):
-        """
-        Single‐sample SDED with dual thresholds (min/max) and optional adaptation.
-
-        Parameters
-        ----------
-        x : float
-            Current signal sample.
-        eff_mean : float
-            Current mean estimate.
-        eff_std : float
-            Current standard deviation estimate.
-        alpha : float
-            Mean and standard deviation adaptation rate (0 < alpha_dc < 1).
-        delta_min : float
-            Current minimum deviation threshold.
-        delta_max : float
-            Current maximum deviation threshold.
-        t : int
-            Count of delta bound changes.
-        gamma0_min : float
-            Initial learning rate for delta_min (empirically set).
-        gamma0_max : float
-            Initial learning rate for delta_max (empirically set).
-        desired : {0,1}, optional
-            Ground‐truth label for this sample.  **Required** if mode='adaptive'.
-        mode : {'static','adaptive'}, default='adaptive'
-            If 'static', thresholds remain unchanged; if 'adaptive', they update on
-            misclassifications.
-        q : float, default=2
-            Slowdown factor for DC learning on spikes (alpha_dc_red = alpha_dc/q).
-        max_cap : float, default=19000
-            Hard cap for delta_max.
-
-        Returns
-        -------
-        new_eff_mean : float
-            Updated mean estimate.
-        new_eff_std : float
-            Updated standard deviation estimate.
-        new_delta_min : float
-            Updated minimum threshold.
-        new_delta_max : float
-            Updated maximum threshold.
-        new_t : int
-            Updated count.
-        meas : float
-            |x – eff_dc| (the measured deviation).
-        spike : {0,1}
-            1 if deviation ∈ (delta_min, delta_max), else 0.
-        """
-
-        # 1) measure and classify
-        meas = abs(x - eff_mean)
-        spike = 1 if (meas > delta_min and meas < delta_max) else 0
-
-        # 2) update mean and std estimate (slow down on spikes)
-        alpha_eff = alpha / q if spike == 1 else alpha
-        new_eff_mean = alpha_eff * x + (1 - alpha_eff) * eff_mean
-        new_eff_std = (alpha_eff * meas**2 + (1 - alpha_eff) * eff_std**2)**(1/2)
-
-        # 3) prepare thresholds (static by default)
-        new_delta_min = delta_min
-        new_delta_max = delta_max
-        new_t = t
-
-        # 4) adaptive‐mode threshold updates
-        if mode == 'adaptive':
-            if desired is None:
-                raise ValueError("`desired` (0 or 1) must be provided in adaptive mode")
-
-            # decayed learning‐rates
-            gamma_min = gamma0_min / (1 + t)
-            gamma_max = gamma0_max / (1 + t)
-
-            # 4a) missed positive → expand the violated bound toward meas
-            if desired == 1 and spike == 0:
-                new_t +=1
-                if meas <= delta_min:
-                    new_delta_min = delta_min + gamma_min * (meas - delta_min)
-                else:  # meas >= delta_max
-                    new_delta_max = delta_max + gamma_max * (meas - delta_max)
-
-            # 4b) false positive → shrink the nearer bound away from meas
-            elif desired == 0 and spike == 1:
-                new_t +=1
-                if abs(delta_min - meas) < abs(delta_max - meas):
-                    # meas closer to delta_min → raise delta_min
-                    new_delta_min = delta_min + gamma_min * (meas - delta_min)
-                else:
-                    # meas closer to delta_max → lower delta_max
-                    new_delta_max = delta_max + gamma_max * (meas - delta_max)
-
-            # 5) clip to [0, max_cap] and sanity‐check band
-            new_delta_min = max(0.0, new_delta_min)
-            new_delta_max = min(max_cap, new_delta_max)
-
-            # if adaptation would invert the band, revert to previous thresholds
-            if new_delta_min >= new_delta_max:
-                new_delta_min, new_delta_max = delta_min, delta_max
-
-        return new_eff_mean, new_eff_std, new_delta_min, new_delta_max, new_t, meas, spike
\ No newline at end of file
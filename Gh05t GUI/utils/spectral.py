@@ -0,0 +1,273 @@
+import os
+import pickle
+import logging
+import threading
+import numpy as np
+
+try:
+    import pyfftw
+except ImportError:  # numpy's FFT is used instead, just slower
+    pyfftw = None
+
+SPECTRUM_WINDOW = 1.0  # seconds of data per FFT segment
+SPECTRUM_HOP = 0.1  # seconds of new data before the spectrum is computed again
+FREQ_RANGE = (0.1, 80)  # Hz shown by the spectrum plots
+WISDOM_PATH = os.path.join("data", "fftw_wisdom.pkl")
+PLANNER_EFFORT = "FFTW_MEASURE"
+MAX_TRACKED = 8  # most frequencies a BinTracker follows
+
+logging.basicConfig(level=logging.INFO)
+spectral_logger = logging.getLogger(__name__)
+
+wisdom_lock = threading.Lock()
+wisdom_loaded = set()  # wisdom files already imported by this process
+
+def load_wisdom(path=WISDOM_PATH):
+    """Loads the FFTW wisdom saved by an earlier session, so plans are not measured again.
+
+    :param path: The wisdom file."""
+    with wisdom_lock:
+        if path in wisdom_loaded or pyfftw is None:
+            return
+        wisdom_loaded.add(path)
+        try:
+            with open(path, 'rb') as f:
+                pyfftw.import_wisdom(pickle.load(f))
+        except FileNotFoundError:
+            pass  # first session, the wisdom is saved once the first plan is made
+        except (OSError, pickle.PickleError, ValueError, EOFError) as e:
+            spectral_logger.info(f"No FFTW wisdom loaded: {e}")
+
+def save_wisdom(path=WISDOM_PATH):
+    """Saves the FFTW wisdom gathered so far for the next session.
+
+    :param path: The wisdom file."""
+    if pyfftw is None:
+        return
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, 'wb') as f:
+            pickle.dump(pyfftw.export_wisdom(), f)
+    except OSError as e:
+        spectral_logger.warning(f"Could not save FFTW wisdom: {e}")
+
+def spectrum(data, sampling_rate, freq_range=FREQ_RANGE):
+    """Magnitude spectrum of every channel, Hamming windowed with the mean removed.
+
+    :param data: (channels, N) array of samples.
+    :param sampling_rate: Sample rate in Hz.
+    :param freq_range: (low, high) frequencies kept, in Hz.
+
+    :return tuple: The (F,) frequencies and (channels, F) magnitudes."""
+    num_samples = data.shape[1]
+    data = data.astype(np.float32)
+    data -= np.mean(data, axis=1, keepdims=True)
+    fft_data = np.fft.rfft(data * np.hamming(num_samples), axis=1)
+    freqs = np.fft.rfftfreq(num_samples, d=1/sampling_rate)
+    freq_mask = (freqs >= freq_range[0]) & (freqs <= freq_range[1])
+    return freqs[freq_mask], np.abs(fft_data[:, freq_mask]) / num_samples
+
+class SpectralEngine:
+    """Sliding spectrum of the real-time session, shared by every spectrum plot.
+
+    The spectrum is only recomputed once hop seconds of new samples are in the session
+    buffer. Until then update returns the cached result, so the FFT and Polar FFT plots
+    can ask at any frame rate and share one computation. The Hamming window, the FFTW
+    plan and its buffers are made once. With segments > 1 the magnitudes are Welch
+    averaged over that many half-overlapping windows, for a smoother spectrum."""
+
+    def __init__(self, ring, sampling_rate, window=SPECTRUM_WINDOW, hop=SPECTRUM_HOP, segments=1,
+                 channels=8, freq_range=FREQ_RANGE, wisdom_path=WISDOM_PATH):
+        """Initializes the engine, planning the FFT.
+
+        :param ring: The session RingBuffer, channel rows first.
+        :param sampling_rate: Sample rate in Hz.
+        :param window: Seconds of data per FFT segment.
+        :param hop: Seconds of new data between updates.
+        :param segments: Number of half-overlapping segments averaged (Welch), 1 for a single FFT.
+        :param channels: Number of channel rows in the ring.
+        :param freq_range: (low, high) frequencies kept, in Hz.
+        :param wisdom_path: File the FFTW wisdom is kept in between sessions."""
+        self.ring = ring
+        self.sampling_rate = sampling_rate
+        self.channels = channels
+        self.freq_range = freq_range
+        self.wisdom_path = wisdom_path
+        self.hop = max(1, int(hop * sampling_rate))
+        self.segment_size = max(2, int(window * sampling_rate))
+        self.lock = threading.Lock()
+
+        self.freqs = None
+        self.magnitudes = None
+        self.num_samples = 0  # samples behind the current result
+        self.version = 0  # bumped whenever the result changes
+        self.computed_at = None  # ring head the result was computed at
+        self.set_segments(segments)
+
+    def set_segments(self, segments):
+        """Switches Welch averaging, planning the FFT for the new shape.
+
+        :param segments: Number of half-overlapping segments averaged, 1 for a single FFT."""
+        with self.lock:
+            self.segments = max(1, int(segments))
+            self.step = self.segment_size // 2
+            self.span = self.segment_size + (self.segments - 1) * self.step
+            self.window = np.hamming(self.segment_size).astype(np.float32)
+            all_freqs = np.fft.rfftfreq(self.segment_size, d=1/self.sampling_rate)
+            self.freq_mask = (all_freqs >= self.freq_range[0]) & (all_freqs <= self.freq_range[1])
+            self.full_freqs = all_freqs[self.freq_mask]
+
+            shape = (self.channels, self.segments, self.segment_size)
+            if pyfftw is not None:
+                load_wisdom(self.wisdom_path)
+                self.fft_input = pyfftw.empty_aligned(shape, dtype='float32')
+                had_wisdom = pyfftw.export_wisdom()
+                self.fft = pyfftw.builders.rfft(self.fft_input, axis=-1, planner_effort=PLANNER_EFFORT)
+                if pyfftw.export_wisdom() != had_wisdom:
+                    save_wisdom(self.wisdom_path)
+            else:
+                self.fft_input = np.empty(shape, dtype=np.float32)
+                self.fft = lambda a: np.fft.rfft(a, axis=-1)
+            self.computed_at = None
+
+    def update(self):
+        """Recomputes the spectrum if a hop of new samples arrived.
+
+        :return tuple: (freqs, magnitudes, num_samples, version) of the current result, or None
+                       before the first samples arrive."""
+        with self.lock:
+            head = self.ring.head
+            if self.computed_at is None or head - self.computed_at >= self.hop:
+                self.compute(head)
+            if self.magnitudes is None:
+                return None
+            return self.freqs, self.magnitudes, self.num_samples, self.version
+
+    def compute(self, head):
+        """Computes the spectrum of the newest samples in the ring.
+
+        :param head: The ring head the samples end at."""
+        with self.ring.lock:
+            samples, _ = self.ring.window(head, self.span)
+            samples = samples[:self.channels].copy()
+        self.computed_at = head
+        if samples.shape[1] < 2:
+            return
+
+        if samples.shape[1] < self.span:
+            # not a full window yet, right after the start
+            self.freqs, self.magnitudes = spectrum(samples, self.sampling_rate, self.freq_range)
+            self.num_samples = samples.shape[1]
+        else:
+            segments = np.lib.stride_tricks.sliding_window_view(samples, self.segment_size, axis=1)[:, ::self.step]
+            np.subtract(segments, segments.mean(axis=-1, keepdims=True), out=self.fft_input)
+            self.fft_input *= self.window
+            fft_data = self.fft(self.fft_input)
+            power = np.abs(fft_data[..., self.freq_mask]) ** 2
+            self.freqs = self.full_freqs
+            self.magnitudes = np.sqrt(power.mean(axis=1)) / self.segment_size
+            self.num_samples = self.span
+        self.version += 1
+
+def trackable(frequencies, sampling_rate, limit=MAX_TRACKED):
+    """The frequencies a BinTracker can follow, in order, without repeats.
+
+    :param frequencies: Frequencies asked for in Hz.
+    :param sampling_rate: Sample rate in Hz.
+    :param limit: Most frequencies kept.
+
+    :return list: The frequencies between 0 and Nyquist, at most limit of them."""
+    kept = []
+    for frequency in frequencies:
+        frequency = float(frequency)
+        if 0 < frequency < 0.5 * sampling_rate and frequency not in kept:
+            kept.append(frequency)
+    return kept[:limit]
+
+class BinTracker:
+    """Magnitudes of a few chosen frequencies over a sliding window, updated sample by sample.
+
+    Each frequency is a sliding DFT: the newest sample is added and the one leaving the
+    window removed, so a sample costs the same whatever the window length, and the
+    frequencies need not fall on FFT bins. The Hamming window is applied in the frequency
+    domain from the two neighbouring bins, and the window mean is tracked as a running sum,
+    so the magnitudes are those spectrum gives for the same window. A block is applied in
+    one step per frequency, and the sums are recomputed once per window length so rounding
+    errors do not build up."""
+
+    def __init__(self, frequencies, sampling_rate, channels=8, window=SPECTRUM_WINDOW):
+        """Initializes the tracker with an empty (all zero) window.
+
+        :param frequencies: Frequencies to track in Hz, see trackable.
+        :param sampling_rate: Sample rate in Hz.
+        :param channels: Number of channels.
+        :param window: Seconds of data per window."""
+        self.frequencies = trackable(frequencies, sampling_rate)
+        self.channels = channels
+        self.size = max(2, int(window * sampling_rate))
+        n = self.size
+
+        # each frequency w and its neighbours w -/+ 2 pi / (n - 1), where the Hamming window's cosine lands
+        omega = 2 * np.pi * np.array(self.frequencies) / sampling_rate
+        shift = 2 * np.pi / (n - 1)
+        self.omegas = np.concatenate((omega, omega - shift, omega + shift))
+        self.rotation = np.exp(1j * self.omegas)
+        self.newest = np.exp(-1j * self.omegas * (n - 1))
+        self.basis = np.exp(-1j * np.outer(np.arange(n), self.omegas))  # (n, 3 * frequencies), for the resync
+        self.window_dft = np.hamming(n) @ self.basis[:, :len(self.frequencies)]
+        self.block_powers = {}  # block length -> rotations applied to its samples, blocks mostly have one length
+
+        self.history = np.zeros((channels, n))  # the window, sample i at i % n
+        self.count = 0  # samples seen
+        self.synced_at = 0
+        self.sums = np.zeros((channels, len(self.omegas)), dtype=complex)
+        self.total = np.zeros(channels)
+
+    def process(self, data):
+        """Slides the window over a block.
+
+        :param data: (channels, N) array of samples.
+
+        :return np.ndarray: (channels, frequencies) magnitudes of the window ending with the block."""
+        for start in range(0, data.shape[1], self.size):
+            self.slide(data[:, start:start + self.size])
+        if self.count - self.synced_at >= self.size:
+            self.resync()
+        return self.magnitudes()
+
+    def slide(self, data):
+        """Slides the window by up to a window length of samples.
+
+        :param data: (channels, N) array of samples, N at most the window length."""
+        n = data.shape[1]
+        if n == 0:
+            return
+        slots = (self.count + np.arange(n)) % self.size
+        leaving = self.history[:, slots]
+
+        # X[t] = r * (X[t - 1] - x[t - size]) + x[t] * e^(-jw(size - 1)), unrolled over the block
+        if n not in self.block_powers:
+            powers = (self.rotation[:, None] ** np.arange(n - 1, -1, -1)).T
+            self.block_powers[n] = (self.rotation ** n, self.newest * powers, self.rotation * powers)
+        carry, added, removed = self.block_powers[n]
+        self.sums = carry * self.sums + data @ added - leaving @ removed
+        self.total += data.sum(axis=1) - leaving.sum(axis=1)
+        self.history[:, slots] = data
+        self.count += n
+
+    def resync(self):
+        """Recomputes the sums from the window itself."""
+        window = self.history[:, (self.count + np.arange(self.size)) % self.size]
+        self.sums = window @ self.basis
+        self.total = window.sum(axis=1)
+        self.synced_at = self.count
+
+    def magnitudes(self):
+        """Magnitudes of the current window, as spectrum computes them.
+
+        :return np.ndarray: (channels, frequencies) magnitudes."""
+        count = len(self.frequencies)
+        center, lower, upper = self.sums[:, :count], self.sums[:, count:2 * count], self.sums[:, 2 * count:]
+        windowed = 0.54 * center - 0.23 * (lower + upper)
+        windowed -= (self.total / self.size)[:, None] * self.window_dft
+        return np.abs(windowed) / self.size
@@ -0,0 +1,72 @@
+import time
+import numpy as np
+from utils.acquisition import AcquisitionSource, BlockAccumulator, register_source, BLOCK_INTERVAL_MS
+
+CHUNK_SAMPLES = 5  # samples generated per step, 20 ms at 250 Hz
+ALPHA_HZ = 10.0
+LINE_HZ = 60.0
+
+@register_source
+class SyntheticSource(AcquisitionSource):
+    """Generates a deterministic 8-channel EEG-like signal, for trying the GUI without hardware.
+
+    Every channel is a 10 Hz alpha rhythm with its own amplitude and phase, 60 Hz line
+    noise and seeded white noise, in millivolts. The same seed always gives the same
+    samples, and generate() can be called directly to get them without the thread."""
+    name = "Synthetic (no device)"
+    channel_count = 8
+    sample_rate = 250
+    adc_scale = 1.0
+
+    def __init__(self, seed=0, realtime=True, block_interval_ms=BLOCK_INTERVAL_MS):
+        """Initializes the generator.
+
+        :param seed: Seed of the noise generator.
+        :param realtime: Pace the samples at sample_rate. False generates as fast as possible.
+        :param block_interval_ms: How often generated samples are emitted as one block."""
+        super().__init__()
+        self.rng = np.random.default_rng(seed)
+        self.realtime = realtime
+        self.accumulator = BlockAccumulator(block_interval_ms)
+        self.sample_index = 0
+        self.running = False
+
+        channels = np.arange(8)
+        self.amplitudes = 0.02 + 0.005 * channels  # millivolts
+        self.phases = channels * np.pi / 8
+
+    def generate(self, n_samples):
+        """Generates the next samples.
+
+        :param n_samples: Number of samples to generate.
+
+        :return tuple: (timestamps, samples) as an (N,) millisecond array and an (8, N) array."""
+        index = self.sample_index + np.arange(n_samples)
+        self.sample_index += n_samples
+        t = index / self.sample_rate
+
+        alpha = self.amplitudes[:, None] * np.sin(2 * np.pi * ALPHA_HZ * t + self.phases[:, None])
+        line = 0.005 * np.sin(2 * np.pi * LINE_HZ * t)
+        noise = 0.01 * self.rng.standard_normal((8, n_samples))
+        timestamps = (index * 1000) // self.sample_rate
+        return timestamps, alpha + line + noise
+
+    def run(self):
+        """The main loop for the QThread, generates samples until stop is called."""
+        self.running = True
+        self.status_update_signal.emit("Generating synthetic data")
+        start = time.perf_counter()
+        while self.running:
+            if self.realtime:
+                # sleep until the next chunk is due, so the rate does not drift
+                due = start + (self.sample_index + CHUNK_SAMPLES) / self.sample_rate
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            self.emit_block(self.accumulator.add(*self.generate(CHUNK_SAMPLES)))
+        self.emit_block(self.accumulator.flush())
+
+    def stop(self):
+        """Stops generating and waits for the worker thread to finish."""
+        self.running = False
+        super().stop()
@@ -0,0 +1,176 @@
+import time
+import json
+from collections import deque
+import numpy as np
+
+TIMESTAMP_WRAP = 2 ** 32  # device timestamps are uint32 milliseconds
+GAP_TOLERANCE = 1.5  # a step longer than this many sample periods counts as a gap
+MAX_GAP_MS = 60000  # a longer step, or any step backward, is a discontinuity (device reset, reconnect), not loss
+JITTER_BINS_MS = (0, 5, 10, 20, 50, 100, 250, 500, 1000)  # inter-arrival histogram edges
+RATE_WINDOW = 1.0  # seconds covered by the rolling sample rate
+
+def format_link_stats(stats):
+    """Short human-readable form of a telemetry snapshot for the status bar.
+
+    :param stats: A LinkTelemetry.snapshot() dict.
+
+    :return str: Rate, loss and gap count."""
+    return f"{stats['rate_hz']:.0f} Hz | loss {stats['loss_percent']:.2f}% | gaps {stats['gaps']}"
+
+class LinkTelemetry:
+    """Tracks the quality of a real-time link from the device-side sample timestamps.
+
+    Every decoded chunk is checked against the previous one for timestamp gaps, which
+    gives the number of samples dropped on the way. The host arrival time of each chunk
+    feeds an inter-arrival jitter histogram and a rolling effective sample rate. Short
+    gaps can optionally be filled with linearly interpolated samples so the filters
+    downstream keep a uniform time base."""
+
+    def __init__(self, sample_rate=250, interpolate_gaps=False, max_fill=10):
+        """Initializes the telemetry counters.
+
+        :param sample_rate: Nominal sample rate of the device in Hz.
+        :param interpolate_gaps: Fill gaps of up to max_fill samples with interpolated samples.
+        :param max_fill: Longest gap, in samples, that is interpolated. Longer gaps are only counted."""
+        self.period_ms = 1000.0 / sample_rate
+        self.interpolate_gaps = interpolate_gaps
+        self.max_fill = max_fill
+        self.jitter_edges = np.array(JITTER_BINS_MS, dtype=float)
+        self.reset()
+
+    def reset(self):
+        """Clears all counters, e.g. when a new connection starts."""
+        self.received = 0
+        self.dropped = 0
+        self.gaps = 0
+        self.filled = 0
+        self.largest_gap_ms = 0
+        self.discontinuities = 0
+        self.jitter_counts = np.zeros(len(self.jitter_edges), dtype=np.int64)  # last bin is open-ended
+        self.arrivals = deque()
+        self.window_samples = 0
+        self.reset_continuity()
+
+    def reset_continuity(self):
+        """Forgets the previous chunk but keeps the counters, e.g. after a reconnect.
+
+        The next chunk is neither checked for a gap against the chunk before nor
+        interpolated from it."""
+        self.last_timestamp = None
+        self.last_sample = None
+        self.last_arrival = None
+
+    def update(self, timestamps, samples=None, arrival=None):
+        """Accounts for a decoded chunk and optionally fills its gaps.
+
+        :param timestamps: (N,) array of device timestamps in milliseconds.
+        :param samples: (channels, N) array of samples, only needed when interpolating.
+        :param arrival: Host time of arrival in seconds, defaults to time.perf_counter().
+
+        :return tuple: (timestamps, samples), with interpolated samples inserted when enabled."""
+        n = len(timestamps)
+        if n == 0:
+            return timestamps, samples
+        if arrival is None:
+            arrival = time.perf_counter()
+
+        # inter-arrival jitter and rolling rate are measured on the host clock
+        if self.last_arrival is not None:
+            delta_ms = (arrival - self.last_arrival) * 1000
+            self.jitter_counts[np.searchsorted(self.jitter_edges, delta_ms, side='right') - 1] += 1
+        self.last_arrival = arrival
+        self.arrivals.append((arrival, n))
+        self.window_samples += n
+        while self.arrivals[0][0] < arrival - RATE_WINDOW:
+            self.window_samples -= self.arrivals.popleft()[1]
+        self.received += n
+
+        # timestamp steps, including the step from the previous chunk
+        stamps = np.asarray(timestamps, dtype=np.int64)
+        previous = self.last_timestamp if self.last_timestamp is not None else stamps[0]
+        steps = np.diff(stamps, prepend=previous) % TIMESTAMP_WRAP
+        # a step backward wraps to >= 2**31, it and any implausibly long step restart the time base
+        jumps = steps > MAX_GAP_MS
+        if jumps.any():
+            self.discontinuities += int(jumps.sum())
+            steps[jumps] = 0
+        gap_index = np.flatnonzero(steps > GAP_TOLERANCE * self.period_ms)
+        if len(gap_index):
+            missing = np.rint(steps[gap_index] / self.period_ms).astype(np.int64) - 1
+            self.gaps += len(gap_index)
+            self.dropped += int(missing.sum())
+            self.largest_gap_ms = max(self.largest_gap_ms, int(steps[gap_index].max()))
+
+        if self.interpolate_gaps and samples is not None and len(gap_index):
+            timestamps, samples = self.fill_gaps(stamps, samples, steps, gap_index, missing)
+
+        self.last_timestamp = int(stamps[-1])
+        if samples is not None:
+            self.last_sample = np.asarray(samples)[:, -1:]
+        return timestamps, samples
+
+    def fill_gaps(self, stamps, samples, steps, gap_index, missing):
+        """Inserts linearly interpolated samples into every gap short enough to fill.
+
+        :param stamps: (N,) int64 device timestamps of the chunk.
+        :param samples: (channels, N) samples of the chunk.
+        :param steps: (N,) timestamp step into each sample.
+        :param gap_index: Indices of the samples that follow a gap.
+        :param missing: Number of samples missing before each of those indices.
+
+        :return tuple: (timestamps, samples) with the interpolated samples inserted."""
+        samples = np.asarray(samples, dtype=float)
+        if self.last_sample is not None and self.last_timestamp is not None:
+            base_stamps = np.concatenate(([stamps[0] - steps[0]], stamps))
+            base_samples = np.hstack((self.last_sample, samples))
+            offset = 1
+        else:
+            base_stamps, base_samples, offset = stamps, samples, 0
+
+        out_stamps = [base_stamps[:gap_index[0] + offset]]
+        out_samples = [base_samples[:, :gap_index[0] + offset]]
+        for k, (index, count) in enumerate(zip(gap_index + offset, missing)):
+            if index > 0 and 0 < count <= self.max_fill:
+                fraction = np.arange(1, count + 1) / (count + 1)
+                left, right = base_samples[:, index - 1:index], base_samples[:, index:index + 1]
+                out_stamps.append(base_stamps[index - 1] + np.rint(fraction * steps[index - offset]).astype(np.int64))
+                out_samples.append(left + (right - left) * fraction)
+                self.filled += int(count)
+            end = gap_index[k + 1] + offset if k + 1 < len(gap_index) else len(base_stamps)
+            out_stamps.append(base_stamps[index:end])
+            out_samples.append(base_samples[:, index:end])
+
+        # the previous chunk's last sample was only borrowed as the left edge
+        return np.concatenate(out_stamps)[offset:], np.hstack(out_samples)[:, offset:]
+
+    def rate(self):
+        """Effective sample rate over the last RATE_WINDOW seconds.
+
+        :return float: Samples per second."""
+        return self.window_samples / RATE_WINDOW
+
+    def snapshot(self):
+        """Machine-readable summary of the link.
+
+        :return dict: Counters, loss percentage, rolling rate and jitter histogram."""
+        expected = self.received + self.dropped
+        return {
+            "received": self.received,
+            "dropped": self.dropped,
+            "gaps": self.gaps,
+            "filled": self.filled,
+            "loss_percent": 100.0 * self.dropped / expected if expected else 0.0,
+            "largest_gap_ms": self.largest_gap_ms,
+            "discontinuities": self.discontinuities,
+            "rate_hz": self.rate(),
+            "jitter_ms": {
+                "edges": self.jitter_edges.tolist(),
+                "counts": self.jitter_counts.tolist(),
+            },
+        }
+
+    def to_json(self):
+        """The snapshot as a JSON string.
+
+        :return str: JSON encoded snapshot."""
+        return json.dumps(self.snapshot())
@@ -1,20 +1,42 @@
 import socket
+import sys
 import time
 from datetime import datetime
 import asyncio
 import json
 import numpy as np
-from PyQt5.QtCore import QThread, QObject, pyqtSignal
+from PyQt5.QtCore import QObject
 from threading import Thread
 import struct
 import logging
 import websockets
 import msgpack
+from utils.acquisition import AcquisitionSource, BlockAccumulator, register_source, BLOCK_INTERVAL_MS
 
 HOST = "224.1.1.1"  # Replace with your Pico's IP address
 PORT = 5005
 WINDOW_SIZE = 200  # Number of samples to show
 SAMPLES_PER_PACKET = 8
+DATAGRAM_SIZE = 1024  # largest datagram read from the socket
+RECEIVE_BUFFER_SIZE = 1 << 20  # SO_RCVBUF, room for a few seconds of bursts
+MAX_DRAIN = 512  # datagrams read per wakeup before yielding back to the event loop
+STOP_TIMEOUT = 1.0  # seconds the WebSocket server is given to close its connections
+
+# Linux reports datagrams dropped on a full receive buffer through SO_RXQ_OVFL ancillary data,
+# the constant is not exported by the socket module
+SO_RXQ_OVFL = 40 if sys.platform.startswith("linux") else None
+# binary frame from the Pico = header [magic (uint16), sequence number (uint16), sample count (uint16)]
+# followed by count samples of channels 0-7 (uint16 each), all little-endian; JSON datagrams start with '{'
+FRAME_MAGIC = 0xEEC0
+# burst frames share the header and prefix every sample with its device timestamp/milliseconds (uint32)
+BURST_FRAME_MAGIC = 0xEEC1
+BURST_SAMPLE_DTYPE = np.dtype([('timestamp', '<u4'), ('channels', '<u2', (8,))])
+FRAME_HEADER_DTYPE = np.dtype([('magic', '<u2'), ('sequence', '<u2'), ('count', '<u2')])
+FRAME_HEADER_SIZE = FRAME_HEADER_DTYPE.itemsize
+JSON_START = ord('{')
+
+USE_RECVMSG = hasattr(socket.socket, "recvmsg")  # not available on Windows
+ANCILLARY_SIZE = socket.CMSG_SPACE(4) if USE_RECVMSG else 0
 
 logging.basicConfig(level=logging.INFO)
 web_logger = logging.getLogger(__name__)
@@ -27,76 +49,258 @@ data_buffer = {
 max_points = 2000
 start_timestamp = time.perf_counter_ns()
 
+def decode_frame(data):
+    """Decodes one binary multi-sample frame from the Pico.
+
+    :param data (bytes): The datagram holding the frame.
+
+    :return tuple: The frame sequence number (int), the samples ((8, N) uint16 array) and the
+               device timestamps ((N,) int64 array, or None for frames without timestamps).
+    :raises ValueError: If the magic or the length does not match the header."""
+    if len(data) < FRAME_HEADER_SIZE:
+        raise ValueError(f"Frame too short: {len(data)} bytes")
+    header = np.frombuffer(data, dtype=FRAME_HEADER_DTYPE, count=1)[0]
+    count = int(header['count'])
+    if header['magic'] == FRAME_MAGIC and len(data) == FRAME_HEADER_SIZE + 16 * count:
+        samples = np.frombuffer(data, dtype='<u2', count=8 * count, offset=FRAME_HEADER_SIZE)
+        return int(header['sequence']), samples.reshape((count, 8)).T, None
+    if header['magic'] == BURST_FRAME_MAGIC and len(data) == FRAME_HEADER_SIZE + BURST_SAMPLE_DTYPE.itemsize * count:
+        records = np.frombuffer(data, dtype=BURST_SAMPLE_DTYPE, count=count, offset=FRAME_HEADER_SIZE)
+        return int(header['sequence']), records['channels'].T, records['timestamp'].astype(np.int64)
+    raise ValueError(f"Malformed frame of {len(data)} bytes")
+
 # HANDLE INCOMING EEG DATA FROM RPI PICO DEVICE
-class EEGWebSocket(QThread):
-    status_update_signal = pyqtSignal(str)
-    data_received = pyqtSignal(int, list)
-    connection_failed_signal = pyqtSignal(str)
+class MulticastProtocol(asyncio.DatagramProtocol):
+    """Hands every datagram wakeup from the event loop to the EEGWebSocket worker."""
+
+    def __init__(self, worker):
+        """Initializes the protocol.
+
+        :param worker: The EEGWebSocket that drains and decodes the datagrams."""
+        super().__init__()
+        self.worker = worker
+
+    def datagram_received(self, data, addr):
+        """Called by the event loop for the first datagram of a wakeup.
+
+        :param data (bytes): The datagram.
+        :param addr: The sender address."""
+        self.worker.handle_datagrams(data)
+
+    def error_received(self, exc):
+        """Called by the event loop when a receive fails.
+
+        :param exc: The OSError raised by the socket."""
+        self.worker.receive_errors += 1
+        web_logger.warning(f"UDP receive error: {exc}")
+
+@register_source
+class EEGWebSocket(AcquisitionSource):
+    """Receives EEG samples from the Pico over UDP multicast.
 
-    def __init__(self):
+    The socket is read through an asyncio datagram endpoint, so the event loop stays
+    free and stop() can end the thread cleanly. Each wakeup drains every pending
+    datagram from the socket and decodes them as one batch. The loop is a selector loop
+    on every platform: its transport reads one datagram when the socket is readable and
+    has nothing outstanding when datagram_received runs, while the Windows default
+    (Proactor) loop already has the next receive posted and would race the drain. The
+    GUI shows the first channel of the Low Cost board, with its 12-bit ADC values
+    plotted as they are."""
+    name = "WebSocket (Low Cost)"
+    channel_count = 1
+    sample_rate = 500
+    adc_scale = 1.0
+
+    def __init__(self, block_interval_ms=BLOCK_INTERVAL_MS):
+        """Initializes the receiver.
+
+        :param block_interval_ms: How often decoded samples are emitted as one block."""
         super().__init__()
 
         self.data_buffer = bytearray()
         self.timestamp = 0
         self.channel_data = []
+        self.accumulator = BlockAccumulator(block_interval_ms)
+        self.socket = None
+        self.transport = None
+        self.loop = None
+        self.stop_event = None
+        self.stop_requested = False
+        self.last_sequence = None
+
+        # counters, lost_frames comes from gaps in the frame sequence numbers,
+        # dropped is the kernel's count of datagrams lost to a full receive buffer (Linux only)
+        self.received = 0
+        self.decode_errors = 0
+        self.receive_errors = 0
+        self.dropped = 0
+        self.lost_frames = 0
 
         web_logger.info("Scanning for WiFi...")
         self.status_update_signal.emit("Scanning for WiFi...")
 
-    async def connect(self):
+    def open_socket(self):
+        """Creates the non-blocking multicast socket with a receive buffer sized for bursts.
 
-        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
-        self.socket.setsockopt(socket.SOL_SOCKET,socket.SO_REUSEADDR, 1)
+        :return socket.socket: The bound socket."""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECEIVE_BUFFER_SIZE)
+        if SO_RXQ_OVFL is not None:
+            sock.setsockopt(socket.SOL_SOCKET, SO_RXQ_OVFL, 1)
         print(f"Connecting to {HOST}:{PORT}")
-        self.socket.bind(("", PORT))
+        sock.bind(("", PORT))
         mreq = struct.pack("4sl", socket.inet_aton(HOST), socket.INADDR_ANY)
-        self.socket.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
+        sock.setblocking(False)
+        return sock
+
+    async def connect(self):
+        """Receives datagrams until stop() is called."""
+        self.loop = asyncio.get_running_loop()
+        self.stop_event = asyncio.Event()
+        if self.stop_requested:
+            return
+        try:
+            self.socket = self.open_socket()
+            self.transport, _ = await self.loop.create_datagram_endpoint(
+                lambda: MulticastProtocol(self), sock=self.socket)
+        except OSError as e:
+            print(f"Failed to open UDP socket: {e}")
+            self.status_update_signal.emit(f"Failed to open UDP socket: {e}")
+            self.connection_failed_signal.emit()
+            return
 
-        # self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        # print(f"Connecting to {HOST}:{PORT}")
-        # self.status_update_signal.emit(f"Connecting to {HOST}:{PORT}")
-        # self.socket.connect((HOST, PORT))
-        # self.socket.settimeout(1.0)
         print("Connected!")
         self.status_update_signal.emit("Connected!")
 
-        while True:
-            self.handle_packets()
-            # await asyncio.sleep(0.00001)
+        try:
+            # a stop() before the event existed only set stop_requested
+            if not self.stop_requested:
+                await self.stop_event.wait()
+        finally:
+            await self.disconnect_client()
 
     async def disconnect_client(self):
-        await self.socket.close()
+        """Closes the datagram endpoint and emits any samples still waiting for a block."""
+        if self.transport is not None:
+            self.transport.close()
+            self.transport = None
+        self.flush()
+        web_logger.info(f"UDP receiver stopped: {self.stats()}")
+
+    def start(self):
+        """Starts the receiver thread, clearing a stop() of the previous run."""
+        self.stop_requested = False
+        super().start()
+
+    def stop(self):
+        """Ends the receiver from any thread and waits for the worker thread to finish."""
+        self.stop_requested = True
+        if self.loop is not None and self.stop_event is not None and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.stop_event.set)
+        super().stop()
+
+    def stats(self):
+        """Receive counters for the current session.
+
+        :return dict: received, dropped, lost_frames, decode_errors and receive_errors."""
+        return {
+            "received": self.received,
+            "dropped": self.dropped,
+            "lost_frames": self.lost_frames,
+            "decode_errors": self.decode_errors,
+            "receive_errors": self.receive_errors,
+        }
 
     def get_time_elapsed(self):
         return int((time.perf_counter_ns() - start_timestamp)/1000000)
 
-    def handle_packets(self):
-        raw_data, addr = self.socket.recvfrom(1024)
-        sensor_data = json.loads(raw_data.decode())
+    def drain_socket(self):
+        """Reads every datagram already queued on the non-blocking socket.
+
+        :return list: The datagrams, in arrival order."""
+        datagrams = []
+        while len(datagrams) < MAX_DRAIN:
+            try:
+                if USE_RECVMSG:
+                    data, ancdata, _, _ = self.socket.recvmsg(DATAGRAM_SIZE, ANCILLARY_SIZE)
+                else:
+                    data, ancdata = self.socket.recvfrom(DATAGRAM_SIZE)[0], []
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError as e:
+                self.receive_errors += 1
+                web_logger.warning(f"UDP receive error: {e}")
+                break
+            for level, kind, value in ancdata:
+                if level == socket.SOL_SOCKET and kind == SO_RXQ_OVFL and len(value) >= 4:
+                    self.dropped = struct.unpack("=I", value[:4])[0]
+            datagrams.append(data)
+        return datagrams
+
+    def handle_datagrams(self, first):
+        """Drains the socket behind the datagram the event loop delivered and decodes them together.
 
+        :param first (bytes): The datagram passed to datagram_received."""
+        datagrams = [first]
+        if self.socket is not None:
+            datagrams.extend(self.drain_socket())
+        self.received += len(datagrams)
         self.timestamp = self.get_time_elapsed()
-        channel_data = []
-        for i in range(8):
-            channel_key = f"CH{i}"
-            # data_buffer["timestamps"].append(self.timestamp)
-            if channel_key in sensor_data:
-                value = sensor_data[channel_key]
-
-                # data_buffer["values"][channel_key].append(value)
-
-                # if len(data_buffer["timestamps"]) > max_points:
-                #     data_buffer["timestamps"].pop(0)
-                #     for key in data_buffer["values"]:
-                #         data_buffer["values"][key].pop(0)
-            channel_data.append(value)
-        self.data_received.emit(self.timestamp, channel_data)
+
+        timestamps, channel_data = self.decode_datagrams(datagrams)
+        self.emit_block(self.accumulator.add(timestamps, channel_data))
+
+    def decode_datagrams(self, datagrams):
+        """Decodes a batch of datagrams into one chunk of samples.
+
+        Binary and burst frames are decoded with np.frombuffer. Datagrams starting with '{' are
+        read as the older one-sample JSON format {"CH0": value, ..., "CH7": value}.
+
+        :param datagrams (list): Raw datagrams in either format.
+
+        :return tuple: (timestamps, channel_data) as an (N,) array and an (8, N) array."""
+        chunks = []
+        stamps = []
+        for raw_data in datagrams:
+            try:
+                if raw_data[:1] and raw_data[0] == JSON_START:
+                    sensor_data = json.loads(raw_data)
+                    chunks.append(np.array([[sensor_data[f"CH{i}"]] for i in range(8)], dtype=float))
+                    stamps.append(np.full(1, self.timestamp))
+                else:
+                    sequence, samples, device_stamps = decode_frame(raw_data)
+                    if self.last_sequence is not None:
+                        gap = (sequence - self.last_sequence - 1) % 65536
+                        if gap < 32768:  # larger steps are reordered or repeated frames
+                            self.lost_frames += gap
+                    self.last_sequence = sequence
+                    chunks.append(samples)
+                    stamps.append(device_stamps if device_stamps is not None else np.full(samples.shape[1], self.timestamp))
+            except (ValueError, KeyError, TypeError) as e:
+                self.decode_errors += 1
+                web_logger.debug(f"Skipping malformed datagram: {e}")
+
+        # burst frames carry device timestamps, other datagrams drained in one wakeup share its arrival time
+        if not chunks:
+            return np.empty(0, dtype=np.int64), np.empty((8, 0))
+        return np.concatenate(stamps), np.hstack(chunks).astype(float)
+
+    def flush(self):
+        """Emits any samples still waiting for the next block."""
+        self.emit_block(self.accumulator.flush())
 
     def run(self):
         """The main loop for the QThread, sets up a new asyncio event loop
         and starts the websocket connection process."""
-        loop = asyncio.new_event_loop()
+        # explicitly a selector loop, handle_datagrams reads the socket itself (see the class docstring)
+        loop = asyncio.SelectorEventLoop()
         asyncio.set_event_loop(loop)
-        loop.run_until_complete(self.connect())
+        try:
+            loop.run_until_complete(self.connect())
+        finally:
+            loop.close()
 
 
 # API TO HANDLE SENDING LABELED INFORMATION
@@ -108,32 +312,39 @@ class WebSocketServer(QObject):
         self.server = None
         self.loop = None
         self.thread = None
+        self.serving = None
         self.running = False
         self.start_server()
 
     def start_server(self):
         """Start WebSocket server with proper event loop handling"""
-        def run_server():
-            # Create new event loop for this thread
-            self.loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(self.loop)
-            
-            # Define async main server task
-            async def server_main():
+        # The loop is created here so stop() finds it even before the thread has started
+        self.loop = asyncio.new_event_loop()
+
+        # Define async main server task
+        async def server_main():
+            try:
                 self.server = await websockets.serve(
                     self.handle_connection,
                     "0.0.0.0",
                     self.port
                 )
-                self.running = True
-                await self.server.start_serving()
+            except OSError as e:
+                print(f"WebSocket server error: {e}")
+                return
+            self.running = True
+            await self.server.start_serving()
+
+        def run_server():
+            asyncio.set_event_loop(self.loop)
 
             # Run the server until stopped
             try:
-                self.loop.run_until_complete(server_main())
+                self.serving = self.loop.create_task(server_main())
                 self.loop.run_forever()
             finally:
                 self.running = False
+                self.loop.close()
 
         # Start the server in a dedicated daemon thread
         self.thread = Thread(target=run_server, daemon=True)
@@ -164,13 +375,27 @@ class WebSocketServer(QObject):
             except Exception as e:
                 print(f"WebSocket send error: {e}")
 
+        if self.loop.is_closed():
+            return
         asyncio.run_coroutine_threadsafe(_send(), self.loop)
 
-    def stop_server(self):
-        """Clean shutdown procedure"""
-        if self.loop and self.running:
-            # Close server and clients
-            self.loop.call_soon_threadsafe(self.server.close)
-            self.loop.call_soon_threadsafe(self.loop.stop)
-            self.thread.join(timeout=1)
-            self.running = False
\ No newline at end of file
+    def stop(self):
+        """Closes the server and its connections, then stops the event loop and its thread."""
+        if self.loop is None or self.loop.is_closed():
+            return
+
+        async def close():
+            await self.serving
+            if self.server is not None:
+                self.server.close()
+                await self.server.wait_closed()
+
+        if self.loop.is_running():
+            try:
+                asyncio.run_coroutine_threadsafe(close(), self.loop).result(timeout=STOP_TIMEOUT)
+            except Exception as e:
+                print(f"WebSocket close error: {e}")
+        # a loop that has not started yet stops as soon as it does
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=STOP_TIMEOUT)
+        self.running = False
@@ -0,0 +1,76 @@
+"""Benchmarks document_data.py's line by line and bulk modes on a pty-based fake serial port.
+
+A writer thread plays the ESP32-C6 and streams hex lines into the pty as fast as the reader
+takes them. The terminal echo goes to a sink that costs a fixed time per write, like a slow
+console. Linux/macOS only (needs pty).
+
+Run from this folder: python benchmark_document_data.py"""
+import io
+import os
+import pty
+import threading
+import time
+import tty
+from contextlib import redirect_stdout
+
+import numpy as np
+import serial
+
+import document_data
+
+N_ROWS = 5000
+TERMINAL_WRITE_COST = 0.0002  # seconds per write to the emulated terminal
+
+class SlowTerminal(io.StringIO):
+    def write(self, text):
+        time.sleep(TERMINAL_WRITE_COST)
+        return len(text)
+
+def make_lines(n_rows):
+    rng = np.random.default_rng(0)
+    values = rng.integers(0, 2**24, size=(n_rows, 8))
+    return b''.join((' '.join(f"{v:06X}" for v in row) + '\r\n').encode() for row in values)
+
+def feed(master, data):
+    view = memoryview(data)
+    while view:
+        written = os.write(master, view[:4096])
+        view = view[written:]
+
+def run(mode, lines):
+    master, slave = pty.openpty()
+    tty.setraw(slave)
+    ser = serial.Serial(os.ttyname(slave), document_data.BAUD_RATE, timeout=document_data.READ_TIMEOUT)
+    writer = threading.Thread(target=feed, args=(master, lines), daemon=True)
+    output = io.StringIO()
+
+    start = time.perf_counter()
+    writer.start()
+    with redirect_stdout(SlowTerminal()):
+        if mode == "line":
+            rows = document_data.run_line_mode(ser, output, max_rows=N_ROWS)
+        else:
+            rows = document_data.run_bulk_mode(ser, output, max_rows=N_ROWS)
+    elapsed = time.perf_counter() - start
+
+    writer.join()
+    ser.close()
+    os.close(master)
+    os.close(slave)
+    return rows, elapsed, output.getvalue()
+
+def main():
+    lines = make_lines(N_ROWS)
+    results = {mode: run(mode, lines) for mode in ("line", "bulk")}
+
+    print(f"{'mode':>6} {'rows':>6} {'time (s)':>9} {'rows/s':>9}")
+    for mode, (rows, elapsed, _) in results.items():
+        print(f"{mode:>6} {rows:>6} {elapsed:>9.3f} {rows / elapsed:>9.0f}")
+    print(f"needed: {document_data.SAMPLE_RATE} rows/s")
+
+    # both modes write the same values, only the timestamp column differs
+    strip = lambda text: [row.rsplit(', ', 1)[0] for row in text.splitlines()]
+    assert strip(results["line"][2]) == strip(results["bulk"][2])
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,28 @@
+import argparse
 import serial
+import sys
 import time
+import numpy as np
 
 # Setting the serial port and baud rate
 SERIAL_PORT = 'COM4'
 BAUD_RATE = 115200
+SAMPLE_RATE = 250
+OUTPUT_FILE = 'received_data.txt'
+
+# Bulk mode settings
+ECHO_INTERVAL = 0.5  # seconds between rows echoed to the terminal
+READ_TIMEOUT = 0.05  # longest wait for new bytes when nothing is waiting
+
+# Hex digit values by byte, padding (NUL) is -2 and anything else -1
+HEX_LUT = np.full(256, -1, dtype=np.int64)
+for digit, char in enumerate(b'0123456789abcdef'):
+    HEX_LUT[char] = digit
+    HEX_LUT[ord(chr(char).upper())] = digit
+HEX_LUT[0] = -2
+
+# Row layout: sample index, 8 EXG channels, 15 unused channels, formatted timestamp
+ROW_FORMAT = "{}, " + "{}, " * 8 + "0, " * 15 + "{}\n"
 
 def print_to_terminal(data):
     """Printing decoded data to the terminal"""
@@ -25,24 +44,18 @@ def scale_value(value, scale_factor=1):
     """Scaling down the decimal value to fit the expected range"""
     return value / scale_factor
 
+def format_timestamp(seconds):
+    """Format a time.time() value as HH:MM:SS.mmm (EST)"""
+    # Subtracting 5 hours (in seconds) to convert to EST
+    est_time = time.gmtime(seconds - 5 * 3600)
+    return time.strftime('%H:%M:%S.', est_time) + f"{int((seconds % 1) * 1000):03}"
+
 def generate_timestamp():
     """Generate a timestamp in the format HH:MM:SS.mmm (EST)"""
-    # Subtracting 5 hours (in seconds) to convert to EST
-    est_time = time.gmtime(time.time() - 5 * 3600)
-    # Formatting the EST time
-    formatted_time = time.strftime('%H:%M:%S.', est_time) + f"{int((time.time() % 1) * 1000):03}"
-    return formatted_time
-    # Opening the serial port
-try:
-    ser = serial.Serial(SERIAL_PORT, BAUD_RATE, timeout=1)
-    print(f"Successfully opened serial port {SERIAL_PORT}")
-except Exception as e:
-    print(f"Error opening serial port: {e}")
-    exit()
-
-# Opening a file to save the received data (in write mode to clear the file)
-with open('received_data.txt', 'w') as file:
-    # Writing header to the file
+    return format_timestamp(time.time())
+
+def write_header(file):
+    """Writing the OpenBCI header to the file"""
     header = "%OpenBCI Raw EXG Data\n"
     header += "%Number of channels = 8\n"
     header += "%Sample Rate = 250 Hz\n"
@@ -50,9 +63,68 @@ with open('received_data.txt', 'w') as file:
     header += "Sample Index, EXG Channel 0, EXG Channel 1, EXG Channel 2, EXG Channel 3, EXG Channel 4, EXG Channel 5, EXG Channel 6, EXG Channel 7, Accel Channel 0, Accel Channel 1, Accel Channel 2, Not Used, Digital Channel 0 (D11), Digital Channel 1 (D12), Digital Channel 2 (D13), Digital Channel 3 (D17), Not Used, Digital Channel 4 (D18), Analog Channel 0, Analog Channel 1, Analog Channel 2, Timestamp, Marker Channel, Timestamp (Formatted)\n"
     file.write(header)
 
+def parse_hex_tokens(tokens):
+    """Converting a list of hex strings (bytes) to decimal all at once.
+
+    Gives the same values as hex_to_decimal. Tokens the lookup table cannot handle
+    (signs, underscores, very long values) go through hex_to_decimal instead."""
+    if not tokens:
+        return np.empty(0)
+    chars = np.array(tokens)
+    width = chars.dtype.itemsize
+    chars = chars.view(np.uint8).reshape(len(tokens), width).copy()
+
+    # A 0x prefix is read as two leading zeros
+    if width > 1:
+        prefixed = (chars[:, 0] == ord('0')) & ((chars[:, 1] == ord('x')) | (chars[:, 1] == ord('X')))
+        chars[prefixed, 1] = ord('0')
+
+    digits = HEX_LUT[chars]
+    padding = digits == -2
+    lengths = width - padding.sum(axis=1)
+    fallback = np.any(digits == -1, axis=1) | (lengths == 0) | (lengths > 15)
+
+    exponents = np.clip(lengths[:, None] - 1 - np.arange(width), 0, None)
+    values = np.where(padding, 0, digits * (16 ** exponents)).sum(axis=1).astype(float)
+    for i in np.flatnonzero(fallback):
+        values[i] = hex_to_decimal(tokens[i].decode('utf-8', errors='ignore'))
+    return values
+
+def parse_lines(block):
+    """Parsing every complete line in a block of bytes.
+
+    Lines with fewer than 8 values are skipped, like in the line by line loop.
+
+    :return: An (N, 8) array of decimal values."""
+    tokens = []
+    for line in block.split(b'\n'):
+        values = line.split()
+        if len(values) >= 8:
+            tokens.extend(values[:8])
+    return parse_hex_tokens(tokens).reshape(-1, 8)
+
+def format_rows(start_index, values, end_time, sample_rate=SAMPLE_RATE):
+    """Formatting a block of samples as OpenBCI rows.
+
+    The last sample is stamped with end_time and the ones before it are spaced one sample
+    period apart, so each second is formatted with strftime only once."""
+    rows = []
+    prefixes = {}
+    n = len(values)
+    for i, sample in enumerate(values.tolist()):
+        seconds = end_time - (n - 1 - i) / sample_rate
+        whole = int(seconds)
+        if whole not in prefixes:
+            prefixes[whole] = time.strftime('%H:%M:%S.', time.gmtime(whole - 5 * 3600))
+        timestamp = prefixes[whole] + f"{int((seconds % 1) * 1000):03}"
+        rows.append(ROW_FORMAT.format(start_index + i, *sample, timestamp))
+    return "".join(rows)
+
+def run_line_mode(ser, file, max_rows=None):
+    """Reading, converting, printing and saving one line at a time"""
     print("Start receiving data from ESP32...")
     index = 0
-    while True:
+    while max_rows is None or index < max_rows:
         if ser.in_waiting > 0:  # Checking if data is available
             data = ser.readline()  # Reading a line of data
             if data:  # Ensuring data is not empty
@@ -75,4 +147,76 @@ with open('received_data.txt', 'w') as file:
                         index += 1
 
                 except Exception as decode_error:
-                    print(f"Error decoding data: {decode_error}")
\ No newline at end of file
+                    print(f"Error decoding data: {decode_error}")
+    return index
+
+def run_bulk_mode(ser, file, max_rows=None, echo_interval=ECHO_INTERVAL):
+    """Reading everything waiting on the port, converting all complete lines at once and
+    saving them as one block. Only one row per echo_interval is printed."""
+    print("Start receiving data from ESP32 (bulk mode)...")
+    index = 0
+    pending = b''
+    last_echo = 0.0
+    while max_rows is None or index < max_rows:
+        data = ser.read(ser.in_waiting or 1)
+        if not data:
+            continue
+        pending += data
+
+        # Only complete lines are parsed, the rest waits for the next read
+        end = pending.rfind(b'\n')
+        if end < 0:
+            continue
+        block, pending = pending[:end + 1], pending[end + 1:]
+
+        try:
+            values = parse_lines(block)
+        except Exception as decode_error:
+            print(f"Error decoding data: {decode_error}")
+            continue
+        if max_rows is not None:
+            values = values[:max_rows - index]
+        if len(values) == 0:
+            continue
+
+        rows = format_rows(index, values, time.time())
+        save_to_file(file, rows)
+        index += len(values)
+
+        now = time.monotonic()
+        if echo_interval is not None and now - last_echo >= echo_interval:
+            last_echo = now
+            print_to_terminal(f"[{index} samples] " + rows[rows.rfind('\n', 0, -1) + 1:])
+    return index
+
+def main():
+    parser = argparse.ArgumentParser(description="Save EEG data from the ESP32-C6 receiver as an OpenBCI text file.")
+    parser.add_argument('--port', default=SERIAL_PORT, help="Serial port of the ESP32-C6")
+    parser.add_argument('--baud', type=int, default=BAUD_RATE, help="Serial baud rate")
+    parser.add_argument('--output', default=OUTPUT_FILE, help="File to write")
+    parser.add_argument('--bulk', action='store_true', help="Convert everything waiting on the port at once and throttle the terminal echo")
+    parser.add_argument('--echo-interval', type=float, default=ECHO_INTERVAL, help="Seconds between echoed rows in bulk mode")
+    args = parser.parse_args()
+
+    # Opening the serial port
+    try:
+        ser = serial.Serial(args.port, args.baud, timeout=READ_TIMEOUT if args.bulk else 1)
+        print(f"Successfully opened serial port {args.port}")
+    except Exception as e:
+        print(f"Error opening serial port: {e}")
+        sys.exit()
+
+    # Opening a file to save the received data (in write mode to clear the file)
+    with open(args.output, 'w', buffering=1 << 16 if args.bulk else -1) as file:
+        # Writing header to the file
+        write_header(file)
+        try:
+            if args.bulk:
+                run_bulk_mode(ser, file, echo_interval=args.echo_interval)
+            else:
+                run_line_mode(ser, file)
+        except KeyboardInterrupt:
+            print("\nData collection stopped.")
+
+if __name__ == '__main__':
+    main()
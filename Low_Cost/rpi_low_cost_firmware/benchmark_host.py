@@ -0,0 +1,116 @@
+"""Runs code.py on a Linux host with stubbed CircuitPython modules and reports the achievable sample rate.
+
+The ADC, select lines and UDP socket are replaced by minimal stubs, so the numbers show the
+cost of the firmware loop itself in each mode, not of the hardware.
+
+Run from this folder: python benchmark_host.py"""
+import importlib.util
+import os
+import struct
+import sys
+import time
+import types
+
+N_SAMPLES = 20000
+SAMPLES_PER_FRAME = 8
+
+class AnalogIn:
+    def __init__(self, pin):
+        self.reads = 0
+
+    @property
+    def value(self):
+        self.reads += 1
+        return self.reads & 0xFFFF
+
+class DigitalInOut:
+    def __init__(self, pin):
+        self.value = False
+        self.direction = None
+
+class Radio:
+    ipv4_address_ap = "192.168.4.1"
+
+    def start_ap(self, ssid, password):
+        pass
+
+class Socket:
+    def __init__(self):
+        self.sent = []
+
+    def sendto(self, data, address):
+        self.sent.append(bytes(data))
+
+class SocketPool:
+    AF_INET = 2
+    SOCK_DGRAM = 2
+
+    def __init__(self, radio):
+        pass
+
+    def socket(self, family, kind):
+        return Socket()
+
+def install_stubs():
+    """Registers stand-ins for the CircuitPython modules code.py imports."""
+    board = types.ModuleType("board")
+    board.A0, board.GP18, board.GP19, board.GP20 = "A0", "GP18", "GP19", "GP20"
+    analogio = types.ModuleType("analogio")
+    analogio.AnalogIn = AnalogIn
+    digitalio = types.ModuleType("digitalio")
+    digitalio.DigitalInOut = DigitalInOut
+    digitalio.Direction = types.SimpleNamespace(OUTPUT="output")
+    wifi = types.ModuleType("wifi")
+    wifi.radio = Radio()
+    socketpool = types.ModuleType("socketpool")
+    socketpool.SocketPool = SocketPool
+    sys.modules.update(board=board, analogio=analogio, digitalio=digitalio, wifi=wifi, socketpool=socketpool)
+
+def load_firmware():
+    # code.py would shadow the standard library module of the same name, so load it under another name
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "code.py")
+    spec = importlib.util.spec_from_file_location("pico_code", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def run(firmware, mode, data_format):
+    """Publishes N_SAMPLES samples with no pacing and returns the samples per second and the transmitter."""
+    os.environ.update(CIRCUITPY_MODE=mode, CIRCUITPY_FORMAT=data_format, CIRCUITPY_RATE="0")
+    transmitter = firmware.AnalogDataTransmitter()
+    transmitter.period_ns = 0
+    transmitter.next_sample = time.monotonic_ns()
+
+    samples_per_packet = 1 if (mode == "paced" and data_format == "json") else SAMPLES_PER_FRAME
+    start = time.perf_counter()
+    for _ in range(N_SAMPLES // samples_per_packet):
+        transmitter.publish()
+    return N_SAMPLES / (time.perf_counter() - start), transmitter
+
+def main():
+    install_stubs()
+    os.environ.update(
+        CIRCUITPY_WIFI_SSID="bench", CIRCUITPY_WIFI_PASSWORD="bench", CIRCUITPY_MULTICAST_GROUP="224.1.1.1",
+        CIRCUITPY_PORT="5005", CIRCUITPY_SAMPLES_PER_FRAME=str(SAMPLES_PER_FRAME), CIRCUITPY_DEBUG="0",
+    )
+    firmware = load_firmware()
+
+    rows = []
+    for mode, data_format in (("paced", "json"), ("paced", "binary"), ("burst", "binary")):
+        rate, transmitter = run(firmware, mode, data_format)
+        sent = transmitter.udp_socket.sent
+        rows.append((mode + " " + data_format, rate, sum(len(packet) for packet in sent) / N_SAMPLES))
+
+    print(f"{'mode':>16} {'samples/s':>12} {'bytes/sample':>13}")
+    for name, rate, bytes_per_sample in rows:
+        print(f"{name:>16} {rate:>12.0f} {bytes_per_sample:>13.1f}")
+
+    # the burst frames carry increasing device timestamps and every channel of every sample
+    frame = sent[-1]
+    magic, sequence, count = struct.unpack_from(firmware.FRAME_HEADER, frame)
+    assert magic == firmware.BURST_FRAME_MAGIC and count == SAMPLES_PER_FRAME
+    timestamps = [struct.unpack_from(firmware.BURST_SAMPLE, frame, 6 + 20 * i)[0] for i in range(count)]
+    assert timestamps == sorted(timestamps)
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,20 @@ import board
 import analogio
 import digitalio
 import json
+import struct
+
+# Binary frame = header [magic (uint16), sequence number (uint16), sample count (uint16)]
+# followed by count samples of channels 0-7 (uint16 each), all little-endian
+FRAME_MAGIC = 0xEEC0
+FRAME_HEADER = "<HHH"
+
+# Burst frames use the same header with their own magic, and every sample
+# starts with its timestamp: [timestamp/milliseconds (uint32), channels 0-7 (uint16 each)]
+BURST_FRAME_MAGIC = 0xEEC1
+BURST_SAMPLE = "<I8H"
+
+# Select line levels for every mux channel, least significant bit first
+SELECT_TABLE = [tuple(bool(channel >> bit & 1) for bit in range(3)) for channel in range(8)]
 
 class AnalogDataTransmitter:
 
@@ -17,6 +31,13 @@ class AnalogDataTransmitter:
             self.MULTICAST_GROUP = os.getenv('CIRCUITPY_MULTICAST_GROUP')
             self.PORT = int(os.getenv('CIRCUITPY_PORT'))
             self.RATE = float(os.getenv('CIRCUITPY_RATE'))
+            # Optional: samples packed into one binary frame, and "json" to send the old format
+            self.SAMPLES_PER_FRAME = int(os.getenv('CIRCUITPY_SAMPLES_PER_FRAME') or 8)
+            self.FORMAT = os.getenv('CIRCUITPY_FORMAT') or "binary"
+            # Optional: "burst" samples the 8 channels back-to-back and timestamps every sample
+            self.MODE = os.getenv('CIRCUITPY_MODE') or "paced"
+            # Optional: 1 prints every published packet
+            self.DEBUG = bool(int(os.getenv('CIRCUITPY_DEBUG') or 0))
 
         except TypeError:
             print("Could not find WiFi info. Check your settings.toml file!")
@@ -47,35 +68,85 @@ class AnalogDataTransmitter:
         ## SOCK_DGRAM is a datagram-based protocol (UDP)
         self.udp_socket = pool.socket(pool.AF_INET, pool.SOCK_DGRAM)
 
-        # Start Transmitting
-        self.transmit()
+        # Frame buffer is allocated once and refilled for every frame
+        self.sequence = 0
+        sample_size = struct.calcsize(BURST_SAMPLE) if self.MODE == "burst" else 16
+        self.frame = bytearray(struct.calcsize(FRAME_HEADER) + sample_size * self.SAMPLES_PER_FRAME)
+        self.channels = [0] * 8
 
     def setSelectLines(self, value):
-        # Convert the value to binary and remove the 0b prefix
-        binary_value = bin(value)[2:]
-
-        # Pad the value with 0s and make sure that the size is 3
-        binary_value = ("000" + binary_value)[-3:]
-
-        # Output the true where you have a 1 and false where you have a 0
-        # On the appropriate lines.
-        for i, bit in enumerate(reversed(binary_value)):
-            self.select_lines[i].value = bool(int(bit))
+        # Look up the levels instead of formatting the value as a binary string
+        levels = SELECT_TABLE[value]
+        self.select_lines[0].value = levels[0]
+        self.select_lines[1].value = levels[1]
+        self.select_lines[2].value = levels[2]
 
     def getData(self):
-        channels = {}
+        channels = []
         for i in range(8):
-            channels[f"CH{i}"] = self.sensor.value
+            channels.append(self.sensor.value)
             self.setSelectLines(i)
             time.sleep(self.RATE / 8)
-        return json.dumps(channels)
+        return channels
+
+    def getBurst(self):
+        # Select each channel and read it right away, with no sleeps in between
+        channels = self.channels
+        for i in range(8):
+            self.setSelectLines(i)
+            channels[i] = self.sensor.value
+        return channels
+
+    def packBurstFrame(self):
+        # Read SAMPLES_PER_FRAME timestamped bursts, one every RATE seconds
+        offset = struct.calcsize(FRAME_HEADER)
+        struct.pack_into(FRAME_HEADER, self.frame, 0, BURST_FRAME_MAGIC, self.sequence, self.SAMPLES_PER_FRAME)
+        for _ in range(self.SAMPLES_PER_FRAME):
+            now = time.monotonic_ns()
+            if now < self.next_sample:
+                time.sleep((self.next_sample - now) / 1e9)
+                now = self.next_sample
+            self.next_sample = max(self.next_sample + self.period_ns, now)
+            struct.pack_into(BURST_SAMPLE, self.frame, offset, (now // 1000000) & 0xFFFFFFFF, *self.getBurst())
+            offset += 20
+        self.sequence = (self.sequence + 1) & 0xFFFF
+        return self.frame
+
+    def packFrame(self):
+        # Read SAMPLES_PER_FRAME samples straight into the frame buffer
+        offset = struct.calcsize(FRAME_HEADER)
+        struct.pack_into(FRAME_HEADER, self.frame, 0, FRAME_MAGIC, self.sequence, self.SAMPLES_PER_FRAME)
+        for _ in range(self.SAMPLES_PER_FRAME):
+            struct.pack_into("<8H", self.frame, offset, *self.getData())
+            offset += 16
+        self.sequence = (self.sequence + 1) & 0xFFFF
+        return self.frame
+
+    def publish(self):
+        # Read and send one packet in the configured mode and format
+        if self.MODE == "burst":
+            frame = self.packBurstFrame()
+            self.udp_socket.sendto(frame, (self.MULTICAST_GROUP, self.PORT))
+            if self.DEBUG:
+                print(f"Published burst frame of {self.SAMPLES_PER_FRAME} samples")
+        elif self.FORMAT == "json":
+            data = json.dumps({f"CH{i}": value for i, value in enumerate(self.getData())})
+            self.udp_socket.sendto(data.encode(), (self.MULTICAST_GROUP, self.PORT))
+            if self.DEBUG:
+                print(f"Published: {data}")
+        else:
+            frame = self.packFrame()
+            self.udp_socket.sendto(frame, (self.MULTICAST_GROUP, self.PORT))
+            if self.DEBUG:
+                print(f"Published frame of {self.SAMPLES_PER_FRAME} samples")
 
     def transmit(self):
+        self.period_ns = int(self.RATE * 1e9)
+        self.next_sample = time.monotonic_ns()
         while True:
-            data = self.getData()
-            self.udp_socket.sendto(data.encode(), (self.MULTICAST_GROUP, self.PORT))
-            print(f"Published: {data}")
+            self.publish()
 
 if __name__ == '__main__':
-    AnalogDataTransmitter()
+    # Start Transmitting
+    AnalogDataTransmitter().transmit()
 